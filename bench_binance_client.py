@@ -0,0 +1,192 @@
+# bench_binance_client.py
+# Requests/second for plain requests.get (new connection per call) versus the
+# pooled BinanceClient, and per-symbol price calls versus the all-symbols
+# PriceSnapshot for a batch of pending checks, against a local keep-alive stub
+# of the Binance Futures REST API that enforces a per-minute weight limit (no
+# network needed).
+#
+#   python3 bench_binance_client.py --requests 2000 --threads 8 --pending 100
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from binance_client import BinanceClient, WeightTracker, request_weight
+from price_snapshot import PriceSnapshot
+
+STUB_LATENCY = 0.002     # seconds of server work per request
+CONNECT_LATENCY = 0.030  # stands in for the TCP + TLS handshake to fapi.binance.com
+STUB_SYMBOLS = 500       # contracts in the all-symbols price response
+
+
+class StubBinance(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real endpoint
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    weight_limit = 2400
+    lock = threading.Lock()
+    window = None
+    used = 0
+    stats = {"requests": 0, "rejected": 0, "connections": 0}
+
+    def setup(self):
+        super().setup()
+        time.sleep(CONNECT_LATENCY)
+        with self.lock:
+            self.stats["connections"] += 1
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        weight = request_weight(url.path, params)
+
+        with self.lock:
+            window = int(time.time() // 60)
+            if window != StubBinance.window:
+                StubBinance.window, StubBinance.used = window, 0
+            StubBinance.used += weight
+            used = StubBinance.used
+            self.stats["requests"] += 1
+            rejected = used > self.weight_limit
+            if rejected:
+                self.stats["rejected"] += 1
+
+        time.sleep(STUB_LATENCY)
+        if rejected:
+            self._reply(429, {"code": -1003, "msg": "Too many requests"}, used, {"Retry-After": "1"})
+        elif url.path == "/fapi/v1/ticker/price" and "symbol" in params:
+            self._reply(200, {"symbol": params["symbol"], "price": "64000.10"}, used)
+        elif url.path == "/fapi/v1/ticker/price":
+            self._reply(200, [{"symbol": f"SYM{i}USDT", "price": "64000.10"} for i in range(STUB_SYMBOLS)], used)
+        elif url.path == "/fapi/v1/klines":
+            now = int(time.time() * 1000)
+            candles = [[now - i * 60000, "1", "2", "0.5", "1.5", "100", now, "0", 1, "0", "0", "0"]
+                       for i in range(int(params.get("limit", 500)))]
+            self._reply(200, candles, used)
+        else:
+            self._reply(404, {"code": -1, "msg": "unknown path"}, used)
+
+    def _reply(self, status, body, used, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("X-MBX-USED-WEIGHT-1M", str(used))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubBinance)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def reset_stub(weight_limit):
+    with StubBinance.lock:
+        StubBinance.weight_limit = weight_limit
+        StubBinance.window, StubBinance.used = None, 0
+        for key in StubBinance.stats:
+            StubBinance.stats[key] = 0
+
+
+def pooled_with(client):
+    def fetch(symbol):
+        try:
+            return client.get("/fapi/v1/ticker/price", {"symbol": symbol})
+        except Exception:
+            return None
+    return fetch
+
+
+def run(label, fetch, count, threads):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda i: fetch(f"SYM{i % 50}USDT"), range(count)))
+    elapsed = time.perf_counter() - started
+    errors = sum(1 for r in results if r is None)
+    s = dict(StubBinance.stats)
+    print(
+        f"{label:<16} {count / elapsed:8.0f} req/s  {elapsed:6.2f}s  "
+        f"{s['connections']:>5} connections  {s['rejected']:>4} rejected (429)  {errors:>4} errors"
+    )
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="requests.get vs pooled BinanceClient")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--pending", type=int, default=100)
+    args = parser.parse_args()
+
+    server = start_stub_server()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    print(f"📏 {args.requests} price requests on {args.threads} threads, stub latency {STUB_LATENCY * 1000:.0f}ms, "
+          f"connect {CONNECT_LATENCY * 1000:.0f}ms")
+
+    def plain(symbol):
+        try:
+            return requests.get(f"{base_url}/fapi/v1/ticker/price", params={"symbol": symbol},
+                                headers={"Connection": "close"}, timeout=5).json()
+        except Exception:
+            return None
+
+    # Throughput first, with the weight limit out of the way on both sides
+    pooled = pooled_with(BinanceClient(base_url=base_url, weights=WeightTracker(limit=10 ** 9)))
+
+    reset_stub(weight_limit=10 ** 9)
+    before = run("requests.get", plain, args.requests, args.threads)
+    reset_stub(weight_limit=10 ** 9)
+    after = run("BinanceClient", pooled, args.requests, args.threads)
+    print(f"⚡ {after / before:.1f}x requests/second")
+
+    # Weight guard: a burst 1.5x the per-minute budget. Plain calls run into
+    # 429s; the client stops at its headroom share of the budget and would
+    # wait for the next minute instead of sending the rest.
+    limit = args.requests // 2
+    reset_stub(weight_limit=limit)
+    run("requests.get", plain, limit + limit // 2, args.threads)
+    reset_stub(weight_limit=limit)
+    guarded = BinanceClient(base_url=base_url, weights=WeightTracker(limit=limit))
+    allowed = int(guarded.weights.budget)
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(lambda i: pooled_with(guarded)("BTCUSDT"), range(allowed)))
+    print(
+        f"🛡️ BinanceClient sent {StubBinance.stats['requests']} requests against a {limit}-weight limit, "
+        f"{StubBinance.stats['rejected']} rejected; tracker at {guarded.weights.used}/{allowed:.0f}, "
+        f"so the rest of the burst waits for the next window"
+    )
+
+    # A batch of due rows in update_prices.py: one ticker/price call per row
+    # before, one all-symbols snapshot now
+    symbols = [f"SYM{i % STUB_SYMBOLS}USDT" for i in range(args.pending)]
+    client = BinanceClient(base_url=base_url, weights=WeightTracker(limit=10 ** 9))
+    for label, lookup in (
+        ("per-symbol", lambda symbol: float(client.get("/fapi/v1/ticker/price", {"symbol": symbol})["price"])),
+        ("PriceSnapshot", PriceSnapshot(client=client).get),
+    ):
+        reset_stub(weight_limit=10 ** 9)
+        started = time.perf_counter()
+        priced = sum(1 for symbol in symbols if lookup(symbol) is not None)
+        elapsed = time.perf_counter() - started
+        print(
+            f"{label:<16} {args.pending} pending checks in {1000 * elapsed:7.1f}ms  "
+            f"{StubBinance.stats['requests']:>4} HTTP calls  weight {StubBinance.used:>4}  priced {priced}"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# bench_contradiction_filter.py
+# has_contradiction() against a synthetic signals_log.csv: the old code
+# (parse the whole log on every check) versus the in-memory window index.
+# Checks the answers match — fresh checks, checks a little in the past,
+# checks far enough back to need the full scan, and rows appended the way
+# main.log_to_csv() writes them — then times both on a log of --rows rows.
+# Logs go to a temporary directory.
+#
+#   python3 bench_contradiction_filter.py --rows 1000000 --checks 2000
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+FIELDNAMES = ["Timestamp", "Asset", "Signal", "Label", "Confidence", "Headline", "Reason", "SignalPrice",
+              "Price_Change_%", "RSI", "RSI_Label", "RSI_Trend", "MA_Crossover", "VolumeSpike", "SourceURL", "ChartURL"]
+ASSETS = [f"COIN{i}USDT" for i in range(150)] + ["BTCUSDT", "ETHUSDT", "SOLUSDT"]
+
+
+def legacy_has_contradiction(asset, current_signal, now_utc=None, path="signals_log.csv"):
+    """has_contradiction before the index: the whole log on every call."""
+    if not now_utc:
+        now_utc = datetime.utcnow()
+
+    try:
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            signals = []
+            for row in reader:
+                if row["Asset"] != asset or not row["Timestamp"]:
+                    continue
+                try:
+                    ts = datetime.strptime(row["Timestamp"], "%Y-%m-%d %H:%M:%S")
+                except:
+                    continue
+                if now_utc - ts <= timedelta(minutes=60):
+                    signals.append(row["Signal"].upper())
+    except:
+        return False
+
+    return len(set(signals + [current_signal.upper()])) > 1
+
+
+def signal_row(rng, at, asset=None):
+    asset = asset or rng.choice(ASSETS)
+    return {
+        "Timestamp": at.strftime("%Y-%m-%d %H:%M:%S"),
+        "Asset": asset,
+        "Signal": rng.choice(["BUY", "SELL", "HOLD", "buy"]),
+        "Label": rng.choice(["positive", "negative", "neutral"]),
+        "Confidence": rng.randint(50, 95),
+        "Headline": f'{asset[:-4]} "rallies", analysts say {rng.random():.6f}',
+        # Some reasons span lines, as GPT output sometimes does
+        "Reason": "Momentum, volume and funding agree." + ("\nFollow-through likely." if rng.random() < 0.1 else ""),
+        "SignalPrice": f"{rng.uniform(0.1, 70000):.4f}",
+        "Price_Change_%": "",
+        "RSI": f"{rng.uniform(10, 90):.2f}",
+        "RSI_Label": "Neutral",
+        "RSI_Trend": "Rising",
+        "MA_Crossover": "None",
+        "VolumeSpike": "False",
+        "SourceURL": "https://example.com/news/" + str(rng.randint(0, 10**9)),
+        "ChartURL": "",
+    }
+
+
+def write_log(path, rows, now, rng):
+    # Evenly over ~a year, with the last two hours as busy as a news spike
+    recent = min(400, rows // 10)
+    older = rows - recent
+    span = 365 * 86400
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        for i in range(older):
+            at = now - timedelta(seconds=span - (span - 7200) * i // older)
+            writer.writerow(signal_row(rng, at))
+        for i in range(recent):
+            at = now - timedelta(seconds=7200 - 7200 * i // recent)
+            writer.writerow(signal_row(rng, at, asset=rng.choice(ASSETS[-10:])))
+
+
+def append_row(path, row):
+    # As main.log_to_csv() does
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        csv.DictWriter(f, fieldnames=FIELDNAMES).writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contradiction index vs whole-log scans")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--checks", type=int, default=2000)
+    parser.add_argument("--legacy-checks", type=int, default=3, help="whole-log scans timed on the big log")
+    args = parser.parse_args()
+
+    # The index reads signals_log.csv relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix="contradictions-"))
+    import contradiction_filter
+    from contradiction_filter import has_contradiction, record_signal
+
+    rng = random.Random(7)
+    now = datetime.utcnow().replace(microsecond=0)
+
+    # Parity on a small log, where the old code is cheap enough to ask often
+    write_log("signals_log.csv", 20000, now, rng)
+    queries = []
+    for _ in range(args.checks):
+        asset = rng.choice(ASSETS[-12:] if rng.random() < 0.8 else ASSETS)
+        when = rng.choice([None, None, now - timedelta(minutes=rng.uniform(0, 4)), now - timedelta(hours=rng.uniform(2, 48))])
+        queries.append((asset, rng.choice(["UNKNOWN", "BUY", "SELL", "HOLD"]), when))
+    matched = conflicts = 0
+    for i, (asset, signal, when) in enumerate(queries):
+        if i % 50 == 0:
+            append_row("signals_log.csv", signal_row(rng, datetime.utcnow(), asset=rng.choice(ASSETS[-12:])))
+            record_signal()
+        expected = legacy_has_contradiction(asset, signal, when)
+        matched += has_contradiction(asset, signal, when) == expected
+        conflicts += expected
+    stats = dict(contradiction_filter._window.stats)
+    print(f"🔍 {matched}/{len(queries)} answers identical ({conflicts} conflicts, "
+          f"{len(queries) // 50} rows appended as log_to_csv does, {stats['full_scans']} checks older than the index)")
+
+    # Timing on the big log
+    os.remove("signals_log.csv")
+    started = time.perf_counter()
+    write_log("signals_log.csv", args.rows, now, rng)
+    size_mb = os.path.getsize("signals_log.csv") / 2**20
+    print(f"📏 {args.rows} rows, {size_mb:.0f} MB log written in {time.perf_counter() - started:.1f}s")
+
+    checks = [(rng.choice(ASSETS[-10:]), "UNKNOWN") for _ in range(args.checks)]
+    started = time.perf_counter()
+    legacy = [legacy_has_contradiction(asset, signal) for asset, signal in checks[:args.legacy_checks]]
+    legacy_seconds = (time.perf_counter() - started) / args.legacy_checks
+
+    contradiction_filter._window = contradiction_filter.SignalWindow()
+    started = time.perf_counter()
+    first = has_contradiction(*checks[0])
+    build_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    current = [has_contradiction(asset, signal) for asset, signal in checks]
+    index_seconds = (time.perf_counter() - started) / len(checks)
+    window = contradiction_filter._window
+    held = sum(len(entries) for entries in window.recent.values())
+    same = sum(a == b for a, b in zip(legacy, current))
+
+    print(f"whole log     {1e3 * legacy_seconds:10.1f}ms per check")
+    print(f"index build   {1e3 * build_seconds:10.1f}ms once ({window.stats['rows_read']} tail rows read, {held} held)")
+    print(f"index         {1e6 * index_seconds:10.1f}µs per check  ({same}/{len(legacy)} match the whole-log answers, first {first})")
+    print(f"⚡ {legacy_seconds / index_seconds:.0f}x faster per check")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# bench_gpt_filter.py
+# Compare the per-headline GPT filter with the batched filter against a local
+# stub of the OpenAI chat completions endpoint (no API key or network needed).
+#
+#   python3 bench_gpt_filter.py --items 200 --batch-size 10
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_BASE_LATENCY = 0.35      # seconds per request before the first token
+STUB_SECONDS_PER_TOKEN = 0.004  # generation speed
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class StubOpenAI(BaseHTTPRequestHandler):
+    stats = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+
+        item_numbers = re.findall(r"^\[(\d+)\]", prompt, flags=re.M)
+        if item_numbers:
+            content = json.dumps({"results": [
+                {"id": int(n), "include": int(n) % 3 != 0, "score": 40 + int(n) % 60,
+                 "type": "Macro", "reason": "Stub verdict for benchmarking"}
+                for n in item_numbers
+            ]})
+        else:
+            content = "Include: TRUE\nScore: 72\nType: Macro\nReason: Stub verdict for benchmarking"
+
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(content)
+        time.sleep(STUB_BASE_LATENCY + completion_tokens * STUB_SECONDS_PER_TOKEN)
+
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+
+        payload = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server(port=0):
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubOpenAI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def reset_stats():
+    with StubOpenAI.lock:
+        for key in StubOpenAI.stats:
+            StubOpenAI.stats[key] = 0
+
+
+def make_items(count):
+    return [{
+        "id": f"bench-{i}",
+        "title": f"Bitcoin ETF sees record inflows as institutions pile in (story {i})",
+        "summary": "Spot bitcoin ETFs recorded their largest daily inflow since launch, "
+                   "led by large asset managers, while funding rates stayed neutral.",
+        "source": "Cointelegraph",
+    } for i in range(count)]
+
+
+def run(label, func):
+    reset_stats()
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    stats = dict(StubOpenAI.stats)
+    tokens = stats["prompt_tokens"] + stats["completion_tokens"]
+    print(
+        f"{label:<10} {elapsed:8.2f}s  {stats['requests']:>5} requests  "
+        f"{stats['prompt_tokens']:>8} prompt + {stats['completion_tokens']:>6} completion = {tokens:>8} tokens"
+    )
+    return elapsed, tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-item vs batched GPT filter benchmark")
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=10)
+    args = parser.parse_args()
+
+    server = start_stub_server()
+    from openai import OpenAI
+    import main as engine
+    engine.gpt.client = OpenAI(api_key="stub", base_url=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0)
+
+    items = make_items(args.items)
+    print(f"📏 {args.items} headlines, batch size {args.batch_size}")
+
+    per_item = run("per-item", lambda: [
+        engine.evaluate_news_quality_with_gpt(item["title"], item["summary"], item["source"])
+        for item in items
+    ])
+    batched = run("batched", lambda: [
+        engine.evaluate_news_batch_with_gpt(items[i:i + args.batch_size])
+        for i in range(0, len(items), args.batch_size)
+    ])
+
+    print(f"⚡ {per_item[0] / batched[0]:.1f}x faster, {100 * (1 - batched[1] / per_item[1]):.0f}% fewer tokens")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
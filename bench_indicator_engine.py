@@ -0,0 +1,173 @@
+# bench_indicator_engine.py
+# Parity and speed of the incremental IndicatorState against the pandas
+# get_technical_indicators it replaced, candle by candle over recorded
+# klines. MA crossover and volume spike must match the old code exactly;
+# RSI is now Wilder's, so it is checked against a pandas Wilder reference
+# and the old simple-mean RSI is only reported for comparison.
+#
+#   python3 bench_indicator_engine.py --record klines.json --symbols BTCUSDT,ETHUSDT   # needs Binance
+#   python3 bench_indicator_engine.py --klines klines.json
+#   python3 bench_indicator_engine.py                # seeded replay tape, no network
+
+import argparse
+import json
+import time
+
+import pandas as pd
+
+from indicator_engine import IndicatorState, RSI_PERIOD, indicators_from_series
+from kline_replay_server import ReplayMarket
+from market_data import INTERVAL_MS, KlineRing
+from technical_indicators import OHLCV_LIMIT, RSI_WARMUP
+
+
+def legacy_indicators(df):
+    """get_technical_indicators before the engine: pandas, simple-mean RSI over 50 candles."""
+    rsi_series = df["close"].diff().clip(lower=0).rolling(window=14).mean() / \
+                 df["close"].diff().clip(upper=0).abs().rolling(window=14).mean()
+    rsi_series = 100 - (100 / (1 + rsi_series))
+    rsi_now = rsi_series.iloc[-1]
+    rsi_prev = rsi_series.iloc[-2]
+
+    ma_short = df["close"].rolling(window=20).mean().iloc[-1]
+    ma_long = df["close"].rolling(window=50).mean().iloc[-1]
+    if ma_short > ma_long:
+        ma_cross = "20 > 50 (Bullish)"
+    elif ma_short < ma_long:
+        ma_cross = "20 < 50 (Bearish)"
+    else:
+        ma_cross = "20 = 50 (Neutral)"
+
+    recent_volume = df["volume"].iloc[-1]
+    avg_volume = df["volume"].rolling(window=20).mean().iloc[-1]
+    if avg_volume == 0:
+        volume_spike = "Unknown"
+    else:
+        ratio = (recent_volume / avg_volume) * 100
+        level = "High" if ratio > 180 else "Medium" if ratio > 130 else "Low"
+        volume_spike = f"+{ratio:.0f}% vs avg ({level})"
+
+    return {
+        "rsi": round(rsi_now, 1),
+        "rsi_label": "Oversold" if rsi_now < 30 else "Overbought" if rsi_now > 70 else "Neutral",
+        "rsi_trend": "Rising" if rsi_now > rsi_prev else "Falling",
+        "ma_crossover": ma_cross,
+        "volume_spike": volume_spike,
+    }
+
+
+def wilder_reference(closes):
+    """Wilder RSI for every candle: SMA seed over the first 14 changes, then
+    ewm(alpha=1/14) — the textbook definition, written with pandas."""
+    delta = closes.diff()
+    averages = []
+    for part in (delta.clip(lower=0), (-delta).clip(lower=0)):
+        seeded = part.copy()
+        seeded.iloc[:RSI_PERIOD + 1] = float("nan")
+        seeded.iloc[RSI_PERIOD] = part.iloc[1:RSI_PERIOD + 1].mean()
+        averages.append(seeded.ewm(alpha=1 / RSI_PERIOD, adjust=False).mean())
+    avg_gain, avg_loss = averages
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def record(path, symbols, limit=1500):
+    from binance_client import binance
+    data = {}
+    for symbol in symbols:
+        data[symbol] = binance.get("/fapi/v1/klines", {"symbol": symbol, "interval": "5m", "limit": limit})
+        print(f"📼 {symbol}: {len(data[symbol])} candles")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def load_klines(path, symbols):
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    market = ReplayMarket(symbols, interval="5m", history=1500)
+    return {symbol: market.klines(symbol, 1500) for symbol in symbols}
+
+
+def check_symbol(rows):
+    df = pd.DataFrame([[float(row[4]), float(row[5])] for row in rows], columns=["close", "volume"])
+    reference = wilder_reference(df["close"])
+    counts = {"candles": 0, "exact_ma_volume": 0, "rsi_match": 0, "rest_match": 0, "ring_match": 0,
+              "label_changes": 0, "max_rsi_error": 0.0}
+    legacy_seconds = engine_seconds = 0.0
+
+    # The engine sees every candle from the first; the ring is backfilled
+    # with the first `first`, like the stream service on connect
+    first = OHLCV_LIMIT + RSI_WARMUP
+    state = IndicatorState()
+    for row in rows[:first - 1]:
+        state.add(float(row[4]), float(row[5]))
+    ring = KlineRing(500, INTERVAL_MS["5m"])
+    ring.load(rows[:first])
+    for t in range(first, len(rows)):
+        counts["candles"] += 1
+        close, volume = float(rows[t][4]), float(rows[t][5])
+
+        started = time.perf_counter()
+        state.add(float(rows[t - 1][4]), float(rows[t - 1][5]))
+        result = state.snapshot(close, volume)
+        engine_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        legacy = legacy_indicators(df.iloc[t - OHLCV_LIMIT + 1:t + 1])
+        legacy_seconds += time.perf_counter() - started
+
+        counts["exact_ma_volume"] += (result["ma_crossover"], result["volume_spike"]) == \
+                                     (legacy["ma_crossover"], legacy["volume_spike"])
+        counts["label_changes"] += result["rsi_label"] != legacy["rsi_label"]
+
+        rsi_ref, rsi_ref_prev = reference.iloc[t], reference.iloc[t - 1]
+        counts["max_rsi_error"] = max(counts["max_rsi_error"], abs(result["rsi"] - round(rsi_ref, 1)))
+        counts["rsi_match"] += (result["rsi"], result["rsi_trend"]) == \
+                               (round(rsi_ref, 1), "Rising" if rsi_ref > rsi_ref_prev else "Falling")
+
+        # The REST fallback replays only the last `first` candles
+        window = rows[t - OHLCV_LIMIT - RSI_WARMUP + 1:t + 1]
+        rest = indicators_from_series([float(row[4]) for row in window], [float(row[5]) for row in window])
+        counts["rest_match"] += rest == result
+
+        # The stream path: the next candle opening closes the previous one
+        ring.update(int(rows[t][0]), [float(value) for value in rows[t][1:6]])
+        counts["ring_match"] += ring.snapshot() == result
+
+    return counts, legacy_seconds, engine_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IndicatorState parity and speed")
+    parser.add_argument("--klines", help="recorded klines JSON ({symbol: [REST rows]})")
+    parser.add_argument("--record", help="fetch 5m klines from Binance into this file and exit")
+    parser.add_argument("--symbols", default="BTCUSDT,ETHUSDT,SOLUSDT,XRPUSDT,DOGEUSDT")
+    args = parser.parse_args()
+
+    symbols = args.symbols.split(",")
+    if args.record:
+        record(args.record, symbols)
+        return
+
+    totals, legacy_seconds, engine_seconds = {}, 0.0, 0.0
+    for symbol, rows in load_klines(args.klines, symbols).items():
+        counts, legacy_s, engine_s = check_symbol(rows)
+        legacy_seconds += legacy_s
+        engine_seconds += engine_s
+        for key, value in counts.items():
+            totals[key] = max(totals.get(key, 0), value) if key == "max_rsi_error" else totals.get(key, 0) + value
+
+    n = totals["candles"]
+    print(f"📏 {n} candles across {len(symbols)} symbols ({args.klines or 'seeded replay tape'})")
+    print(f"MA crossover + volume spike identical to the pandas code: {totals['exact_ma_volume']}/{n}")
+    print(f"Wilder RSI + trend matching the pandas Wilder reference:   {totals['rsi_match']}/{n} "
+          f"(max rounded error {totals['max_rsi_error']:.1f})")
+    print(f"REST fallback (last {OHLCV_LIMIT + RSI_WARMUP} candles) identical to full history: {totals['rest_match']}/{n}")
+    print(f"Ring buffer stream path identical to the engine:          {totals['ring_match']}/{n}")
+    print(f"RSI labels that change moving from simple-mean to Wilder: {totals['label_changes']}/{n}")
+    print(f"⚡ pandas {1e6 * legacy_seconds / n:.1f}µs/candle → engine {1e6 * engine_seconds / n:.2f}µs/candle "
+          f"({legacy_seconds / engine_seconds:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# bench_kline_archive.py
+# The memory-mapped kline archive against kline_replay_server.py running
+# in-process (no network needed): sync() must reproduce the tape's closed
+# candles and top up incrementally, range queries must be views, and
+# multi-horizon outcome lookups over months of 1m candles are timed against
+# one REST download per lookup. Archive files go to a temporary directory.
+#
+#   python3 bench_kline_archive.py --months 6 --signals 10000
+
+import argparse
+import os
+import socket
+import tempfile
+import time
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kline archive benchmark")
+    parser.add_argument("--months", type=int, default=6)
+    parser.add_argument("--signals", type=int, default=10000)
+    args = parser.parse_args()
+
+    # The shared client is read from the environment at import time, so
+    # point it at a free local port first
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    os.environ["BINANCE_FAPI_URL"] = f"http://127.0.0.1:{port}"
+
+    import numpy as np
+    from binance_client import binance
+    from evaluate_outcomes import horizon_ms
+    from kline_archive import KlineArchive, KlineFile
+    from kline_replay_server import ReplayMarket, start_replay_server
+    from technical_indicators import fetch_klines
+
+    root = tempfile.mkdtemp(prefix="kline-archive-")
+    archive = KlineArchive(root)
+
+    # sync() against the replay tape, then a top-up after more candles close
+    symbols = ["BTCUSDT", "ETHUSDT", "SOLUSDT"]
+    # The tape stays still (its virtual time would run ahead of the clock);
+    # the last 100 candles are held back from the first sync instead
+    market = ReplayMarket(symbols, interval="1m", history=5000)
+    market.running.clear()
+    server = start_replay_server(market, port=port)
+    full = dict(market.candles)
+    market.candles = {symbol: rows[:-100] for symbol, rows in full.items()}
+    requests_before = binance.stats["requests"]
+    added = sum(archive.sync(symbol, "1m", days=5) for symbol in symbols)
+    first_requests = binance.stats["requests"] - requests_before
+    market.candles = full
+    requests_before = binance.stats["requests"]
+    topped_up = sum(archive.sync(symbol, "1m", days=5) for symbol in symbols)
+    top_up_requests = binance.stats["requests"] - requests_before
+
+    matched = 0
+    now = int(time.time() * 1000)
+    for symbol in symbols:
+        rows = [row for row in market.klines(symbol, 10**6) if row[0] + 60000 <= now]
+        tape = np.array([[row[0]] + [float(value) for value in row[1:6]] for row in rows]).T
+        stored = np.vstack(list(archive.open(symbol, "1m").columns().values()))
+        matched += tape.shape == stored.shape and bool(np.array_equal(tape, stored))
+    print(f"🗄️ sync: {added} candles in {first_requests} requests, top-up +{topped_up} in {top_up_requests}; "
+          f"{matched}/{len(symbols)} symbols identical to the tape's closed candles")
+
+    # REST cost of one day of 1m candles from the replay server, for scale
+    started = time.perf_counter()
+    for _ in range(20):
+        fetch_klines("BTCUSDT", "1m", 1440, start_time=int(rows[0][0]))
+    rest_day = (time.perf_counter() - started) / 20
+    server.shutdown()
+
+    # Months of 1m candles, appended in REST-sized pages as sync() would
+    minutes = args.months * 30 * 1440
+    rng = np.random.default_rng(7)
+    open_time = (1_700_000_000_000 // 60000 * 60000 + 60000 * np.arange(minutes)).astype(np.int64)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.0008, minutes)))
+    ohlcv = np.column_stack([close, close * 1.0005, close * 0.9995, close, rng.lognormal(3, 1, minutes)])
+    history = KlineFile(os.path.join(root, "1m", "HISTUSDT.npy"), writable=True)
+    started = time.perf_counter()
+    for i in range(0, minutes, 1500):
+        history.append(open_time[i:i + 1500], ohlcv[i:i + 1500])
+    build = time.perf_counter() - started
+    size_mb = os.path.getsize(history.path) / 2**20
+    print(f"📏 {args.months} months of 1m candles: {minutes} rows appended in {build:.2f}s, {size_mb:.0f} MB file")
+
+    # A fresh reader: nothing is read until touched
+    rss_before = rss_mb()
+    reader = KlineArchive(root)
+    started = time.perf_counter()
+    day_starts = rng.integers(open_time[0], open_time[-1] - 86400000, size=1000)
+    for start in day_starts:
+        window = reader.range("HISTUSDT", "1m", int(start), int(start) + 86400000)
+    query = (time.perf_counter() - started) / len(day_starts)
+    shares = np.shares_memory(window["close"], reader.open("HISTUSDT", "1m").data)
+    print(f"range query (1 day) {1e6 * query:8.1f}µs  (view into the map: {shares}, "
+          f"RSS +{rss_mb() - rss_before:.1f} MB after 1000 random days)")
+    print(f"REST (1 day)        {1e6 * rest_day:8.1f}µs  (replay server on localhost)")
+
+    # Multi-horizon outcomes for signals spread over the months
+    horizons = ["1h", "3h", "24h"]
+    at_ms = np.sort(rng.integers(open_time[0], open_time[-1] - 2 * 86400000, size=args.signals)).astype(np.float64)
+    started = time.perf_counter()
+    entry = reader.closes_at("HISTUSDT", at_ms)
+    moves = {h: (reader.closes_at("HISTUSDT", at_ms + horizon_ms(h)) - entry) / entry * 100 for h in horizons}
+    archive_seconds = time.perf_counter() - started
+    expected = close[((at_ms - open_time[0]) // 60000).astype(np.int64)]
+    exact = int(np.sum(entry == expected))
+    lookups = args.signals * (len(horizons) + 1)
+    print(f"🔍 {args.signals} signals x {len(horizons)} horizons in {1e3 * archive_seconds:.1f}ms from the archive "
+          f"({exact}/{args.signals} entry prices exact, {int(np.isnan(moves['24h']).sum())} unpriced); "
+          f"REST would be {lookups} downloads ≈ {lookups * rest_day:.0f}s on localhost")
+    print(f"⚡ {lookups * rest_day / archive_seconds:.0f}x faster, no network, "
+          f"RSS +{rss_mb() - rss_before:.1f} MB for a {size_mb:.0f} MB archive")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# bench_market_data.py
+# Technical indicators over REST (one klines download + DataFrame per call)
+# versus from the market-data ring buffers, against kline_replay_server.py
+# running in-process (no network needed). Also checks that the streamed
+# buffers match a REST download and recover after a dropped connection.
+#
+#   python3 bench_market_data.py --symbols 20 --calls 2000
+
+import argparse
+import os
+import socket
+import time
+
+
+def wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="REST vs streamed technical indicators")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=20.0, help="replay ticks per second")
+    args = parser.parse_args()
+
+    # The shared client and stream URL are read from the environment at
+    # import time, so point them at a free local port first
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    os.environ["BINANCE_FAPI_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["BINANCE_FSTREAM_URL"] = f"ws://127.0.0.1:{port}"
+
+    import technical_indicators
+    from binance_client import binance
+    from kline_replay_server import ReplayMarket, start_replay_server
+    from market_data import start_market_data, get_market_data
+
+    symbols = [f"SYM{i}USDT" for i in range(args.symbols)]
+    market = ReplayMarket(symbols, ticks_per_candle=20)
+    server = start_replay_server(market, port=port, rate=args.rate)
+
+    print(f"📏 {args.symbols} symbols, {args.calls} indicator calls, replay at {args.rate:g} ticks/s")
+
+    started = time.perf_counter()
+    for i in range(args.calls // 10):
+        technical_indicators.get_technical_indicators(symbols[i % len(symbols)])
+    rest = (time.perf_counter() - started) / (args.calls // 10)
+    print(f"REST + DataFrame    {1e6 * rest:9.1f}µs/call  ({binance.stats['requests']} HTTP calls)")
+
+    service = start_market_data(symbols)
+    if not wait_for(lambda: len(service.ready) == len(symbols) and service.stats["messages"] > 0):
+        print("❌ Stream never became ready")
+        return
+    requests_before = binance.stats["requests"]
+    started = time.perf_counter()
+    for i in range(args.calls):
+        technical_indicators.get_technical_indicators(symbols[i % len(symbols)])
+    streamed = (time.perf_counter() - started) / args.calls
+    print(f"ring buffer         {1e6 * streamed:9.1f}µs/call  ({binance.stats['requests'] - requests_before} HTTP calls)")
+    print(f"⚡ {rest / streamed:.0f}x faster per indicator request")
+
+    def parity():
+        # Freeze the tape, let in-flight frames land, then compare with REST
+        market.running.clear()
+        time.sleep(0.3)
+        matched = 0
+        for symbol in symbols:
+            ring = service.klines(symbol, 50)
+            rows = market.klines(symbol, 50)
+            matched += ring is not None and [float(row[4]) for row in rows] == ring["close"].tolist()
+        market.running.set()
+        return matched
+
+    # Let a few candles close on the stream before comparing
+    wait_for(lambda: service.stats["messages"] >= 3 * market.ticks_per_candle * len(symbols))
+    print(f"🔍 {parity()}/{len(symbols)} symbols match a REST download after {service.stats['messages']} stream messages")
+
+    connects = service.stats["connects"]
+    server.drop_connections()
+    dropped_at = time.monotonic()
+    # The stream thread reconnects after its 1s backoff and backfills again
+    if wait_for(lambda: service.stats["connects"] > connects and len(service.ready) == len(symbols)):
+        print(f"🔌 Reconnected and backfilled {time.monotonic() - dropped_at:.1f}s after a dropped stream")
+        time.sleep(1)
+        print(f"🔍 {parity()}/{len(symbols)} symbols match a REST download after the reconnect")
+    else:
+        print("❌ No reconnect after the drop")
+
+    get_market_data().print_stats()
+    get_market_data().stop()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
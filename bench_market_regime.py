@@ -0,0 +1,124 @@
+# bench_market_regime.py
+# A burst of uncached news items asking for the market change summary: the
+# old code (two 61-candle REST downloads per call) versus the shared
+# MarketRegime snapshot, against kline_replay_server.py running in-process
+# (no network needed). Checks the summary text is unchanged, then reads the
+# snapshot from many threads while the daemon timer refreshes it from the
+# streamed 1m rings.
+#
+#   python3 bench_market_regime.py --items 30 --threads 8
+
+import argparse
+import os
+import socket
+import threading
+import time
+
+
+def legacy_market_change_summary(client):
+    """get_market_change_summary before the snapshot: two REST downloads per call."""
+    summary = []
+    for symbol in ["BTCUSDT", "ETHUSDT"]:
+        data = client.get("/fapi/v1/klines", params={"symbol": symbol, "interval": "1m", "limit": 61})
+        price_now, price_1h_ago = float(data[-1][4]), float(data[0][4])
+        summary.append(f"{symbol.replace('USDT','')}: {(price_now - price_1h_ago) / price_1h_ago * 100:+.1f}%")
+    return ", ".join(summary)
+
+
+def wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Market regime snapshot vs per-call REST")
+    parser.add_argument("--items", type=int, default=30)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0, help="concurrent read phase")
+    args = parser.parse_args()
+
+    # The shared client and stream URL are read from the environment at
+    # import time, so point them at a free local port first
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    os.environ["BINANCE_FAPI_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["BINANCE_FSTREAM_URL"] = f"ws://127.0.0.1:{port}"
+
+    import numpy as np
+    from binance_client import binance
+    from kline_replay_server import ReplayMarket, start_replay_server
+    from market_data import start_market_data
+    from market_regime import MarketRegime, REGIME_SYMBOLS
+    import technical_indicators
+
+    market = ReplayMarket(REGIME_SYMBOLS, interval="1m", history=1500)
+    server = start_replay_server(market, port=port, rate=20)
+
+    # Same frozen tape for both, so the text must match
+    market.running.clear()
+    time.sleep(0.3)
+    requests_before = binance.stats["requests"]
+    started = time.perf_counter()
+    legacy = [legacy_market_change_summary(binance) for _ in range(args.items)]
+    legacy_seconds = time.perf_counter() - started
+    legacy_requests = binance.stats["requests"] - requests_before
+
+    requests_before = binance.stats["requests"]
+    started = time.perf_counter()
+    current = [technical_indicators.get_market_change_summary() for _ in range(args.items)]
+    snapshot_seconds = time.perf_counter() - started
+    snapshot_requests = binance.stats["requests"] - requests_before
+    market.running.set()
+
+    print(f"📏 {args.items} uncached items, majors {', '.join(REGIME_SYMBOLS)}")
+    print(f"per-call REST  {1e3 * legacy_seconds:8.1f}ms  ({legacy_requests} HTTP calls)")
+    print(f"snapshot       {1e3 * snapshot_seconds:8.1f}ms  ({snapshot_requests} HTTP calls, first item refreshes)")
+    print(f"🔍 summary text identical: {sum(a == b for a, b in zip(legacy, current))}/{args.items} ({current[0]})")
+
+    # Daemon mode: the timer refreshes from the stream, readers never wait
+    service = start_market_data(REGIME_SYMBOLS)
+    if not wait_for(lambda: service.synced and service.stats["messages"] > 0):
+        print("❌ Stream never became ready")
+        return
+    regime = MarketRegime(ttl=1.0).start()
+    wait_for(lambda: regime.stats["refreshes"] > 0)
+    requests_before = binance.stats["requests"]
+    latencies = [[] for _ in range(args.threads)]
+    stop = threading.Event()
+
+    def reader(out):
+        # Classification calls read between other work, not in a tight loop
+        while not stop.wait(0.001):
+            started = time.perf_counter()
+            regime.get()
+            out.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=reader, args=(out,)) for out in latencies]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    reads = np.concatenate([np.array(out) for out in latencies]) * 1e6
+    snapshot = regime.current
+    btc = snapshot["symbols"]["BTCUSDT"]
+    print(f"🧵 {len(reads)} reads from {args.threads} threads during {regime.stats['refreshes']} timer refreshes "
+          f"({regime.stats['from_stream']} from the stream, {binance.stats['requests'] - requests_before} HTTP calls): "
+          f"p50 {np.percentile(reads, 50):.1f}µs, p99 {np.percentile(reads, 99):.1f}µs, max {reads.max():.0f}µs")
+    print(f"🧭 BTC 1h {btc['change_1h']:+.2f}% 4h {btc['change_4h']:+.2f}% 24h {btc['change_24h']:+.2f}%, "
+          f"realized vol {btc['volatility_24h']:.2f}%, dominance {snapshot['btc_dominance']:.1f}%")
+    print(f"⚡ {legacy_requests} → {snapshot_requests} HTTP calls for the burst, "
+          f"{legacy_seconds / snapshot_seconds:.1f}x less time")
+    service.stop()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# bench_ticker_index.py
+# Compare the compiled TickerIndex with the two title matchers it replaced,
+# on a synthetic headline corpus with known answers (no network needed).
+# Coins whose alias is an everyday word (COMMON_WORDS, CASHTAG_ONLY) only
+# match in some forms, so their recall is reported separately, per form.
+#
+#   python3 bench_ticker_index.py --headlines 100000
+
+import argparse
+import json
+import random
+import re
+import time
+
+from symbol_map import symbol_map
+from ticker_index import TickerIndex, COMMON_WORDS, CASHTAG_ONLY
+
+# Headlines that name one coin; {coin} is filled with one of its aliases
+COIN_TEMPLATES = [
+    "{coin} jumps {n}% as ETF inflows accelerate",
+    "{coin} slides {n}% after exchange outage",
+    "Whales move {n}M {coin} to exchanges ahead of unlock",
+    "Analysts say {coin} could retest highs in {month}",
+    "Open interest in {coin} futures hits record",
+    "{coin} network upgrade goes live, fees drop {n}%",
+    "Why is {coin} price up today?",
+]
+# Headlines with no coin at all, several of them full of ticker-shaped words
+NOISE_TEMPLATES = [
+    "Senate passes the CLARITY Act in late vote",
+    "Gas prices fall as the Fed holds rates for {month}",
+    "Trump signs executive order on tariffs",
+    "Open interest hits record high across crypto derivatives",
+    "The market shrugs off jobs data, stocks rally {n}%",
+    "People's Bank of China injects {n}B in liquidity",
+    "IMPACT of new stablecoin rules on exchanges",
+    "Top {n} memecoins to watch this weekend",
+    "Crypto funds see {n}th week of outflows",
+    "SEC delays decision on spot ETF applications",
+    "Market makers move to safe havens as volatility spikes",
+    "New ATH for gold as dollar weakens",
+]
+MONTHS = ["January", "March", "June", "September", "December"]
+NAMES = {"BITCOIN": "Bitcoin", "ETHEREUM": "Ethereum", "SHIBA INU": "Shiba Inu", "DOGECOIN": "Dogecoin",
+         "RIPPLE": "Ripple"}
+
+
+# === The matchers TickerIndex replaced ===
+
+def legacy_main_match(title):
+    """main.get_symbol_for_title before the index: regex word split + full map scan."""
+    title_words = set(re.findall(r'\b[A-Z0-9]{2,12}\b', title.upper()))
+    for token, symbol in symbol_map.items():
+        if token.upper() in title_words:
+            return symbol
+    return None
+
+
+_SERIALIZED = json.dumps(symbol_map)
+
+
+def legacy_utils_match(title):
+    """symbol_utils.get_symbol_for_title before the index: reload map + raw substring test."""
+    title = title.upper()
+    current = json.loads(_SERIALIZED)   # stands in for re-reading symbol_map.json
+    for keyword, symbol in current.items():
+        if keyword in title:
+            return symbol
+    return None
+
+
+# How a headline writes a coin whose alias is an everyday word
+AMBIGUOUS_FORMS = {
+    "cashtag": lambda alias: "$" + alias,
+    "capitals": lambda alias: alias,
+    "name": lambda alias: alias.title() + " token",   # "Near token", "Trump token"
+    "word": lambda alias: alias.title(),
+}
+
+
+def make_corpus(count, seed=7, ambiguous_share=0.2):
+    """(title, symbol or None, form) triples; form names how an ambiguous alias was written."""
+    rng = random.Random(seed)
+    coins, ambiguous = [], []
+    for alias, symbol in symbol_map.items():
+        if alias.isascii():
+            (ambiguous if alias in COMMON_WORDS or alias in CASHTAG_ONLY else coins).append((alias, symbol))
+    corpus = []
+    for _ in range(count):
+        fill = {"n": rng.randint(2, 90), "month": rng.choice(MONTHS)}
+        roll = rng.random()
+        if roll < 0.4:
+            corpus.append((rng.choice(NOISE_TEMPLATES).format(**fill), None, None))
+            continue
+        if roll < 0.4 + ambiguous_share:
+            alias, symbol = rng.choice(ambiguous)
+            form = rng.choice(list(AMBIGUOUS_FORMS))
+            coin = AMBIGUOUS_FORMS[form](alias)
+            corpus.append((rng.choice(COIN_TEMPLATES).format(coin=coin, **fill), symbol, form))
+            continue
+        alias, symbol = rng.choice(coins)
+        if alias in NAMES:
+            coin = NAMES[alias]
+        elif rng.random() < 0.15:
+            coin = "$" + alias
+        else:
+            coin = alias
+        corpus.append((rng.choice(COIN_TEMPLATES).format(coin=coin, **fill), symbol, None))
+    return corpus
+
+
+def run(label, match, corpus):
+    started = time.perf_counter()
+    predictions = [match(title) for title, _, _ in corpus]
+    elapsed = time.perf_counter() - started
+
+    correct = false_positives = misses = 0
+    hits = {form: [0, 0] for form in AMBIGUOUS_FORMS}   # form -> [correct, headlines]
+    for (_, truth, form), predicted in zip(corpus, predictions):
+        if predicted == truth:
+            correct += 1
+        elif predicted is None:
+            misses += 1
+        else:
+            false_positives += 1
+        if form:
+            hits[form][0] += predicted == truth
+            hits[form][1] += 1
+    print(
+        f"{label:<22} {elapsed:7.2f}s  {1e6 * elapsed / len(corpus):7.1f}µs/title  "
+        f"correct {correct / len(corpus):6.1%}  false positives {false_positives:>6}  misses {misses:>6}"
+    )
+    print(f"{'':<22} everyday-word coins: " + "  ".join(
+        f"{form} {right / max(1, total):6.1%}" for form, (right, total) in hits.items()
+    ))
+    return elapsed, false_positives
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ticker matcher benchmark")
+    parser.add_argument("--headlines", type=int, default=100000)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.headlines)
+    ambiguous = sum(1 for _, _, form in corpus if form)
+    print(f"📏 {len(corpus)} headlines ({ambiguous} naming an everyday-word coin), {len(symbol_map)} symbol_map aliases")
+
+    started = time.perf_counter()
+    index = TickerIndex(symbol_map)
+    print(f"🔨 TickerIndex built in {1000 * (time.perf_counter() - started):.1f}ms ({len(index.goto)} states)")
+
+    utils = run("symbol_utils (old)", legacy_utils_match, corpus)
+    legacy = run("main regex scan (old)", legacy_main_match, corpus)
+    indexed = run("TickerIndex", index.first, corpus)
+
+    print(
+        f"⚡ {legacy[0] / indexed[0]:.1f}x faster than the regex scan, "
+        f"{utils[0] / indexed[0]:.1f}x faster than symbol_utils; "
+        f"false positives {legacy[1]} → {indexed[1]}"
+    )
+
+
+if __name__ == "__main__":
+    main()
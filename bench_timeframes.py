@@ -0,0 +1,183 @@
+# bench_timeframes.py
+# The 5m/15m/1h/4h rings market_data.py derives from its 1m stream, against
+# kline_replay_server.py running in-process (no network needed): every
+# derived bar must equal a pandas resample of the 1m tape, and the derived
+# 5m/15m indicators agree with the REST path's (its RSI only up to what its
+# shorter Wilder warm-up allows). Also counts the HTTP calls and time
+# one news item's market context (5m indicators, higher-timeframe context,
+# BTC/ETH 1h change) costs over REST versus from memory, and that a dropped
+# stream is recovered without downloading the higher timeframes again.
+#
+#   python3 bench_timeframes.py --symbols 10 --seconds 8
+
+import argparse
+import os
+import socket
+import time
+
+import pandas as pd
+
+
+def wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def pandas_bars(rows, frame):
+    """Reference bars: the 1m REST rows resampled with pandas."""
+    df = pd.DataFrame([[int(row[0])] + [float(value) for value in row[1:6]] for row in rows],
+                      columns=["open_time", "open", "high", "low", "close", "volume"])
+    df.index = pd.to_datetime(df["open_time"], unit="ms")
+    rule = frame.replace("m", "min")
+    bars = df.resample(rule, origin="epoch").agg(
+        {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    ).dropna()
+    # Like the service, skip a leading bar that starts mid-way
+    if len(bars) and bars.index[0] != df.index[0]:
+        bars = bars.iloc[1:]
+    bars.index = (bars.index - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)
+    return bars
+
+
+def rsi_tolerance(bars):
+    """
+    How far the REST path's RSI may sit from the stream's: Wilder smoothing
+    keeps (13/14)^k of its seed after k bars, at most 100 points off when
+    the two sides were seeded from different history, plus the 0.1 rounding.
+    """
+    from indicator_engine import RSI_PERIOD
+    return 0.1 + 100 * ((RSI_PERIOD - 1) / RSI_PERIOD) ** max(0, bars - RSI_PERIOD)
+
+
+def indicators_agree(streamed, rest, rest_before, tolerance):
+    """MA and volume exactly, RSI within `tolerance`; its label and trend
+    only where the RSI isn't within `tolerance` of deciding them."""
+    if streamed is None or rest is None:
+        return streamed is rest
+    if streamed["ma_crossover"] != rest["ma_crossover"] or streamed["volume_spike"] != rest["volume_spike"]:
+        return False
+    if abs(streamed["rsi"] - rest["rsi"]) > tolerance:
+        return False
+    if streamed["rsi_label"] != rest["rsi_label"] and min(abs(rest["rsi"] - 30), abs(rest["rsi"] - 70)) > tolerance:
+        return False
+    moved = abs(rest["rsi"] - rest_before["rsi"]) if rest_before else 0.0
+    return streamed["rsi_trend"] == rest["rsi_trend"] or moved <= 2 * tolerance
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Derived timeframe parity and cost")
+    parser.add_argument("--symbols", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=8.0, help="how long to stream before comparing")
+    parser.add_argument("--rate", type=float, default=100.0, help="replay ticks per second")
+    args = parser.parse_args()
+
+    # The shared client and stream URL are read from the environment at
+    # import time, so point them at a free local port first
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    os.environ["BINANCE_FAPI_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["BINANCE_FSTREAM_URL"] = f"ws://127.0.0.1:{port}"
+
+    import numpy as np
+    import technical_indicators
+    from binance_client import binance
+    from indicator_engine import indicators_from_series
+    from kline_replay_server import ReplayMarket, start_replay_server
+    from market_data import start_market_data
+
+    symbols = ["BTCUSDT", "ETHUSDT"] + [f"SYM{i}USDT" for i in range(args.symbols - 2)]
+    # Two ticks per 1m candle: an hour of tape every 0.6s at the default rate
+    market = ReplayMarket(symbols, interval="1m", history=6000, ticks_per_candle=2)
+    server = start_replay_server(market, port=port, rate=args.rate)
+
+    def market_context(symbol):
+        technicals = technical_indicators.get_technical_indicators(symbol)
+        return technicals, technical_indicators.get_market_change_summary()
+
+    # REST: 5m indicators + BTC/ETH 1h change, and the higher timeframes
+    # would be one more download each
+    calls = 50
+    requests_before = binance.stats["requests"]
+    started = time.perf_counter()
+    for i in range(calls):
+        market_context(symbols[i % len(symbols)])
+        for frame in technical_indicators.CONTEXT_FRAMES:
+            technical_indicators.fetch_ohlcv(symbols[i % len(symbols)], interval=frame, limit=300)
+    rest = (time.perf_counter() - started) / calls
+    rest_requests = (binance.stats["requests"] - requests_before) / calls
+
+    service = start_market_data(symbols)
+    if not wait_for(lambda: service.synced and service.stats["messages"] > 0):
+        print("❌ Stream never became ready")
+        return
+    print(f"📏 {len(symbols)} symbols, 1m streamed, {', '.join(service.frames)} derived; "
+          f"{service.stats['frame_backfills']} timeframe downloads on connect")
+    time.sleep(args.seconds)
+
+    requests_before = binance.stats["requests"]
+    started = time.perf_counter()
+    for i in range(calls * 20):
+        technicals, _ = market_context(symbols[i % len(symbols)])
+    memory = (time.perf_counter() - started) / (calls * 20)
+    memory_requests = (binance.stats["requests"] - requests_before) / (calls * 20)
+    print(f"REST      {1e3 * rest:8.2f}ms per news item  ({rest_requests:.0f} HTTP calls)")
+    print(f"in memory {1e3 * memory:8.3f}ms per news item  ({memory_requests:.0f} HTTP calls, "
+          f"context for {', '.join(technicals.get('timeframes', {})) or 'no timeframe yet'})")
+
+    # Drop the stream: the reconnect re-derives every timeframe from the
+    # fresh 1m backfill and should reuse the older bars it already holds
+    downloads, connects = service.stats["frame_backfills"], service.stats["connects"]
+    server.drop_connections()
+    if not wait_for(lambda: service.stats["connects"] > connects and service.synced > connects):
+        print("❌ No reconnect after the drop")
+    time.sleep(1)
+    print(f"🔌 Reconnected with {service.stats['frame_backfills'] - downloads} timeframe downloads")
+
+    # Freeze the tape, let in-flight frames land, then compare
+    market.running.clear()
+    time.sleep(0.5)
+    minutes = service.stats["messages"] // len(symbols) // market.ticks_per_candle
+    bars_checked = bars_matched = indicators_checked = indicators_matched = 0
+    tolerance = max_rsi_delta = 0.0
+    for symbol in symbols:
+        rows = market.klines(symbol, len(market.candles[symbol]))
+        for frame in service.frames:
+            reference = pandas_bars(rows, frame)
+            window = service.klines(symbol, service.frame_ring_size, frame)
+            if window is None:
+                continue
+            derived = np.column_stack([window[k] for k in ("open", "high", "low", "close", "volume")])
+            expected = reference.loc[reference.index.isin(window["open_time"])].to_numpy()
+            bars_checked += len(derived)
+            if len(expected) == len(derived):
+                bars_matched += int(np.sum(np.all(np.isclose(derived, expected, rtol=1e-9, atol=1e-6), axis=1)))
+            if frame in ("5m", "15m"):
+                tail = reference.iloc[-(technical_indicators.OHLCV_LIMIT + technical_indicators.RSI_WARMUP):]
+                closes, volumes = tail["close"].to_numpy(), tail["volume"].to_numpy()
+                rest_result = indicators_from_series(closes, volumes)
+                rest_before = indicators_from_series(closes[:-1], volumes[:-1])
+                streamed = service.indicators(symbol, frame)
+                tolerance = max(tolerance, rsi_tolerance(len(tail)))
+                indicators_checked += 1
+                indicators_matched += indicators_agree(streamed, rest_result, rest_before, rsi_tolerance(len(tail)))
+                if streamed and rest_result:
+                    max_rsi_delta = max(max_rsi_delta, abs(streamed["rsi"] - rest_result["rsi"]))
+    market.running.set()
+
+    print(f"🔍 {bars_matched}/{bars_checked} derived bars identical to a pandas resample of the 1m tape "
+          f"(after ~{minutes} streamed minutes)")
+    print(f"🔍 {indicators_matched}/{indicators_checked} derived 5m/15m indicator sets agree with the REST path "
+          f"(MA and volume exact, RSI within {tolerance:.2f}: max |ΔRSI| {max_rsi_delta:.2f})")
+    print(f"⚡ {rest / memory:.0f}x faster, {rest_requests:.0f} → {memory_requests:.0f} HTTP calls per news item")
+    service.print_stats()
+    service.stop()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
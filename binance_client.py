@@ -0,0 +1,176 @@
+# binance_client.py
+# One pooled, keep-alive HTTP session for all Binance Futures REST calls, with
+# per-endpoint timeouts, retries, and request-weight accounting from the
+# X-MBX-USED-WEIGHT-1M header, so we slow down before Binance returns 429/418.
+
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BINANCE_FAPI_URL = os.getenv("BINANCE_FAPI_URL", "https://fapi.binance.com")
+BINANCE_POOL_SIZE = int(os.getenv("BINANCE_POOL_SIZE", "16"))
+BINANCE_MAX_RETRIES = int(os.getenv("BINANCE_MAX_RETRIES", "3"))
+BINANCE_WEIGHT_LIMIT = int(os.getenv("BINANCE_WEIGHT_LIMIT", "2400"))          # per minute (fapi default)
+BINANCE_WEIGHT_HEADROOM = float(os.getenv("BINANCE_WEIGHT_HEADROOM", "0.8"))   # throttle past this share
+
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 10.0
+
+# (connect, read) seconds
+TIMEOUTS = {
+    "/fapi/v1/ticker/price": (3, 5),
+    "/fapi/v1/klines": (3, 10),
+    "/fapi/v1/ticker/24hr": (3, 20),
+    "/fapi/v1/exchangeInfo": (3, 20),
+}
+DEFAULT_TIMEOUT = (3, 10)
+
+
+def request_weight(path, params):
+    """Binance's documented weight for the endpoints we use."""
+    params = params or {}
+    if path == "/fapi/v1/klines":
+        limit = int(params.get("limit", 500))
+        return 1 if limit < 100 else 2 if limit < 500 else 5 if limit <= 1000 else 10
+    if path == "/fapi/v1/ticker/price":
+        return 1 if "symbol" in params else 2
+    if path == "/fapi/v1/ticker/24hr":
+        return 1 if "symbol" in params else 40
+    return 1
+
+
+class WeightTracker:
+    """
+    Mirrors Binance's per-minute weight window. Our own estimate is added
+    before each call and replaced by the server's figure afterwards; callers
+    that would push the window past the headroom wait for the next minute.
+    """
+
+    def __init__(self, limit=BINANCE_WEIGHT_LIMIT, headroom=BINANCE_WEIGHT_HEADROOM):
+        self.budget = limit * headroom
+        self.window = None
+        self.used = 0
+        self.lock = threading.Lock()
+        self.banned_until = 0.0
+
+    def _roll(self, now):
+        window = int(now // 60)
+        if window != self.window:
+            self.window = window
+            self.used = 0
+
+    def acquire(self, weight, share=1.0):
+        """
+        Returns the seconds spent waiting. Background work (e.g. kline
+        backfills) passes share < 1 and only fills that part of the budget,
+        leaving the rest to calls something is waiting on.
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.time()
+                self._roll(now)
+                if now < self.banned_until:
+                    wait = self.banned_until - now
+                elif self.used + weight <= self.budget * share:
+                    self.used += weight
+                    return waited
+                else:
+                    wait = (self.window + 1) * 60 - now
+            time.sleep(wait)
+            waited += wait
+
+    def observe(self, used_weight):
+        with self.lock:
+            self._roll(time.time())
+            self.used = max(self.used, used_weight)
+
+    def back_off(self, seconds):
+        with self.lock:
+            self.banned_until = max(self.banned_until, time.time() + seconds)
+
+
+class BinanceClient:
+    def __init__(self, base_url=BINANCE_FAPI_URL, pool_size=BINANCE_POOL_SIZE,
+                 max_retries=BINANCE_MAX_RETRIES, weights=None):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.weights = weights or WeightTracker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "throttled_seconds": 0.0, "peak_weight": 0}
+
+    def _count(self, **deltas):
+        with self.stats_lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    def get(self, path, params=None, retries=None, share=1.0):
+        """
+        GET a /fapi path and return the decoded JSON. Connection errors,
+        timeouts, 5xx and 429/418 are retried with backoff (honouring
+        Retry-After); anything else raises requests.HTTPError at once.
+        `share` caps the part of the weight budget the call may use (see
+        WeightTracker.acquire).
+        """
+        retries = self.max_retries if retries is None else retries
+        weight = request_weight(path, params)
+        timeout = TIMEOUTS.get(path, DEFAULT_TIMEOUT)
+
+        for attempt in range(retries + 1):
+            waited = self.weights.acquire(weight, share)
+            if waited:
+                self._count(throttled_seconds=waited)
+            self._count(requests=1)
+            try:
+                response = self.session.get(self.base_url + path, params=params, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == retries:
+                    self._count(failures=1)
+                    raise
+                self._count(retries=1)
+                time.sleep(random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+                continue
+
+            used = response.headers.get("X-MBX-USED-WEIGHT-1M") or response.headers.get("X-MBX-USED-WEIGHT")
+            if used and used.isdigit():
+                self.weights.observe(int(used))
+                with self.stats_lock:
+                    self.stats["peak_weight"] = max(self.stats["peak_weight"], int(used))
+
+            if response.status_code in (418, 429):
+                retry_after = response.headers.get("Retry-After")
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else 60.0
+                print(f"🚧 Binance {response.status_code} on {path} — backing off {delay:.0f}s")
+                self.weights.back_off(delay)
+            elif response.status_code < 500:
+                if not response.ok:
+                    self._count(failures=1)
+                response.raise_for_status()
+                return response.json()
+
+            if attempt == retries:
+                self._count(failures=1)
+                response.raise_for_status()
+            self._count(retries=1)
+            if response.status_code >= 500:
+                time.sleep(random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+
+    def print_stats(self):
+        with self.stats_lock:
+            s = dict(self.stats)
+        print(
+            f"📡 Binance: {s['requests']} requests, {s['retries']} retries, {s['failures']} failed, "
+            f"peak weight {s['peak_weight']}/{BINANCE_WEIGHT_LIMIT}, throttled {s['throttled_seconds']:.1f}s"
+        )
+
+
+# Shared by every module in the process
+binance = BinanceClient()
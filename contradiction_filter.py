@@ -1,31 +1,179 @@
 # contradiction_filter.py
+# Has another signal for the same asset gone out in the last
+# TIME_WINDOW_MINUTES? Answered from an in-memory index: a deque of
+# (timestamp, signal) per asset, built from the tail of the signal log on
+# first use and kept current by main.log_to_csv() calling record_signal()
+# (which reads just the appended row), so a check costs O(signals in the window) rather than a parse of the
+# whole log. Rows appended by anyone else are read on the next check, and a
+# replaced or truncated log is re-indexed.
 
 import csv
+import io
+import os
+import re
+import threading
+from collections import defaultdict, deque
 from datetime import datetime, timedelta
 
 SIGNAL_LOG = "signals_log.csv"
 TIME_WINDOW_MINUTES = 60  # How far back to look for conflicting signals
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+TAIL_BLOCK = 1 << 16   # bytes read backwards at a time when indexing the log tail
+KEEP_EXTRA_MINUTES = 5   # held past the window, so checks a little in the past stay indexed
+# A row starts on a new line with its timestamp; quoted headlines can hold
+# newlines but not one followed by a timestamp and a comma
+ROW_START = re.compile(rb"\n(?=\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,)")
+
+
+class SignalWindow:
+    def __init__(self, path=SIGNAL_LOG, window_minutes=TIME_WINDOW_MINUTES):
+        self.path = path
+        self.window = timedelta(minutes=window_minutes)
+        self.keep = self.window + timedelta(minutes=KEEP_EXTRA_MINUTES)
+        self.lock = threading.Lock()
+        self.recent = defaultdict(deque)   # asset -> (timestamp, signal), oldest first
+        self.inode = None
+        self.offset = 0         # bytes of the log indexed so far
+        self.last_bytes = b""   # the bytes just before offset, to spot a rewritten log
+        self.columns = None     # (timestamp, asset, signal) positions in a row
+        self.complete_from = None   # every signal at or after this is in `recent`
+        self.stats = {"checks": 0, "rebuilds": 0, "rows_read": 0, "full_scans": 0}
+
+    def _sync(self, now):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self.recent.clear()
+            self.inode, self.offset, self.complete_from = None, 0, None
+            return
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            self._rebuild(st, now)
+        elif st.st_size > self.offset:
+            # update_prices.py rewrites the log in place; appends leave what
+            # was indexed untouched
+            with open(self.path, "rb") as f:
+                f.seek(self.offset - len(self.last_bytes))
+                unchanged = f.read(len(self.last_bytes)) == self.last_bytes
+            if unchanged:
+                self._read(self.offset, st.st_size)
+            else:
+                self._rebuild(st, now)
+
+    def _rebuild(self, st, now):
+        self.stats["rebuilds"] += 1
+        self.recent.clear()
+        self.inode, self.offset, self.columns, self.last_bytes = st.st_ino, 0, None, b""
+        with open(self.path, "rb") as f:
+            header = f.readline()
+            try:
+                names = next(csv.reader([header.decode("utf-8")]))
+                self.columns = (names.index("Timestamp"), names.index("Asset"), names.index("Signal"))
+            except (StopIteration, ValueError, UnicodeDecodeError):
+                self.offset, self.last_bytes = st.st_size, b""   # not a signal log: nothing to index
+                self.complete_from = now - self.keep
+                return
+
+            # Walk back from the end until a block starts before what we keep
+            cutoff = (now - self.keep).strftime(TIMESTAMP_FORMAT).encode()
+            start = st.st_size
+            while start > len(header):
+                start = max(len(header), start - TAIL_BLOCK)
+                f.seek(start - 1)
+                block = f.read(min(TAIL_BLOCK, st.st_size - start) + 1)
+                match = ROW_START.search(block)
+                if match and block[match.end():match.end() + 19] < cutoff:
+                    start += match.end() - 1
+                    break
+        self._read(max(start, len(header)), st.st_size)
+        self.complete_from = now - self.keep
+
+    def _read(self, start, end):
+        """Index the complete rows in bytes [start, end) of the log."""
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        data = data[:data.rfind(b"\n") + 1]   # a row still being written waits
+        self.offset = start + len(data)
+        self.last_bytes = (self.last_bytes + data)[-64:]
+        if not data or self.columns is None:
+            return
+        ts_col, asset_col, signal_col = self.columns
+        for row in csv.reader(io.StringIO(data.decode("utf-8", errors="replace"), newline="")):
+            self.stats["rows_read"] += 1
+            try:
+                ts = datetime.strptime(row[ts_col], TIMESTAMP_FORMAT)
+            except (IndexError, ValueError):
+                continue
+            self.recent[row[asset_col]].append((ts, row[signal_col].upper()))
+
+    def record(self):
+        """Index the row(s) just appended to the log."""
+        with self.lock:
+            self._sync(datetime.utcnow())
+
+    def signals(self, asset, now_utc):
+        """Signals for `asset` logged within the window before `now_utc`
+        (or after it), or None when the index doesn't reach back that far
+        (counted as a full scan: the caller reads the whole log instead)."""
+        with self.lock:
+            self.stats["checks"] += 1
+            now = datetime.utcnow()
+            self._sync(now)
+            if self.complete_from is None:
+                return []   # no log
+            cutoff = now_utc - self.window
+            if cutoff < self.complete_from:
+                self.stats["full_scans"] += 1
+                return None
+            entries = self.recent.get(asset)
+            if not entries:
+                return []
+            stale = now - self.keep
+            while entries and entries[0][0] < stale:
+                entries.popleft()
+            if stale > self.complete_from:
+                self.complete_from = stale
+            return [signal for ts, signal in entries if ts >= cutoff]
+
+
+_window = SignalWindow()
+
+
+def record_signal():
+    """Called by main.log_to_csv() after appending a signal row."""
+    try:
+        _window.record()
+    except Exception as e:
+        print(f"❌ Contradiction index update failed: {e}")
+
+
+def _scan_log(asset, now_utc):
+    # The whole log, for windows older than the index covers
+    signals = []
+    with open(SIGNAL_LOG, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            if row["Asset"] != asset or not row["Timestamp"]:
+                continue
+
+            try:
+                ts = datetime.strptime(row["Timestamp"], TIMESTAMP_FORMAT)
+            except:
+                continue
+
+            if now_utc - ts <= timedelta(minutes=TIME_WINDOW_MINUTES):
+                signals.append(row["Signal"].upper())
+    return signals
+
 
 def has_contradiction(asset, current_signal, now_utc=None):
     if not now_utc:
         now_utc = datetime.utcnow()
 
-    signals = []
-
     try:
-        with open(SIGNAL_LOG, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row["Asset"] != asset or not row["Timestamp"]:
-                    continue
-
-                try:
-                    ts = datetime.strptime(row["Timestamp"], "%Y-%m-%d %H:%M:%S")
-                except:
-                    continue
-
-                if now_utc - ts <= timedelta(minutes=TIME_WINDOW_MINUTES):
-                    signals.append(row["Signal"].upper())
+        signals = _window.signals(asset, now_utc)
+        if signals is None:
+            signals = _scan_log(asset, now_utc)
     except:
         return False  # If log is missing, allow through
 
@@ -33,4 +181,4 @@ def has_contradiction(asset, current_signal, now_utc=None):
     if len(signal_set) > 1:
         return True  # Conflict exists
 
-    return False
\ No newline at end of file
+    return False
@@ -0,0 +1,300 @@
+# entity_index.py
+# The one table of what we know about each futures contract: the surface
+# forms a headline may use for it, its base token, sector and 24h volume
+# rank. symbol_map_updater.py writes it as a versioned array artifact
+# (symbol_index.npz); everything else (ticker matching, the context check,
+# sectors, volume guards) reads it through get_entity_index(), which
+# hot-reloads it when the file changes.
+
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from ticker_index import TickerIndex
+
+INDEX_FILE = "symbol_index.npz"
+INDEX_VERSION = 1
+RELOAD_CHECK_SECONDS = float(os.getenv("SYMBOL_INDEX_RELOAD_SECONDS", "5"))
+TOP_VOLUME_COUNT = 50
+MIN_BASE_LENGTH = 3   # shorter bases ("OP") match too much English
+
+# Surface forms beyond the base asset itself, keyed by Binance base asset
+ALIASES = {
+    "BTC": ["BITCOIN"],
+    "ETH": ["ETHEREUM"],
+    "XRP": ["RIPPLE"],
+    "DOGE": ["DOGECOIN"],
+    "1000SHIB": ["SHIB", "SHIBA", "SHIBA INU"],
+    "1000PEPE": ["PEPE", "PEPECOIN"],
+    "1000BONK": ["BONK"],
+    "1000FLOKI": ["FLOKI"],
+    "ADA": ["CARDANO"],
+    "SOL": ["SOLANA"],
+    "BNB": ["BINANCE COIN", "BSC"],
+    "DOT": ["POLKADOT"],
+    "LTC": ["LITECOIN"],
+    "AVAX": ["AVALANCHE"],
+    "MATIC": ["POLYGON"],
+}
+
+# Narrative sectors, keyed by base token (multiplier prefix stripped)
+SECTORS = {
+    "FET": "AI",
+    "RNDR": "AI",
+    "AGIX": "AI",
+    "OCEAN": "AI",
+    "NEAR": "Layer 1",
+    "AVAX": "Layer 1",
+    "SOL": "Layer 1",
+    "ADA": "Layer 1",
+    "DOT": "Layer 1",
+    "INJ": "Layer 1",
+    "DOGE": "Memecoin",
+    "SHIB": "Memecoin",
+    "FLOKI": "Memecoin",
+    "BONK": "Memecoin",
+    "PEPE": "Memecoin",
+    "XMR": "Privacy",
+    "DASH": "Privacy",
+    "DUSK": "Privacy",
+    "LINK": "Oracles",
+    "BAND": "Oracles",
+    "ATOM": "Cosmos",
+    "TIA": "Cosmos",
+    "JUNO": "Cosmos",
+    "UNI": "DEX",
+    "SUSHI": "DEX",
+    "DYDX": "DEX",
+    "GMX": "DEX",
+    "MATIC": "Scaling",
+    "OP": "Scaling",
+    "ARB": "Scaling",
+    "ETH": "Ethereum",
+    "BTC": "Bitcoin",
+    "BNB": "BNB Chain",
+}
+
+# Used when neither the generated file nor the exchange is reachable
+FALLBACK_BASES = [
+    "BTC", "ETH", "SOL", "BNB", "ADA", "DOGE", "XRP", "AVAX", "DOT", "MATIC", "LTC", "LINK",
+    "UNI", "SHIB", "PEPE", "ARB", "OP", "APT", "SUI", "RNDR", "FET", "INJ", "NEAR", "GRT",
+    "IMX", "FIL", "STX", "TON",
+]
+
+_MULTIPLIER_RE = re.compile(r"^(1000000|1000|1M)(?=[A-Z]{2})")
+
+
+def base_token(base_asset):
+    """1000SHIB -> SHIB, 1MBABYDOGE -> BABYDOGE, BTC -> BTC."""
+    return _MULTIPLIER_RE.sub("", base_asset.upper())
+
+
+def build_entities(contracts, volume_ranking=()):
+    """
+    contracts: (symbol, base_asset) pairs for USDT perpetuals.
+    volume_ranking: symbols sorted by 24h quote volume, highest first.
+    Returns {symbol: {"base", "aliases", "sector", "volume_rank"}}.
+    """
+    ranks = {symbol: i + 1 for i, symbol in enumerate(volume_ranking)}
+    entities = {}
+    for symbol, base_asset in contracts:
+        base_asset = base_asset.upper()
+        token = base_token(base_asset)
+        aliases = [base_asset] if len(base_asset) >= MIN_BASE_LENGTH else []
+        aliases += [alias for alias in ALIASES.get(base_asset, []) if alias not in aliases]
+        entities[symbol] = {
+            "base": token,
+            "aliases": aliases,
+            "sector": SECTORS.get(token),
+            "volume_rank": ranks.get(symbol),
+        }
+    return entities
+
+
+def surface_map(entities):
+    """{surface form: symbol}. A base asset keeps the first contract that
+    lists it; explicit aliases always win (1000SHIBUSDT owns "SHIB")."""
+    forms = {}
+    for symbol, entity in entities.items():
+        for alias in entity["aliases"]:
+            if alias != symbol[:-4] or alias not in forms:
+                forms[alias] = symbol
+    return forms
+
+
+def to_arrays(entities):
+    """
+    The artifact layout: symbols sorted, with base token, sector and volume
+    rank in aligned arrays; top-volume flags and the surface-form table
+    (sorted forms -> symbol position) precomputed.
+    """
+    symbols = sorted(entities)
+    position = {symbol: i for i, symbol in enumerate(symbols)}
+    forms = sorted(surface_map(entities).items())
+    ranks = [entities[symbol]["volume_rank"] or 0 for symbol in symbols]
+    return {
+        "format_version": np.int32(INDEX_VERSION),
+        "generated_at": np.float64(time.time()),
+        "symbols": np.array(symbols, dtype=str),
+        "bases": np.array([entities[symbol]["base"] for symbol in symbols], dtype=str),
+        "sectors": np.array([entities[symbol]["sector"] or "" for symbol in symbols], dtype=str),
+        "volume_rank": np.array(ranks, dtype=np.int32),
+        "top_volume": np.array([0 < rank <= TOP_VOLUME_COUNT for rank in ranks], dtype=bool),
+        "forms": np.array([form for form, _ in forms], dtype=str),
+        "form_symbol": np.array([position[symbol] for _, symbol in forms], dtype=np.int32),
+    }
+
+
+def write_arrays(arrays, path=INDEX_FILE):
+    """Replaced atomically, so readers only ever see a complete file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def read_arrays(path=INDEX_FILE):
+    """The artifact's arrays, or None if it is missing, unreadable or another format version."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+    except Exception as e:
+        print(f"⚠️ Could not read {path}: {e}")
+        return None
+    if int(arrays["format_version"]) != INDEX_VERSION:
+        print(f"⚠️ {path} is format v{int(arrays['format_version'])}, expected v{INDEX_VERSION} — rerun symbol_map_updater.py")
+        return None
+    return arrays
+
+
+class EntityIndex:
+    """Read side of the artifact; symbol lookups are binary searches."""
+
+    def __init__(self, arrays):
+        self.version = int(arrays["format_version"])
+        self.generated_at = float(arrays["generated_at"])
+        self.symbols = arrays["symbols"]
+        self.bases = arrays["bases"]
+        self.sectors = arrays["sectors"]
+        self.volume_ranks = arrays["volume_rank"]
+        self.top_volume = arrays["top_volume"]
+        self.surface_map = dict(zip(arrays["forms"].tolist(), self.symbols[arrays["form_symbol"]].tolist()))
+        self.matcher = TickerIndex(self.surface_map)
+
+    def _position(self, symbol):
+        i = int(np.searchsorted(self.symbols, symbol))
+        if i < len(self.symbols) and self.symbols[i] == symbol:
+            return i
+        return None
+
+    def __contains__(self, symbol):
+        return self._position(symbol) is not None
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def find(self, text):
+        """Symbols mentioned in `text`, best first."""
+        return self.matcher.find(text)
+
+    def first(self, text):
+        return self.matcher.first(text)
+
+    def is_consistent(self, symbol, text):
+        """Does `text` mention `symbol` by one of its surface forms, under the
+        same word rules as title matching ("CLARITY ACT" is not ACTUSDT)?"""
+        return symbol in self and symbol in self.matcher.find(text)
+
+    def base(self, symbol):
+        i = self._position(symbol)
+        return str(self.bases[i]) if i is not None else None
+
+    def sector(self, symbol):
+        i = self._position(symbol)
+        if i is not None:
+            return str(self.sectors[i]) or None
+        return SECTORS.get(base_token(symbol[:-4] if symbol.endswith("USDT") else symbol))
+
+    def volume_rank(self, symbol):
+        i = self._position(symbol)
+        if i is None or not self.volume_ranks[i]:
+            return None
+        return int(self.volume_ranks[i])
+
+    def is_top_volume(self, symbol):
+        i = self._position(symbol)
+        return i is not None and bool(self.top_volume[i])
+
+    def top_volume_symbols(self):
+        """Top-volume contracts, highest 24h volume first."""
+        top = np.flatnonzero(self.top_volume)
+        return self.symbols[top[np.argsort(self.volume_ranks[top], kind="stable")]].tolist()
+
+
+def _seed_entities():
+    """Entities from the checked-in symbol_map.py snapshot, for a tree the
+    updater hasn't run in yet."""
+    try:
+        from symbol_map import symbol_map
+        contracts = sorted({(symbol, symbol[:-4]) for symbol in symbol_map.values()})
+    except ImportError:
+        contracts = [(f"{base}USDT", base) for base in FALLBACK_BASES]
+    ranking = []
+    if os.path.exists("top_volume_tickers.txt"):
+        with open("top_volume_tickers.txt") as f:
+            ranking = [line.strip() for line in f if line.strip()]
+    return build_entities(contracts, ranking)
+
+
+def _load(path):
+    arrays = read_arrays(path)
+    if arrays is None:
+        arrays = to_arrays(_seed_entities())
+    return EntityIndex(arrays)
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+_index = None
+_index_mtime = None
+_checked_at = 0.0
+_index_lock = threading.Lock()
+
+
+def get_entity_index():
+    """
+    Loaded on first use and shared by every module. The file's mtime is
+    checked at most every RELOAD_CHECK_SECONDS, so a running engine picks up
+    a new artifact from the updater without restarting.
+    """
+    global _index, _index_mtime, _checked_at
+    with _index_lock:
+        now = time.monotonic()
+        if _index is not None and now - _checked_at < RELOAD_CHECK_SECONDS:
+            return _index
+        _checked_at = now
+        mtime = _mtime(INDEX_FILE)
+        if _index is None or mtime != _index_mtime:
+            if _index is not None:
+                print(f"🔄 {INDEX_FILE} changed — reloading symbol index.")
+            _index = _load(INDEX_FILE)
+            _index_mtime = mtime
+        return _index
+
+
+def reload_entity_index():
+    """Force the next get_entity_index() to re-check the file."""
+    global _checked_at
+    with _index_lock:
+        _checked_at = 0.0
+    return get_entity_index()
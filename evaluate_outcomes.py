@@ -0,0 +1,127 @@
+# evaluate_outcomes.py
+# Multi-horizon outcomes for every logged signal, priced from the kline
+# archive instead of live calls: the move OUTCOME_HORIZONS (1h, 3h, 24h)
+# after each signal from archived 1m closes, then hit rate and average move
+# per horizon and signal type, and per confidence bucket. A BUY counts as a
+# hit when price rose, a SELL when it fell; HOLDs are left out.
+#
+#   python3 evaluate_outcomes.py           # archive only, no network
+#   python3 evaluate_outcomes.py --sync    # top up the archive for the logged symbols first
+
+import argparse
+import csv
+import math
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from kline_archive import KlineArchive
+
+SIGNAL_LOG = "signals_log.csv"
+OUTCOME_HORIZONS = os.getenv("OUTCOME_HORIZONS", "1h,3h,24h").split(",")
+UNIT_MS = {"m": 60000, "h": 3600000, "d": 86400000}
+
+
+def horizon_ms(horizon):
+    return int(horizon[:-1]) * UNIT_MS[horizon[-1]]
+
+
+def load_signals(path=SIGNAL_LOG):
+    if not os.path.exists(path):
+        print(f"❌ {path} not found.")
+        return []
+
+    signals = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                at = datetime.strptime(row["Timestamp"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+                price = row.get("SignalPrice") or row.get("Price_at_Signal") or ""
+                signals.append({
+                    "asset": row["Asset"],
+                    "type": row["Signal"].upper(),
+                    "confidence": int(float(row["Confidence"])),
+                    "at_ms": at.timestamp() * 1000,
+                    "price": float(price) if price else math.nan,
+                })
+            except (KeyError, ValueError):
+                continue
+    return signals
+
+
+def evaluate(signals, archive, horizons=OUTCOME_HORIZONS):
+    """
+    Adds {"moves": {horizon: % move}} to each signal, NaN where the archive
+    doesn't reach. Prices are looked up per symbol in one vectorized pass.
+    """
+    by_asset = defaultdict(list)
+    for signal in signals:
+        by_asset[signal["asset"]].append(signal)
+
+    for asset, group in by_asset.items():
+        at_ms = np.array([signal["at_ms"] for signal in group])
+        entry = np.array([signal["price"] for signal in group])
+        # Signals logged without a price are entered at the archived close
+        entry = np.where(np.isnan(entry), archive.closes_at(asset, at_ms), entry)
+        moves = {
+            horizon: (archive.closes_at(asset, at_ms + horizon_ms(horizon)) - entry) / entry * 100
+            for horizon in horizons
+        }
+        for i, signal in enumerate(group):
+            signal["moves"] = {horizon: float(moves[horizon][i]) for horizon in horizons}
+    return signals
+
+
+def report(signals, horizons=OUTCOME_HORIZONS):
+    lines = [f"📊 SIGNAL OUTCOMES BY HORIZON ({len(signals)} signals)\n"]
+
+    def summarize(group, horizon):
+        moves = [(s["type"], s["moves"][horizon]) for s in group if s["type"] in ("BUY", "SELL")]
+        moves = [(kind, move) for kind, move in moves if move == move]
+        if not moves:
+            return "no outcome yet"
+        hits = sum(1 for kind, move in moves if (move > 0 if kind == "BUY" else move < 0))
+        avg = sum(move for _, move in moves) / len(moves)
+        return f"{len(moves)} priced | {100 * hits / len(moves):.1f}% hit rate | Avg move: {avg:+.2f}%"
+
+    by_type = defaultdict(list)
+    by_bucket = defaultdict(list)
+    for s in signals:
+        by_type[s["type"]].append(s)
+        by_bucket[(s["confidence"] // 10) * 10].append(s)
+
+    for horizon in horizons:
+        lines.append(f"⏱️ {horizon}")
+        for stype in ("BUY", "SELL"):
+            if by_type[stype]:
+                lines.append(f"   🔹 {stype}: {summarize(by_type[stype], horizon)}")
+        for bucket in sorted(by_bucket, reverse=True):
+            lines.append(f"   {bucket}-{bucket + 9}% → {summarize(by_bucket[bucket], horizon)}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-horizon signal outcomes from the kline archive")
+    parser.add_argument("--sync", action="store_true", help="download missing 1m candles for the logged symbols first")
+    args = parser.parse_args()
+
+    signals = load_signals()
+    archive = KlineArchive()
+    if args.sync and signals:
+        # New files reach back to the oldest signal
+        days = math.ceil((time.time() * 1000 - min(s["at_ms"] for s in signals)) / 86400000) + 1
+        for asset in sorted({s["asset"] for s in signals}):
+            try:
+                added = archive.sync(asset, "1m", days=days)
+                print(f"🗄️ {asset}: +{added} candles")
+            except Exception as e:
+                print(f"❌ Archive sync failed for {asset}: {e}")
+
+    print(report(evaluate(signals, archive)))
+
+
+if __name__ == "__main__":
+    main()
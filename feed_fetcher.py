@@ -0,0 +1,171 @@
+# feed_fetcher.py
+# Concurrent RSS download with conditional GET (ETag / Last-Modified per feed)
+
+import calendar
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import feedparser
+import requests
+
+FEED_STATE_FILE = "feed_state.json"
+FETCH_WORKERS = int(os.getenv("RSS_FETCH_WORKERS", "10"))
+FETCH_TIMEOUT = float(os.getenv("RSS_FETCH_TIMEOUT", "15"))
+USER_AGENT = "iCryptoPulse/1.0 (+https://icryptopulse.com)"
+
+
+def load_feed_state():
+    if not os.path.exists(FEED_STATE_FILE):
+        return {}
+    try:
+        with open(FEED_STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except:
+        return {}
+
+
+def save_feed_state(state):
+    tmp_file = FEED_STATE_FILE + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_file, FEED_STATE_FILE)
+
+
+def fetch_feed(url, state):
+    """
+    Download one feed, sending If-None-Match / If-Modified-Since from the
+    previous response. Returns (parsed_feed or None, new_state, status, seconds).
+    A None feed with status 304 means "unchanged since last time".
+    """
+    headers = {"User-Agent": USER_AGENT}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("modified"):
+        headers["If-Modified-Since"] = state["modified"]
+
+    started = time.perf_counter()
+    try:
+        response = requests.get(url, headers=headers, timeout=FETCH_TIMEOUT)
+    except Exception as e:
+        print(f"❌ Failed to fetch feed {url}: {e}")
+        return None, state, "error", time.perf_counter() - started
+
+    if response.status_code == 304:
+        return None, state, 304, time.perf_counter() - started
+
+    feed = feedparser.parse(
+        response.content,
+        response_headers={"content-location": url, **response.headers}
+    )
+    new_state = {
+        "etag": response.headers.get("ETag"),
+        "modified": response.headers.get("Last-Modified"),
+    }
+    return feed, new_state, response.status_code, time.perf_counter() - started
+
+
+def fetch_feeds(urls, state, workers=FETCH_WORKERS):
+    """
+    Fetch all feeds concurrently. Returns a list of
+    (url, parsed_feed or None, new_state, status, seconds) in the order of `urls`.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(urls)))) as pool:
+        futures = [pool.submit(fetch_feed, url, state.get(url, {})) for url in urls]
+        return [(url, *future.result()) for url, future in zip(urls, futures)]
+
+
+def print_feed_timings(results):
+    total = 0.0
+    for url, feed, _, status, seconds in sorted(results, key=lambda r: r[4], reverse=True):
+        total += seconds
+        entries = len(feed.entries) if feed is not None else 0
+        print(f"⏱️ {seconds:6.2f}s  [{status}] {entries:>3} entries  {url}")
+    if results:
+        slowest = max(results, key=lambda r: r[4])
+        print(f"⏱️ Feeds: {total:.2f}s sequential vs {slowest[4]:.2f}s wall (slowest: {slowest[0]})")
+
+
+def entry_timestamp(entry):
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    return calendar.timegm(parsed) if parsed else None
+
+
+def take_new_entries(entries, cursor, make_id):
+    """
+    Walk a feed newest-first and stop at the first entry older than the
+    cursor, so only new items get turned into ids. The cursor is
+    {"published": <epoch>, "ids": [...], "pending": [...]}: the newest
+    publish time seen so far, the ids published at exactly that second
+    (several items can share one timestamp), and ids a previous cycle read
+    but didn't finish with (see carry_pending), which are returned again.
+
+    Entries are ordered by their own publish date — feeds aren't reliably
+    newest-first. Returns ([(news_id, entry), ...], new_cursor) without
+    "pending"; entries without a publish date can't be ordered, so they are
+    always returned.
+    """
+    cursor = cursor or {}
+    cursor_ts = cursor.get("published")
+    cursor_ids = set(cursor.get("ids", []))
+    pending = set(cursor.get("pending", []))
+
+    fresh = []
+    newest_ts = cursor_ts
+    newest_ids = set(cursor_ids)
+
+    dated = [(entry_timestamp(entry), entry) for entry in entries]
+    dated.sort(key=lambda pair: math.inf if pair[0] is None else pair[0], reverse=True)
+    for ts, entry in dated:
+        older = ts is not None and cursor_ts is not None and ts < cursor_ts
+        if older and not pending:
+            break
+
+        news_id = make_id(entry)
+        seen = older or (ts is not None and ts == cursor_ts and news_id in cursor_ids)
+        if seen and news_id not in pending:
+            continue
+        fresh.append((news_id, entry))
+
+        if ts is None:
+            continue
+        if newest_ts is None or ts > newest_ts:
+            newest_ts = ts
+            newest_ids = {news_id}
+        elif ts == newest_ts:
+            newest_ids.add(news_id)
+
+    if newest_ts is None:
+        return fresh, {key: value for key, value in cursor.items() if key != "pending"}
+    return fresh, {"published": newest_ts, "ids": sorted(newest_ids)}
+
+
+def carry_pending(state, feed_ids, failed_ids):
+    """
+    Once a cycle has finished with the items it read: keep the ids it didn't
+    finish with (a pipeline stage raised on them) in their feed's cursor, so
+    the next poll reads them again. `feed_ids` is {feed_url: [news_id, ...]}
+    as read this cycle. Returns `state`.
+    """
+    for url, ids in feed_ids.items():
+        cursor = state.get(url, {}).get("cursor")
+        if cursor is None:
+            continue
+        cursor.pop("pending", None)
+        pending = sorted(set(ids) & failed_ids)
+        if pending:
+            cursor["pending"] = pending
+    return state
+
+
+def request_state(state):
+    """
+    Per-feed state to send with the next download. A feed with pending ids
+    is downloaded whole: a 304 wouldn't give them back.
+    """
+    return {
+        url: {} if (feed_state.get("cursor") or {}).get("pending") else feed_state
+        for url, feed_state in state.items()
+    }
@@ -1,29 +1,149 @@
 # gpt_cache.py
+# GPT result cache keyed by news_id: SQLite (WAL) on disk, a bounded LRU in
+# memory, and batched writes. The old gpt_cache.json is migrated once.
+# Entries expire after a TTL (shorter for negative results) and a compaction
+# job deletes them in small transactions, so readers are never blocked.
+#
+#   python3 gpt_cache.py stats
+#   python3 gpt_cache.py compact
 
+import argparse
+import atexit
 import json
 import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 
-CACHE_FILE = "gpt_cache.json"
+CACHE_FILE = "gpt_cache.json"   # legacy store, imported on first use
+CACHE_DB = "gpt_cache.db"
+LRU_SIZE = int(os.getenv("GPT_CACHE_LRU_SIZE", "10000"))
+WRITE_BATCH_SIZE = int(os.getenv("GPT_CACHE_WRITE_BATCH", "50"))
+WRITE_FLUSH_SECONDS = float(os.getenv("GPT_CACHE_FLUSH_SECONDS", "2"))
 
+# Positive results back the cached-signal path and update_prices.py; negative
+# ones only stop re-filtering news that is still in a feed
+TTL_POSITIVE_SECONDS = float(os.getenv("GPT_CACHE_TTL_POSITIVE", str(14 * 86400)))
+TTL_NEGATIVE_SECONDS = float(os.getenv("GPT_CACHE_TTL_NEGATIVE", str(3 * 86400)))
+COMPACT_BATCH_SIZE = 5000
+COMPACT_INTERVAL_SECONDS = float(os.getenv("GPT_CACHE_COMPACT_INTERVAL", "3600"))
 
-def _load_cache():
+# main.py runs pipeline stages in threads; one lock guards the connection,
+# the LRU and the write buffer
+_cache_lock = threading.RLock()
+_conn = None
+_lru = OrderedDict()    # news_id -> (data, saved_at)
+_pending = {}           # news_id -> (data, saved_at)
+_last_flush = time.monotonic()
+_stats = {"hits": 0, "misses": 0, "expired": 0, "lru_evicted": 0, "compacted": 0}
+
+
+def _connect():
+    global _conn
+    if _conn is not None:
+        return _conn
+
+    conn = sqlite3.connect(CACHE_DB, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")   # only takes effect on a new file
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cache ("
+        "news_id TEXT PRIMARY KEY, data TEXT NOT NULL, saved_at REAL NOT NULL, negative INTEGER NOT NULL DEFAULT 0"
+        ") WITHOUT ROWID"
+    )
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+    if "saved_at" not in columns:
+        # Stores created before entries were timestamped: start their clock now
+        conn.execute(f"ALTER TABLE cache ADD COLUMN saved_at REAL NOT NULL DEFAULT {time.time()}")
+        conn.execute("ALTER TABLE cache ADD COLUMN negative INTEGER NOT NULL DEFAULT 0")
+        conn.execute("UPDATE cache SET negative = 1 WHERE json_extract(data, '$.is_hard_news') IS NOT 1")
+    conn.execute("CREATE INDEX IF NOT EXISTS cache_expiry ON cache (negative, saved_at)")
+    conn.commit()
+    _conn = conn
+    _migrate_json(conn)
+    atexit.register(flush)
+    return conn
+
+
+def _is_negative(data):
+    return not data.get("is_hard_news")
+
+
+def _ttl(data):
+    return TTL_NEGATIVE_SECONDS if _is_negative(data) else TTL_POSITIVE_SECONDS
+
+
+def _migrate_json(conn):
+    """One-time import of gpt_cache.json; the file is renamed afterwards."""
     if not os.path.exists(CACHE_FILE):
-        return {}
+        return
     try:
         with open(CACHE_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+            legacy = json.load(f)
     except:
-        return {}
+        legacy = {}
+
+    now = time.time()
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO cache (news_id, data, saved_at, negative) VALUES (?, ?, ?, ?)",
+            ((news_id, json.dumps(data), now, int(_is_negative(data))) for news_id, data in legacy.items())
+        )
+    os.replace(CACHE_FILE, CACHE_FILE + ".migrated")
+    print(f"📦 Migrated {len(legacy)} entries from {CACHE_FILE} to {CACHE_DB}.")
+
+
+def _remember(news_id, entry):
+    _lru[news_id] = entry
+    _lru.move_to_end(news_id)
+    while len(_lru) > LRU_SIZE:
+        _lru.popitem(last=False)
+        _stats["lru_evicted"] += 1
 
 
-def _save_cache(cache):
-    with open(CACHE_FILE, "w", encoding="utf-8") as f:
-        json.dump(cache, f, indent=2)
+def flush():
+    """Write buffered results to disk."""
+    global _last_flush
+    with _cache_lock:
+        if _pending and _conn is not None:
+            with _conn:
+                _conn.executemany(
+                    "INSERT OR REPLACE INTO cache (news_id, data, saved_at, negative) VALUES (?, ?, ?, ?)",
+                    (
+                        (news_id, json.dumps(data), saved_at, int(_is_negative(data)))
+                        for news_id, (data, saved_at) in _pending.items()
+                    )
+                )
+            _pending.clear()
+        _last_flush = time.monotonic()
 
 
 def get_cached_result(news_id):
-    cache = _load_cache()
-    return cache.get(news_id)
+    with _cache_lock:
+        entry = _lru.get(news_id)
+        if entry is not None:
+            _lru.move_to_end(news_id)
+        else:
+            row = _connect().execute(
+                "SELECT data, saved_at FROM cache WHERE news_id = ?", (news_id,)
+            ).fetchone()
+            if row is None:
+                _stats["misses"] += 1
+                return None
+            entry = (json.loads(row[0]), row[1])
+            _remember(news_id, entry)
+
+        data, saved_at = entry
+        if time.time() - saved_at > _ttl(data):
+            _lru.pop(news_id, None)
+            _stats["expired"] += 1
+            _stats["misses"] += 1
+            return None
+
+        _stats["hits"] += 1
+        return dict(data)
 
 
 def save_cached_result(news_id, data):
@@ -39,6 +159,105 @@ def save_cached_result(news_id, data):
         "ticker_source": "symbol_map" | "gpt"
     }
     """
-    cache = _load_cache()
-    cache[news_id] = data
-    _save_cache(cache)
\ No newline at end of file
+    with _cache_lock:
+        _connect()
+        entry = (dict(data), time.time())
+        _remember(news_id, entry)
+        _pending[news_id] = entry
+        if len(_pending) >= WRITE_BATCH_SIZE or time.monotonic() - _last_flush >= WRITE_FLUSH_SECONDS:
+            flush()
+
+
+def compact():
+    """
+    Delete expired entries. Each batch is its own short transaction; with
+    WAL, readers (including other processes) keep their snapshot and are
+    never blocked. Freed pages are returned with an incremental vacuum.
+    Returns the number of entries removed.
+    """
+    flush()
+    now = time.time()
+    removed = 0
+    with _cache_lock:
+        conn = _connect()
+
+    for negative, ttl in ((1, TTL_NEGATIVE_SECONDS), (0, TTL_POSITIVE_SECONDS)):
+        while True:
+            with _cache_lock, conn:
+                cursor = conn.execute(
+                    "DELETE FROM cache WHERE news_id IN ("
+                    "SELECT news_id FROM cache WHERE negative = ? AND saved_at < ? LIMIT ?)",
+                    (negative, now - ttl, COMPACT_BATCH_SIZE)
+                )
+            removed += cursor.rowcount
+            if cursor.rowcount < COMPACT_BATCH_SIZE:
+                break
+
+    with _cache_lock:
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        for news_id in [k for k, (data, saved_at) in _lru.items() if now - saved_at > _ttl(data)]:
+            del _lru[news_id]
+        _stats["compacted"] += removed
+    return removed
+
+
+def start_compaction_thread(interval=COMPACT_INTERVAL_SECONDS):
+    """Run compact() every `interval` seconds in the background (daemon mode)."""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                removed = compact()
+                if removed:
+                    print(f"🧽 GPT cache compaction removed {removed} expired entries.")
+            except Exception as e:
+                print(f"❌ GPT cache compaction failed: {e}")
+
+    thread = threading.Thread(target=run, name="gpt-cache-compaction", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_cache_stats():
+    with _cache_lock:
+        conn = _connect()
+        stats = dict(_stats)
+        stats["entries"], stats["negative_entries"] = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(negative), 0) FROM cache"
+        ).fetchone()
+        stats["lru_entries"] = len(_lru)
+    stats["size_bytes"] = sum(
+        os.path.getsize(path) for path in (CACHE_DB, CACHE_DB + "-wal") if os.path.exists(path)
+    )
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def print_cache_stats():
+    s = get_cache_stats()
+    print(
+        f"🗄️ GPT cache: {s['entries']} entries ({s['negative_entries']} negative), "
+        f"{s['size_bytes'] / 1024:.0f} KiB, hit ratio {s['hit_ratio']:.0%} "
+        f"({s['hits']}/{s['hits'] + s['misses']}), expired {s['expired']}, "
+        f"compacted {s['compacted']}, LRU evicted {s['lru_evicted']}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GPT result cache maintenance")
+    parser.add_argument("command", choices=["stats", "compact"])
+    parser.add_argument(
+        "--vacuum", action="store_true",
+        help="after compacting, rebuild the file (needed once for stores created without incremental auto-vacuum)"
+    )
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        removed = compact()
+        print(f"🧽 Removed {removed} expired entries.")
+        if args.vacuum:
+            _connect().execute("VACUUM")
+            _connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    print_cache_stats()
@@ -0,0 +1,205 @@
+# gpt_executor.py
+# Shared OpenAI worker pool: RPM/TPM token buckets, retry with backoff + jitter,
+# and a circuit breaker so an outage pauses callers instead of burning requests.
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+GPT_WORKERS = int(os.getenv("GPT_WORKERS", "8"))
+GPT_RPM = int(os.getenv("GPT_RPM", "500"))                 # requests per minute
+GPT_TPM = int(os.getenv("GPT_TPM", "200000"))              # tokens per minute
+GPT_MAX_RETRIES = int(os.getenv("GPT_MAX_RETRIES", "5"))
+GPT_CIRCUIT_THRESHOLD = int(os.getenv("GPT_CIRCUIT_THRESHOLD", "5"))     # consecutive failures
+GPT_CIRCUIT_COOLDOWN = float(os.getenv("GPT_CIRCUIT_COOLDOWN", "30"))   # seconds before a probe
+
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+DEFAULT_COMPLETION_TOKENS = 300   # budgeted per call when max_tokens isn't given
+
+
+def estimate_tokens(messages, max_tokens=None):
+    """~4 characters per token for the prompt, plus the completion budget."""
+    prompt_chars = sum(len(m.get("content") or "") for m in messages)
+    return prompt_chars // 4 + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+class TokenBucket:
+    """Refills `rate_per_minute` units per minute up to one minute's worth."""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, delta):
+        """Correct an estimate once the real usage is known (may go negative = debt)."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `threshold` consecutive failures. While open,
+    callers wait; after `cooldown` one probe is let through (half-open) and
+    its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold=GPT_CIRCUIT_THRESHOLD, cooldown=GPT_CIRCUIT_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.condition = threading.Condition()
+
+    def before_call(self):
+        with self.condition:
+            while self.opened_at is not None:
+                remaining = self.opened_at + self.cooldown - time.monotonic()
+                if remaining <= 0 and not self.probing:
+                    self.probing = True
+                    return
+                self.condition.wait(timeout=max(remaining, 0.5))
+
+    def record_success(self):
+        with self.condition:
+            if self.opened_at is not None:
+                print("✅ OpenAI circuit closed — endpoint is back.")
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+            self.condition.notify_all()
+
+    def record_failure(self):
+        with self.condition:
+            self.failures += 1
+            if self.probing or self.failures >= self.threshold:
+                if self.opened_at is None or self.probing:
+                    print(f"🚧 OpenAI circuit open — pausing GPT calls for {self.cooldown:.0f}s.")
+                self.opened_at = time.monotonic()
+                self.probing = False
+            self.condition.notify_all()
+
+
+def is_retryable(error):
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class GPTExecutor:
+    """
+    Runs chat completions on a bounded worker pool. `create(**kwargs)` has
+    the same signature as client.chat.completions.create and blocks;
+    `submit(**kwargs)` returns a Future for callers that want to overlap.
+    """
+
+    def __init__(self, client, workers=GPT_WORKERS, rpm=GPT_RPM, tpm=GPT_TPM,
+                 max_retries=GPT_MAX_RETRIES, breaker=None):
+        self.client = client
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="gpt")
+        self.request_bucket = TokenBucket(rpm)
+        self.token_bucket = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.stats_lock = threading.Lock()
+        self.stats = {"calls": 0, "requests": 0, "retries": 0, "failures": 0, "tokens": 0, "seconds": 0.0}
+
+    def _count(self, **deltas):
+        with self.stats_lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    def _call(self, kwargs):
+        estimated = estimate_tokens(kwargs.get("messages", []), kwargs.get("max_tokens"))
+        started = time.perf_counter()
+        self._count(calls=1)
+
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+            self.request_bucket.acquire(1)
+            self.token_bucket.acquire(estimated)
+            self._count(requests=1)
+            try:
+                response = self.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.record_success()   # the endpoint answered; the request was bad
+                    self._count(failures=1)
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    self._count(failures=1)
+                    raise
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                print(f"⏳ GPT retry {attempt + 1}/{self.max_retries} in {delay:.1f}s: {e}")
+                self._count(retries=1)
+                time.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            usage = getattr(response, "usage", None)
+            used = getattr(usage, "total_tokens", None) or estimated
+            self.token_bucket.adjust(used - estimated)
+            self._count(tokens=used, seconds=time.perf_counter() - started)
+            return response
+
+    def submit(self, **kwargs):
+        return self.pool.submit(self._call, kwargs)
+
+    def create(self, **kwargs):
+        return self.submit(**kwargs).result()
+
+    def average_call(self):
+        """(seconds, tokens) per successful call so far, or (None, None)."""
+        with self.stats_lock:
+            done = self.stats["calls"] - self.stats["failures"]
+            if done <= 0:
+                return None, None
+            return self.stats["seconds"] / done, self.stats["tokens"] / done
+
+    def print_stats(self):
+        with self.stats_lock:
+            s = dict(self.stats)
+        print(
+            f"🤖 GPT: {s['calls']} calls, {s['requests']} requests, {s['retries']} retries, "
+            f"{s['failures']} failed, {s['tokens']} tokens, {s['seconds']:.1f}s"
+        )
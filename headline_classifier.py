@@ -0,0 +1,271 @@
+# headline_classifier.py
+# Local pre-GPT junk filter: hashed word n-grams + logistic regression (pure NumPy).
+# Trained offline on our own logs: skipped_signals_log.csv (GPT rejected -> junk)
+# and signals_log.csv (GPT accepted -> news).
+#
+#   python3 headline_classifier.py train --precision 0.98
+#   python3 headline_classifier.py score "Top 5 memecoins to watch this weekend"
+
+import argparse
+import csv
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+MODEL_FILE = "headline_model.npz"
+SKIPPED_LOG = "skipped_signals_log.csv"
+SIGNAL_LOG = "signals_log.csv"
+
+N_FEATURES = 1 << 18
+PRECISION_TARGET = float(os.getenv("PREFILTER_PRECISION", "0.98"))
+AUDIT_RATE = float(os.getenv("PREFILTER_AUDIT_RATE", "0.05"))   # share of junk calls still sent to GPT
+
+_WORD_RE = re.compile(r"[a-z0-9$%]+")
+
+
+def hashed_features(title):
+    """Unique (index, value) pairs for word unigrams + bigrams, L2-normalized."""
+    words = _WORD_RE.findall(title.lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    features = {}
+    for gram in grams:
+        h = zlib.crc32(gram.encode("utf-8"))
+        index = h & (N_FEATURES - 1)
+        features[index] = features.get(index, 0.0) + (1.0 if h >> 31 else -1.0)
+    if not features:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    indices = np.fromiter(features.keys(), dtype=np.int64)
+    values = np.fromiter(features.values(), dtype=np.float32)
+    norm = np.linalg.norm(values)
+    return indices, values / norm if norm else values
+
+
+def sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+# === Training ===
+
+def load_training_data():
+    samples = []
+    if os.path.exists(SKIPPED_LOG):
+        with open(SKIPPED_LOG, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                # "Error" rows are GPT outages logged as skips, not verdicts
+                if row.get("Title") and row.get("Category") != "Error":
+                    samples.append((row["Title"], 0))
+    if os.path.exists(SIGNAL_LOG):
+        with open(SIGNAL_LOG, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row.get("Headline"):
+                    samples.append((row["Headline"], 1))
+    return samples
+
+
+def train_logistic_regression(features, labels, epochs=8, lr=0.5, l2=1e-6, seed=7):
+    """Plain SGD on sparse rows; positives are up-weighted to balance the classes."""
+    weights = np.zeros(N_FEATURES, dtype=np.float32)
+    bias = 0.0
+    positives = max(1, int(labels.sum()))
+    negatives = max(1, len(labels) - positives)
+    class_weight = {1: len(labels) / (2 * positives), 0: len(labels) / (2 * negatives)}
+
+    rng = np.random.default_rng(seed)
+    for epoch in range(epochs):
+        step = lr / (1 + epoch)
+        for i in rng.permutation(len(labels)):
+            indices, values = features[i]
+            p = sigmoid(float(weights[indices] @ values) + bias)
+            g = (p - labels[i]) * class_weight[int(labels[i])]
+            weights[indices] -= step * (g * values + l2 * weights[indices])
+            bias -= step * g
+    return weights, bias
+
+
+def junk_precision_curve(junk_probs, labels):
+    """For each candidate threshold t: precision of 'junk' calls with P(junk) >= t, and recall."""
+    order = np.argsort(-junk_probs)
+    probs = junk_probs[order]
+    is_junk = (labels[order] == 0).astype(np.float64)
+    true_junk = np.cumsum(is_junk)
+    precision = true_junk / np.arange(1, len(probs) + 1)
+    recall = true_junk / max(1.0, is_junk.sum())
+    return probs, precision, recall
+
+
+def train(precision_target=PRECISION_TARGET, epochs=8, holdout=0.2, seed=7):
+    samples = load_training_data()
+    if len(samples) < 50:
+        print(f"❌ Only {len(samples)} labelled headlines — need at least 50 to train.")
+        return None
+
+    rng = np.random.default_rng(seed)
+    rng.shuffle(samples)
+    features = [hashed_features(title) for title, _ in samples]
+    labels = np.array([label for _, label in samples], dtype=np.float32)
+
+    split = int(len(samples) * (1 - holdout))
+    weights, bias = train_logistic_regression(features[:split], labels[:split], epochs=epochs, seed=seed)
+
+    val_features, val_labels = features[split:], labels[split:]
+    junk_probs = np.array([
+        1.0 - sigmoid(float(weights[idx] @ val) + bias) for idx, val in val_features
+    ])
+    thresholds, precision, recall = junk_precision_curve(junk_probs, val_labels)
+
+    model = {
+        "weights": weights,
+        "bias": np.float32(bias),
+        "curve_thresholds": thresholds.astype(np.float32),
+        "curve_precision": precision.astype(np.float32),
+        "curve_recall": recall.astype(np.float32),
+    }
+    np.savez_compressed(MODEL_FILE, **model)
+
+    threshold = pick_threshold(model, precision_target)
+    accuracy = float(((junk_probs < 0.5) == (val_labels == 1)).mean()) if len(val_labels) else 0.0
+    print(f"✅ Trained on {split} headlines ({int(labels[:split].sum())} accepted), validated on {len(val_labels)}.")
+    print(f"   Validation accuracy: {accuracy:.1%}")
+    if threshold is None:
+        print(f"   ⚠️ No threshold reaches {precision_target:.0%} junk precision — prefilter will drop nothing.")
+    else:
+        i = int(np.searchsorted(-thresholds, -threshold, side="right")) - 1
+        print(
+            f"   P(junk) >= {threshold:.3f} → {precision[i]:.1%} precision, "
+            f"drops {recall[i]:.1%} of junk before GPT"
+        )
+    print(f"💾 Saved model to {MODEL_FILE}")
+    return model
+
+
+def pick_threshold(model, precision_target):
+    """Lowest P(junk) threshold whose validation precision stays at or above the target."""
+    thresholds = model["curve_thresholds"]
+    precision = model["curve_precision"]
+    best = None
+    for i in range(len(thresholds)):
+        # only cut where the threshold actually changes, so ties aren't split
+        if i + 1 < len(thresholds) and thresholds[i + 1] == thresholds[i]:
+            continue
+        if precision[i] >= precision_target and thresholds[i] > 0.5:
+            best = float(thresholds[i])
+    return best
+
+
+# === Runtime ===
+
+_model = None
+_threshold = None
+_model_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"checked": 0, "dropped": 0, "audited": 0, "audit_agree": 0, "passed": 0, "pass_agree": 0}
+_local = threading.local()   # NumPy Generators aren't thread-safe: one per pipeline worker
+
+
+def load_model():
+    global _model, _threshold
+    with _model_lock:
+        if _model is None:
+            if not os.path.exists(MODEL_FILE):
+                _model = {}
+            else:
+                with np.load(MODEL_FILE) as data:
+                    _model = {key: data[key] for key in data.files}
+                _threshold = pick_threshold(_model, PRECISION_TARGET)
+        return _model
+
+
+def junk_probability(title):
+    model = load_model()
+    if not model:
+        return None
+    indices, values = hashed_features(title)
+    return 1.0 - float(sigmoid(float(model["weights"][indices] @ values) + float(model["bias"])))
+
+
+def _thread_rng():
+    rng = getattr(_local, "rng", None)
+    if rng is None:
+        rng = _local.rng = np.random.default_rng()
+    return rng
+
+
+def prefilter(title, rng=None):
+    """
+    Returns (drop, junk_prob). drop=True means skip GPT entirely. A small
+    AUDIT_RATE share of confident-junk items is still sent to GPT so we
+    keep measuring agreement.
+    """
+    rng = rng or _thread_rng()
+    prob = junk_probability(title)
+    if prob is None:
+        return False, None
+    with _stats_lock:
+        _stats["checked"] += 1
+    if _threshold is None or prob < _threshold:
+        return False, prob
+    if rng.random() < AUDIT_RATE:
+        return False, prob
+    with _stats_lock:
+        _stats["dropped"] += 1
+    return True, prob
+
+
+def record_gpt_verdict(junk_prob, gpt_included):
+    """Compare the local score with GPT's verdict for an item GPT did see."""
+    if junk_prob is None:
+        return
+    predicted_junk = _threshold is not None and junk_prob >= _threshold
+    with _stats_lock:
+        if predicted_junk:
+            _stats["audited"] += 1
+            _stats["audit_agree"] += int(not gpt_included)
+        else:
+            _stats["passed"] += 1
+            _stats["pass_agree"] += int(gpt_included == (junk_prob < 0.5))
+
+
+def print_prefilter_stats(avg_gpt_seconds=None, avg_gpt_tokens=None):
+    with _stats_lock:
+        s = dict(_stats)
+        for key in _stats:
+            _stats[key] = 0
+    if not s["checked"]:
+        return
+    line = f"🧹 Prefilter: dropped {s['dropped']}/{s['checked']} before GPT"
+    if s["audited"]:
+        line += f", GPT agreed on {s['audit_agree']}/{s['audited']} audited junk calls"
+    if s["passed"]:
+        line += f", {s['pass_agree']}/{s['passed']} agreement on the rest"
+    if s["dropped"] and avg_gpt_seconds:
+        line += f" — saved ~{s['dropped']} GPT calls (~{s['dropped'] * avg_gpt_seconds:.1f}s"
+        if avg_gpt_tokens:
+            line += f", ~{int(s['dropped'] * avg_gpt_tokens)} tokens"
+        line += ")"
+    print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local headline junk classifier")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train_parser = sub.add_parser("train", help="train from skipped_signals_log.csv + signals_log.csv")
+    train_parser.add_argument("--precision", type=float, default=PRECISION_TARGET)
+    train_parser.add_argument("--epochs", type=int, default=8)
+    score_parser = sub.add_parser("score", help="score one or more headlines")
+    score_parser.add_argument("titles", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        train(precision_target=args.precision, epochs=args.epochs)
+    else:
+        load_model()
+        for title in args.titles:
+            prob = junk_probability(title)
+            if prob is None:
+                print(f"❌ No model at {MODEL_FILE} — run: python3 headline_classifier.py train")
+                break
+            verdict = "junk" if _threshold is not None and prob >= _threshold else "send to GPT"
+            print(f"{prob:.3f}  {verdict:<12} {title}")
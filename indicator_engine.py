@@ -0,0 +1,147 @@
+# indicator_engine.py
+# Running technical indicators per symbol: Wilder's RSI(14) with its trend,
+# SMA 20/50 crossover and the volume spike against the 20-candle mean.
+# Closed candles are folded in with add() in O(1); snapshot() layers the
+# candle still forming on top without committing it, which is what a REST
+# klines download ends with. market_data.py keeps one per streamed symbol;
+# technical_indicators.py replays a REST download through a fresh one.
+
+import math
+
+RSI_PERIOD = 14
+MA_SHORT = 20
+MA_LONG = 50
+VOLUME_PERIOD = 20
+RESYNC_EVERY = 1000   # recompute running sums from the window to shed float drift
+
+
+class RollingWindow:
+    """The last `size` closed values with a running sum, in a fixed list."""
+
+    __slots__ = ("size", "values", "pos", "count", "total", "added")
+
+    def __init__(self, size):
+        self.size = size
+        self.values = [0.0] * size
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+        self.added = 0
+
+    def add(self, value):
+        if self.count == self.size:
+            self.total -= self.values[self.pos]
+        else:
+            self.count += 1
+        self.values[self.pos] = value
+        self.total += value
+        self.pos = (self.pos + 1) % self.size
+        self.added += 1
+        if self.added % RESYNC_EVERY == 0:
+            self.total = math.fsum(self.values[:self.count] if self.count < self.size else self.values)
+
+    def mean_with(self, value):
+        """Mean of the window plus `value`: the closed candles and the forming one."""
+        return (self.total + value) / (self.count + 1)
+
+
+def _rsi(avg_gain, avg_loss):
+    # Flat windows give 0/0 -> nan, as the pandas version did
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else float("nan")
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+class IndicatorState:
+    __slots__ = ("closed", "last_close", "avg_gain", "avg_loss", "seed_gain", "seed_loss",
+                 "rsi_closed", "closes_short", "closes_long", "volumes")
+
+    def __init__(self):
+        self.closed = 0   # closed candles folded in
+        self.last_close = None
+        self.avg_gain = self.avg_loss = None
+        self.seed_gain = self.seed_loss = 0.0   # sums of the first RSI_PERIOD changes
+        self.rsi_closed = None   # RSI as of the last closed candle
+        self.closes_short = RollingWindow(MA_SHORT - 1)
+        self.closes_long = RollingWindow(MA_LONG - 1)
+        self.volumes = RollingWindow(VOLUME_PERIOD - 1)
+
+    def _smoothed(self, close):
+        """(avg_gain, avg_loss) after one more close, or None while seeding."""
+        change = close - self.last_close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        changes = self.closed   # including this one
+        if changes < RSI_PERIOD:
+            return None
+        if changes == RSI_PERIOD:
+            return (self.seed_gain + gain) / RSI_PERIOD, (self.seed_loss + loss) / RSI_PERIOD
+        return ((self.avg_gain * (RSI_PERIOD - 1) + gain) / RSI_PERIOD,
+                (self.avg_loss * (RSI_PERIOD - 1) + loss) / RSI_PERIOD)
+
+    def add(self, close, volume):
+        """Fold in one closed candle."""
+        if self.last_close is not None:
+            smoothed = self._smoothed(close)
+            if smoothed is None:
+                change = close - self.last_close
+                self.seed_gain += max(change, 0.0)
+                self.seed_loss += max(-change, 0.0)
+            else:
+                self.avg_gain, self.avg_loss = smoothed
+                self.rsi_closed = _rsi(*smoothed)
+        self.last_close = close
+        self.closed += 1
+        self.closes_short.add(close)
+        self.closes_long.add(close)
+        self.volumes.add(volume)
+
+    def snapshot(self, close, volume):
+        """
+        Indicators with the forming candle (`close`, `volume`) as the newest,
+        in get_technical_indicators' shape; None until there are MA_LONG
+        candles including the forming one.
+        """
+        if self.closed < MA_LONG - 1 or self.rsi_closed is None:
+            return None
+
+        rsi_now = _rsi(*self._smoothed(close))
+        rsi_trend = "Rising" if rsi_now > self.rsi_closed else "Falling"
+        rsi_label = "Oversold" if rsi_now < 30 else "Overbought" if rsi_now > 70 else "Neutral"
+
+        ma_short = self.closes_short.mean_with(close)
+        ma_long = self.closes_long.mean_with(close)
+        if ma_short > ma_long:
+            ma_cross = f"{MA_SHORT} > {MA_LONG} (Bullish)"
+        elif ma_short < ma_long:
+            ma_cross = f"{MA_SHORT} < {MA_LONG} (Bearish)"
+        else:
+            ma_cross = f"{MA_SHORT} = {MA_LONG} (Neutral)"
+
+        avg_volume = self.volumes.mean_with(volume)
+        if avg_volume == 0:
+            volume_spike = "Unknown"
+        else:
+            ratio = (volume / avg_volume) * 100
+            level = "Low"
+            if ratio > 180:
+                level = "High"
+            elif ratio > 130:
+                level = "Medium"
+            volume_spike = f"+{ratio:.0f}% vs avg ({level})"
+
+        return {
+            "rsi": round(rsi_now, 1),
+            "rsi_label": rsi_label,
+            "rsi_trend": rsi_trend,
+            "ma_crossover": ma_cross,
+            "volume_spike": volume_spike
+        }
+
+
+def indicators_from_series(closes, volumes):
+    """Replay a kline download (oldest first, the last candle still forming)
+    through a fresh state."""
+    state = IndicatorState()
+    for close, volume in zip(closes[:-1], volumes[:-1]):
+        state.add(float(close), float(volume))
+    return state.snapshot(float(closes[-1]), float(volumes[-1])) if len(closes) else None
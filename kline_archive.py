@@ -0,0 +1,216 @@
+# kline_archive.py
+# Closed klines on disk, one file per symbol and interval
+# (KLINE_ARCHIVE_DIR/<interval>/<SYMBOL>.npy) holding a (6 x capacity)
+# float64 array: one row per column (open time, open, high, low, close,
+# volume). Files are memory-mapped, so a range query is a view into the
+# page cache and months of candles are never loaded whole. Append-only:
+# sync() pages forward from the last archived candle with the same REST
+# download as technical_indicators.fetch_ohlcv. Unused slots have an open
+# time of +inf, which keeps the open-time column sorted — it is its own
+# time index — and a row only counts once its open time is written, after
+# its values. A sync reaches back a bounded number of days, so a file left
+# unsynced longer than that gets a gap in its open times. One writer per
+# file at a time (the sync job); any number of readers.
+#
+#   python3 kline_archive.py sync --symbols BTCUSDT,ETHUSDT --intervals 1m --days 90
+#   python3 kline_archive.py info
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from market_data import INTERVAL_MS, MAX_KLINES_LIMIT, parse_kline_rows
+from technical_indicators import fetch_klines
+
+KLINE_ARCHIVE_DIR = os.getenv("KLINE_ARCHIVE_DIR", "data/klines")
+KLINE_ARCHIVE_DAYS = int(os.getenv("KLINE_ARCHIVE_DAYS", "30"))   # how far back a new file starts
+COLUMNS = ("open_time", "open", "high", "low", "close", "volume")
+INITIAL_CAPACITY = 1 << 14   # rows; files double when full
+
+
+class KlineFile:
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.writable = writable
+        self.data = None
+        self.count = 0
+        self.inode = None
+        self.reload()
+
+    def reload(self):
+        """Pick up rows appended (or a file grown) by another process."""
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            if self.writable:
+                self._create(INITIAL_CAPACITY)
+                return
+            self.data, self.count, self.inode = None, 0, None
+            return
+        if inode != self.inode:
+            self.data = np.load(self.path, mmap_mode="r+" if self.writable else "r")
+            self.inode = inode
+        self.count = int(np.searchsorted(self.data[0], np.inf))
+
+    def _create(self, capacity, keep=None):
+        # Written beside the live file and renamed over it, so readers see
+        # either the old file or the complete new one
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        data = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float64, shape=(len(COLUMNS), capacity))
+        data[0] = np.inf
+        if keep is not None:
+            data[:, :keep.shape[1]] = keep
+        data.flush()
+        del data
+        os.replace(tmp, self.path)
+        self.inode = None
+        self.reload()
+
+    def __len__(self):
+        return self.count
+
+    def last_open_time(self):
+        return int(self.data[0, self.count - 1]) if self.count else None
+
+    def columns(self, start=0, stop=None):
+        """{column: view} of rows [start, stop) — no copy."""
+        if self.data is None:
+            return {name: np.zeros(0) for name in COLUMNS}
+        stop = self.count if stop is None else min(stop, self.count)
+        return {name: self.data[i, start:stop] for i, name in enumerate(COLUMNS)}
+
+    def range(self, start_ms, end_ms):
+        """Views of the candles that opened in [start_ms, end_ms)."""
+        if self.data is None:
+            return self.columns()
+        open_time = self.data[0, :self.count]
+        return self.columns(int(np.searchsorted(open_time, start_ms)), int(np.searchsorted(open_time, end_ms)))
+
+    def append(self, open_time, ohlcv):
+        """Append closed candles newer than the last archived one; returns how many."""
+        last = self.last_open_time()
+        if last is not None:
+            newer = open_time > last
+            open_time, ohlcv = open_time[newer], ohlcv[newer]
+        n = len(open_time)
+        if not n:
+            return 0
+        capacity = self.data.shape[1]
+        if self.count + n > capacity:
+            self._create(max(2 * capacity, self.count + n), keep=self.data[:, :self.count])
+        end = self.count + n
+        self.data[1:, self.count:end] = ohlcv.T
+        self.data.flush()
+        self.data[0, self.count:end] = open_time
+        self.data.flush()
+        self.count = end
+        return n
+
+
+class KlineArchive:
+    def __init__(self, root=KLINE_ARCHIVE_DIR, fetch=fetch_klines):
+        self.root = root
+        self.fetch = fetch
+        self.files = {}
+
+    def path(self, symbol, interval):
+        return os.path.join(self.root, interval, f"{symbol}.npy")
+
+    def open(self, symbol, interval, writable=False):
+        key = (symbol, interval, writable)
+        archive_file = self.files.get(key)
+        if archive_file is None:
+            archive_file = self.files[key] = KlineFile(self.path(symbol, interval), writable=writable)
+        else:
+            archive_file.reload()
+        return archive_file
+
+    def range(self, symbol, interval, start_ms, end_ms):
+        """{column: view} of the archived `interval` candles opened in [start_ms, end_ms)."""
+        return self.open(symbol, interval).range(start_ms, end_ms)
+
+    def closes_at(self, symbol, times_ms, interval="1m"):
+        """
+        Close of the candle covering each of `times_ms` (NaN where that
+        candle isn't archived) — prices at signal and check times without
+        the network.
+        """
+        times_ms = np.asarray(times_ms, dtype=np.float64)
+        archive_file = self.open(symbol, interval)
+        if not len(archive_file):
+            return np.full(len(times_ms), np.nan)
+        open_time = archive_file.data[0, :archive_file.count]
+        close = archive_file.data[4, :archive_file.count]
+        i = np.searchsorted(open_time, times_ms, side="right") - 1
+        found = (i >= 0) & (times_ms < open_time[np.maximum(i, 0)] + INTERVAL_MS[interval])
+        return np.where(found, close[np.maximum(i, 0)], np.nan)
+
+    def sync(self, symbol, interval, days=KLINE_ARCHIVE_DAYS):
+        """Download the closed candles missing since the last archived one,
+        going back at most `days`; returns how many were appended. A file
+        last synced longer ago than that is left with a gap, which lookups
+        treat as candles not archived."""
+        archive_file = self.open(symbol, interval, writable=True)
+        interval_ms = INTERVAL_MS[interval]
+        now = int(time.time() * 1000)
+        last = archive_file.last_open_time()
+        start = (now - days * 86400000) // interval_ms * interval_ms
+        if last is not None and last + interval_ms >= start:
+            start = last + interval_ms
+        elif last is not None:
+            print(f"⚠️ {symbol} {interval}: skipping {(start - last) / 86400000:.1f} days not synced "
+                  f"(sync reaches back {days} days)")
+        added = 0
+        while start + interval_ms <= now:
+            open_time, ohlcv = parse_kline_rows(self.fetch(symbol, interval, MAX_KLINES_LIMIT, start_time=start))
+            closed = open_time + interval_ms <= now
+            added += archive_file.append(open_time[closed], ohlcv[closed])
+            if not len(open_time) or not closed.all() or len(open_time) < MAX_KLINES_LIMIT:
+                break
+            start = int(open_time[-1]) + interval_ms
+        return added
+
+    def symbols(self, interval):
+        folder = os.path.join(self.root, interval)
+        if not os.path.isdir(folder):
+            return []
+        return sorted(name[:-4] for name in os.listdir(folder) if name.endswith(".npy"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory-mapped kline archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sync = sub.add_parser("sync", help="download missing closed candles")
+    sync.add_argument("--symbols", required=True, help="comma-separated, e.g. BTCUSDT,ETHUSDT")
+    sync.add_argument("--intervals", default="1m")
+    sync.add_argument("--days", type=int, default=KLINE_ARCHIVE_DAYS, help="history for symbols not archived yet")
+    info = sub.add_parser("info", help="list archived symbols and their ranges")
+    info.add_argument("--intervals", default="1m,5m")
+    args = parser.parse_args()
+
+    archive = KlineArchive()
+    if args.command == "sync":
+        for interval in args.intervals.split(","):
+            for symbol in args.symbols.split(","):
+                try:
+                    added = archive.sync(symbol, interval, days=args.days)
+                    print(f"🗄️ {symbol} {interval}: +{added} candles ({len(archive.open(symbol, interval))} archived)")
+                except Exception as e:
+                    print(f"❌ Archive sync failed for {symbol} {interval}: {e}")
+    else:
+        for interval in args.intervals.split(","):
+            for symbol in archive.symbols(interval):
+                archive_file = archive.open(symbol, interval)
+                if not len(archive_file):
+                    continue
+                first, last = archive_file.data[0, 0], archive_file.data[0, archive_file.count - 1]
+                print(f"🗄️ {symbol} {interval}: {len(archive_file)} candles, "
+                      f"{time.strftime('%Y-%m-%d %H:%M', time.gmtime(first / 1000))} → "
+                      f"{time.strftime('%Y-%m-%d %H:%M', time.gmtime(last / 1000))} UTC")
+
+
+if __name__ == "__main__":
+    main()
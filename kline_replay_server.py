@@ -0,0 +1,320 @@
+# kline_replay_server.py
+# A local stand-in for Binance Futures market data, for running and testing
+# market_data.py without the exchange: a seeded random-walk tape of klines
+# replayed on the combined WebSocket stream (/stream?streams=btcusdt@kline_1m/...)
+# and served over REST (/fapi/v1/klines, /fapi/v1/ticker/price) from the same
+# state, so a backfill always lines up with the stream; REST requests for a
+# longer interval get the tape aggregated into its bars.
+#
+#   python3 kline_replay_server.py --port 8765 --rate 4 --drop-every 120
+#   BINANCE_FAPI_URL=http://127.0.0.1:8765 BINANCE_FSTREAM_URL=ws://127.0.0.1:8765 python3 main.py --daemon
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from market_data import INTERVAL_MS
+from timeframes import resample
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_TEXT, OP_CLOSE, OP_PING, OP_PONG = 0x1, 0x8, 0x9, 0xA
+DEFAULT_SYMBOLS = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT", "DOGEUSDT", "BNBUSDT", "ADAUSDT", "LINKUSDT"]
+
+
+class ReplayMarket:
+    """
+    Candles for each symbol, the last one still forming. Every tick moves
+    each forming candle one random step; after `ticks_per_candle` ticks it
+    closes and the next one opens, so virtual time runs ahead of the clock.
+    """
+
+    def __init__(self, symbols, interval="1m", history=1500, ticks_per_candle=12, seed=7):
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.interval_ms = INTERVAL_MS[interval]
+        self.ticks_per_candle = ticks_per_candle
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.running = threading.Event()
+        self.running.set()
+        self.tick_count = 0
+        self.candles = {}
+        now = int(time.time() * 1000) // self.interval_ms * self.interval_ms
+        for symbol in self.symbols:
+            price = self.rng.uniform(0.1, 60000)
+            rows = []
+            for i in range(history, 0, -1):
+                rows.append(self._candle(now - (i - 1) * self.interval_ms, price))
+                price = rows[-1][4]
+            self.candles[symbol] = rows
+
+    def _candle(self, open_time, open_price, steps=None):
+        close = high = low = open_price
+        volume = 0.0
+        for _ in range(self.ticks_per_candle if steps is None else steps):
+            close *= 1 + self.rng.gauss(0, 0.002)
+            high, low = max(high, close), min(low, close)
+            volume += self.rng.lognormvariate(3, 1)
+        return [open_time, open_price, high, low, close, volume]
+
+    def tick(self):
+        """Advance every symbol one step; returns (symbol, candle, closed) events."""
+        events = []
+        with self.lock:
+            self.tick_count += 1
+            closing = self.tick_count % self.ticks_per_candle == 0
+            for symbol in self.symbols:
+                rows = self.candles[symbol]
+                candle = rows[-1]
+                step = self._candle(candle[0], candle[4], steps=1)
+                candle[2], candle[3] = max(candle[2], step[2]), min(candle[3], step[3])
+                candle[4] = step[4]
+                candle[5] += step[5]
+                events.append((symbol, list(candle), closing))
+                if closing:
+                    rows.append([candle[0] + self.interval_ms, candle[4], candle[4], candle[4], candle[4], 0.0])
+                    del rows[0]
+        return events
+
+    def klines(self, symbol, limit, interval=None, start_time=None):
+        """The newest `limit` candles, or the first `limit` opened at or after `start_time`."""
+        with self.lock:
+            rows = self.candles.get(symbol, [])
+            if interval is None or interval == self.interval:
+                interval_ms = self.interval_ms
+                rows = [list(row) for row in rows]
+            else:
+                # From the rounded 1m values, so bars add up to what the 1m REST rows say
+                interval_ms = INTERVAL_MS[interval]
+                bar_open, bars = resample(
+                    [row[0] for row in rows], [[float(_fmt(value)) for value in row[1:]] for row in rows], interval_ms
+                )
+                rows = [[t, *bar] for t, bar in zip(bar_open.tolist(), bars.tolist())]
+            if start_time is not None:
+                rows = [row for row in rows if row[0] >= start_time][:limit]
+            else:
+                rows = rows[-limit:]
+            return [self._rest_row(row, interval_ms) for row in rows]
+
+    def prices(self):
+        with self.lock:
+            return [{"symbol": symbol, "price": _fmt(rows[-1][4])} for symbol, rows in self.candles.items()]
+
+    def _rest_row(self, row, interval_ms):
+        open_time, o, h, l, c, v = row
+        return [open_time, _fmt(o), _fmt(h), _fmt(l), _fmt(c), _fmt(v),
+                open_time + interval_ms - 1, _fmt(v * c), 1, "0", "0", "0"]
+
+    def stream_message(self, symbol, candle, closed):
+        open_time, o, h, l, c, v = candle
+        kline = {
+            "t": open_time, "T": open_time + self.interval_ms - 1, "s": symbol, "i": self.interval,
+            "o": _fmt(o), "c": _fmt(c), "h": _fmt(h), "l": _fmt(l), "v": _fmt(v),
+            "n": 1, "x": closed, "q": _fmt(v * c), "V": "0", "Q": "0", "B": "0",
+        }
+        data = {"e": "kline", "E": open_time + self.interval_ms, "s": symbol, "k": kline}
+        return json.dumps({"stream": f"{symbol.lower()}@kline_{self.interval}", "data": data})
+
+
+def _fmt(value):
+    # Fixed decimals, like Binance's string prices: the ring buffer and a
+    # REST backfill parse the same text
+    return f"{value:.6f}"
+
+
+def _frame(opcode, payload):
+    header = bytes([0x80 | opcode])
+    size = len(payload)
+    if size < 126:
+        header += bytes([size])
+    elif size < 65536:
+        header += bytes([126]) + size.to_bytes(2, "big")
+    else:
+        header += bytes([127]) + size.to_bytes(8, "big")
+    return header + payload
+
+
+def _read_frame(rfile):
+    """(opcode, payload) of one client frame, or None when the socket closes."""
+    head = rfile.read(2)
+    if len(head) < 2:
+        return None
+    opcode, size = head[0] & 0x0F, head[1] & 0x7F
+    if size == 126:
+        size = int.from_bytes(rfile.read(2), "big")
+    elif size == 127:
+        size = int.from_bytes(rfile.read(8), "big")
+    mask = rfile.read(4) if head[1] & 0x80 else b"\0\0\0\0"
+    payload = rfile.read(size)
+    return opcode, bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+class Subscriber:
+    def __init__(self, connection, wfile, streams):
+        self.connection = connection
+        self.wfile = wfile
+        self.streams = streams
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def send(self, opcode, payload):
+        with self.lock:
+            if self.closed:
+                return False
+            try:
+                self.wfile.write(_frame(opcode, payload))
+                self.wfile.flush()
+                return True
+            except OSError:
+                self.closed = True
+                return False
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if self.headers.get("Upgrade", "").lower() == "websocket":
+            self._stream(params.get("streams", ""))
+        elif url.path == "/fapi/v1/klines":
+            start_time = params.get("startTime")
+            self._reply(200, self.server.market.klines(
+                params.get("symbol"), int(params.get("limit", 500)), params.get("interval"),
+                int(start_time) if start_time else None
+            ))
+        elif url.path == "/fapi/v1/ticker/price":
+            self._reply(200, self.server.market.prices())
+        else:
+            self._reply(404, {"code": -1, "msg": "unknown path"})
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, streams):
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+
+        subscriber = Subscriber(self.connection, self.wfile, set(filter(None, streams.split("/"))))
+        self.server.subscribe(subscriber)
+        try:
+            # This thread answers the client; the broadcaster does the sending
+            while not subscriber.closed:
+                frame = _read_frame(self.rfile)
+                if frame is None or frame[0] == OP_CLOSE:
+                    subscriber.send(OP_CLOSE, b"")
+                    break
+                if frame[0] == OP_PING:
+                    subscriber.send(OP_PONG, frame[1])
+        except OSError:
+            pass
+        finally:
+            subscriber.closed = True
+            self.server.unsubscribe(subscriber)
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, market, rate=4.0, drop_every=0):
+        super().__init__(address, ReplayHandler)
+        self.market = market
+        self.rate = rate
+        self.drop_every = drop_every
+        self.subscribers = set()
+        self.subscribers_lock = threading.Lock()
+        self.stats = {"messages": 0, "connections": 0, "drops": 0}
+
+    def subscribe(self, subscriber):
+        with self.subscribers_lock:
+            self.subscribers.add(subscriber)
+            self.stats["connections"] += 1
+
+    def unsubscribe(self, subscriber):
+        with self.subscribers_lock:
+            self.subscribers.discard(subscriber)
+
+    def drop_connections(self):
+        """Close every stream without a close frame, like a network drop."""
+        with self.subscribers_lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            with subscriber.lock:
+                subscriber.closed = True
+                try:
+                    subscriber.connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self.stats["drops"] += 1
+
+    def broadcast(self):
+        last_drop = time.monotonic()
+        while True:
+            self.market.running.wait()
+            events = self.market.tick()
+            with self.subscribers_lock:
+                subscribers = list(self.subscribers)
+            for symbol, candle, closed in events:
+                stream = f"{symbol.lower()}@kline_{self.market.interval}"
+                message = None
+                for subscriber in subscribers:
+                    if stream in subscriber.streams:
+                        message = message or self.market.stream_message(symbol, candle, closed).encode("utf-8")
+                        if subscriber.send(OP_TEXT, message):
+                            self.stats["messages"] += 1
+            if self.drop_every and time.monotonic() - last_drop > self.drop_every:
+                self.drop_connections()
+                last_drop = time.monotonic()
+            time.sleep(1 / self.rate)
+
+
+def start_replay_server(market, host="127.0.0.1", port=0, rate=4.0, drop_every=0):
+    server = ReplayServer((host, port), market, rate=rate, drop_every=drop_every)
+    threading.Thread(target=server.serve_forever, name="replay-http", daemon=True).start()
+    threading.Thread(target=server.broadcast, name="replay-broadcast", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Binance kline stream + REST replay server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--symbols", default=",".join(DEFAULT_SYMBOLS))
+    parser.add_argument("--interval", default="1m")
+    parser.add_argument("--rate", type=float, default=4.0, help="ticks per second")
+    parser.add_argument("--ticks-per-candle", type=int, default=12)
+    parser.add_argument("--drop-every", type=float, default=0, help="drop all streams every N seconds (0 = never)")
+    args = parser.parse_args()
+
+    market = ReplayMarket(args.symbols.split(","), interval=args.interval, ticks_per_candle=args.ticks_per_candle)
+    server = start_replay_server(market, port=args.port, rate=args.rate, drop_every=args.drop_every)
+    print(f"📼 Replaying {len(market.symbols)} symbols on http/ws://127.0.0.1:{server.server_port} at {args.rate:g} ticks/s")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"📼 {server.stats['messages']} messages, {len(server.subscribers)} streams open, {server.stats['drops']} drops")
+    except KeyboardInterrupt:
+        server.shutdown()
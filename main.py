@@ -1,28 +1,44 @@
-import re
 import sys
 import os
+import threading
 from dotenv import load_dotenv
 
 # === Setup ===
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-import requests
+import argparse
+import time
 from telegram import Bot
 from openai import OpenAI
 import csv
-from contradiction_filter import has_contradiction
-import feedparser
-from symbol_map import symbol_map
-# Reverse mapping: ticker -> base token (e.g. XRPUSDT -> XRP)
-symbol_to_token = {v: k for k, v in symbol_map.items()}
-
-from gpt_cache import get_cached_result, save_cached_result
+import json
+from contradiction_filter import has_contradiction, record_signal
+from feed_fetcher import (
+    carry_pending, fetch_feeds, load_feed_state, save_feed_state, print_feed_timings, request_state, take_new_entries
+)
+import symbol_map_updater
+
+from gpt_cache import get_cached_result, save_cached_result, flush as flush_gpt_cache, print_cache_stats, start_compaction_thread
+from gpt_executor import GPTExecutor
+from headline_classifier import prefilter, record_gpt_verdict, print_prefilter_stats
+from pipeline import Stage, run_pipeline, print_stage_stats
+from story_clustering import collapse_stories
+from entity_index import get_entity_index, reload_entity_index
+from binance_client import binance
+from price_snapshot import prices
+from market_data import start_market_data, get_market_data, MARKET_DATA_UNIVERSE
+from ta_scanner import start_ta_scanner
+from stage_store import (
+    get_stage_state, record_progress, record_block, record_transient,
+    clear_stage_state, due_retries, prune_stage_state
+)
 from confidence import calibrate_confidence
 from hashlib import md5
 from datetime import datetime, timedelta
-from technical_indicators import get_technical_indicators, get_market_change_summary
-import subprocess
-from symbol_map import symbol_map
+from technical_indicators import (
+    get_technical_indicators, get_market_change_summary, format_timeframe_context
+)
+from market_regime import regime, REGIME_SYMBOLS
 
 # === LOAD CONFIG ===
 load_dotenv()
@@ -32,36 +48,61 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 CRYPTOPANIC_API_KEY = os.getenv("CRYPTOPANIC_API_KEY", "")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Retries are handled by the executor (backoff + circuit breaker), not the SDK
+client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+gpt = GPTExecutor(client)
 
 POSTED_IDS_FILE = "posted_ids.txt"
 CSV_FILE = "signals_log.csv"
 PENDING_PRICES_FILE = "pending_prices.csv"
-BINANCE_FUTURES_URL = "https://fapi.binance.com/fapi/v1/ticker/price"
-
 
-# Update symbol_map daily
-subprocess.run(["python3", "symbol_map_updater.py"])
+# === Daemon mode (python3 main.py --daemon) ===
+DAEMON_POLL_SECONDS = int(os.getenv("DAEMON_POLL_SECONDS", "30"))
+SYMBOL_MAP_REFRESH_SECONDS = int(os.getenv("SYMBOL_MAP_REFRESH_SECONDS", "86400"))
 
 # === CONFIG ===
 from config import OPENAI_API_KEY, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
 
-# Reverse mapping: symbol (e.g. BTCUSDT) → token (e.g. BTC)
-symbol_to_token = {v: k for k, v in symbol_map.items()}
+# === Symbol indexes ===
+# Surface forms, base tokens and volume ranks live in symbol_index.npz (see
+# entity_index.py); get_entity_index() hot-reloads it when the updater
+# writes a new one.
 
-# Load top 50 volume tickers (from latest Binance 24h data)
-with open("top_volume_tickers.txt") as f:
-    TOP_VOLUME_TICKERS = set(line.strip() for line in f if line.strip())
+def refresh_symbol_map():
+    """
+    Update the symbol index daily, off the critical path: a fresh index
+    costs one stat, a stale one is refreshed in a background thread while
+    the run continues on the current index. The thread isn't a daemon, so a
+    cron run still finishes the refresh before exiting.
+    """
+    if symbol_map_updater.index_is_fresh():
+        return None
 
-# === Dynamic major asset detection (first 30 tokens by name length or popularity) ===
-# You can customize which symbols are always respected as 'major'
+    def run():
+        try:
+            if symbol_map_updater.refresh_symbol_index():
+                print(f"🔄 Symbol indexes reloaded ({len(reload_entity_index())} symbols).")
+        except Exception as e:
+            print(f"❌ Symbol map refresh failed: {e}")
 
-MAJOR_ASSETS = set()
+    thread = threading.Thread(target=run, name="symbol-refresh")
+    thread.start()
+    return thread
 
-# Add all base symbols (keys) from the symbol map that are 3–6 characters (common for major coins)
-for token in symbol_map:
-    if 3 <= len(token) <= 6:
-        MAJOR_ASSETS.add(token.upper())
+def schedule_symbol_map_refresh(interval):
+    """Refresh symbol_map in-process on a background timer (daemon mode)."""
+    def run():
+        try:
+            if symbol_map_updater.refresh_symbol_index(max_age=interval / 2):
+                print(f"🔄 Symbol indexes reloaded ({len(reload_entity_index())} symbols).")
+        except Exception as e:
+            print(f"❌ Symbol map refresh failed: {e}")
+        schedule_symbol_map_refresh(interval)
+
+    timer = threading.Timer(interval, run)
+    timer.daemon = True
+    timer.start()
+    return timer
 
 RSS_FEEDS = [
     "https://cointelegraph.com/rss",
@@ -78,13 +119,8 @@ RSS_FEEDS = [
 
 # === UTILS ===
 def get_symbol_for_title(title):
-    title_upper = title.upper()
-    title_words = set(re.findall(r'\b[A-Z0-9]{2,12}\b', title_upper))  # e.g. BTC, DOGE, SHIB, XRP
-
-    for token, symbol in symbol_map.items():
-        if token.upper() in title_words:
-            return symbol
-    return None
+    # e.g. BTC, Bitcoin, $DOGE, Shiba Inu — first/most specific mention wins
+    return get_entity_index().first(title)
 
 def load_posted_ids():
     if not os.path.exists(POSTED_IDS_FILE):
@@ -96,6 +132,9 @@ def save_posted_id(news_id):
     with open(POSTED_IDS_FILE, "a") as f:
         f.write(f"{news_id}\n")
 
+# The filter stage runs on several threads; keep skipped-log rows whole
+_skipped_log_lock = threading.Lock()
+
 def log_skipped_news(title, summary, source, reason, score, category):
     filename = "skipped_signals_log.csv"
     fieldnames = ["Timestamp", "Title", "Source", "Score", "Category", "Reason", "Summary"]
@@ -108,12 +147,13 @@ def log_skipped_news(title, summary, source, reason, score, category):
         "Reason": reason,
         "Summary": summary
     }
-    file_exists = os.path.isfile(filename)
-    with open(filename, mode='a', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(row)
+    with _skipped_log_lock:
+        file_exists = os.path.isfile(filename)
+        with open(filename, mode='a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            if not file_exists:
+                writer.writeheader()
+            writer.writerow(row)
 
 def log_to_csv(
     signal,
@@ -174,6 +214,7 @@ def log_to_csv(
             writer.writeheader()
 
         writer.writerow(row)
+    record_signal()
 
     # Add to pending_prices.csv
     check_after = (datetime.utcnow() + timedelta(hours=3)).strftime("%Y-%m-%d %H:%M:%S")
@@ -193,6 +234,14 @@ def log_to_csv(
             "Check_After": check_after
         })
 
+_bot = None
+
+def get_bot():
+    global _bot
+    if _bot is None:
+        _bot = Bot(token=TELEGRAM_BOT_TOKEN)
+    return _bot
+
 def send_telegram_message(text):
     try:
         with open("authorized_channels.txt", "r") as f:
@@ -200,7 +249,7 @@ def send_telegram_message(text):
     except FileNotFoundError:
         print("⚠️ No authorized_channels.txt file found. No messages will be sent.")
         return
-    bot = Bot(token=TELEGRAM_BOT_TOKEN)
+    bot = get_bot()
     for chat_id in chat_ids:
         try:
             bot.send_message(chat_id=chat_id, text=text, parse_mode="Markdown")
@@ -211,21 +260,53 @@ def generate_news_id(entry):
     raw_id = (entry.link + entry.get("published", "")).encode("utf-8")
     return md5(raw_id).hexdigest()
 
+# Feed state read by get_rss_news, saved by save_feed_cursors once the
+# cycle has finished with the items: (state, {feed_url: [news_id, ...]})
+_unsaved_feed_state = None
+
 def get_rss_news():
+    global _unsaved_feed_state
+    feed_state = load_feed_state()
+    results = fetch_feeds(RSS_FEEDS, request_state(feed_state))
+    print_feed_timings(results)
+
     all_entries = []
-    for feed_url in RSS_FEEDS:
-        feed = feedparser.parse(feed_url)
-        for entry in feed.entries:
+    feed_ids = {}
+    for feed_url, feed, new_state, status, _ in results:
+        # 304 Not Modified / fetch error: nothing new from this feed
+        if feed is None:
+            continue
+
+        cursor = feed_state.get(feed_url, {}).get("cursor")
+        fresh, cursor = take_new_entries(feed.entries, cursor, generate_news_id)
+        for news_id, entry in fresh:
             all_entries.append({
-                "id": generate_news_id(entry),
+                "id": news_id,
                 "title": entry.title,
                 "summary": entry.get("summary", ""),
                 "url": entry.link,
                 "published": entry.get("published", ""),
                 "source": feed.feed.get("title", "Unknown")
             })
+        feed_state[feed_url] = {**new_state, "cursor": cursor}
+        feed_ids[feed_url] = [news_id for news_id, _ in fresh]
+
+    _unsaved_feed_state = (feed_state, feed_ids)
     return all_entries
 
+def save_feed_cursors(failed_ids):
+    """
+    Move the feed cursors past this cycle's items only now that the
+    pipeline is done with them; a crash before this rereads them. Items a
+    stage raised on stay pending in their feed's cursor.
+    """
+    global _unsaved_feed_state
+    if _unsaved_feed_state is None:
+        return
+    feed_state, feed_ids = _unsaved_feed_state
+    _unsaved_feed_state = None
+    save_feed_state(carry_pending(feed_state, feed_ids, failed_ids))
+
 def evaluate_news_quality_with_gpt(title, summary, source=None):
     prompt = f"""
 You are an AI signal filter. Evaluate the following crypto news:
@@ -239,7 +320,7 @@ Title: {title}
 Summary: {summary}
 """
     try:
-        response = client.chat.completions.create(
+        response = gpt.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.1
@@ -260,6 +341,74 @@ Summary: {summary}
         print("❌ GPT filter error:", e)
         return {"include": False, "score": 0, "type": "Error", "reason": "GPT call failed"}
 
+FILTER_BATCH_SIZE = int(os.getenv("GPT_FILTER_BATCH_SIZE", "10"))
+
+def parse_batch_filter_result(raw):
+    """Validate one element of the batched filter response; None if unusable."""
+    if not isinstance(raw, dict):
+        return None
+    include = raw.get("include")
+    score = raw.get("score")
+    if not isinstance(include, bool) or isinstance(score, bool) or not isinstance(score, (int, float)):
+        return None
+    if not 0 <= score <= 100:
+        return None
+    return {
+        "include": include,
+        "score": int(score),
+        "type": str(raw.get("type") or "Unknown"),
+        "reason": str(raw.get("reason") or "Not parsed"),
+    }
+
+def evaluate_news_batch_with_gpt(items):
+    """
+    Filter several headlines in one chat completion. Asks for a JSON object
+    {"results": [{id, include, score, type, reason}, ...]} and falls back to
+    evaluate_news_quality_with_gpt for any entry that is missing or invalid.
+    Returns {news_id: filter_result}.
+    """
+    if len(items) == 1:
+        item = items[0]
+        return {item["id"]: evaluate_news_quality_with_gpt(item["title"], item["summary"], item["source"])}
+
+    headlines = "\n\n".join(
+        f"[{n}] 📄 Source: {item['source'] or 'Unknown'}\nTitle: {item['title']}\nSummary: {item['summary']}"
+        for n, item in enumerate(items, start=1)
+    )
+    prompt = f"""
+You are an AI signal filter. Evaluate each of the following {len(items)} crypto news items independently.
+Return a JSON object: {{"results": [{{"id": <item number>, "include": true/false, "score": <0-100>, "type": "<Listing, Regulation, Hack, Upgrade, Macro, Whale, etc>", "reason": "<Brief explanation in your own words>"}}]}}
+with exactly one result per item.
+
+{headlines}
+"""
+    parsed = {}
+    try:
+        response = gpt.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,
+            response_format={"type": "json_object"}
+        )
+        payload = json.loads(response.choices[0].message.content)
+        for raw in payload.get("results", []):
+            try:
+                n = int(raw.get("id"))
+            except (TypeError, ValueError, AttributeError):
+                continue
+            result = parse_batch_filter_result(raw)
+            if result and 1 <= n <= len(items):
+                parsed[items[n - 1]["id"]] = result
+    except Exception as e:
+        print("❌ GPT batch filter error:", e)
+
+    missing = [item for item in items if item["id"] not in parsed]
+    if missing:
+        print(f"⚠️ Batch filter: {len(missing)}/{len(items)} items invalid, retrying one by one.")
+    for item in missing:
+        parsed[item["id"]] = evaluate_news_quality_with_gpt(item["title"], item["summary"], item["source"])
+    return parsed
+
 def classify_news_with_gpt(title, content, asset, timestamp, source, market_change, has_conflict, technicals):
     context = f"""
 News Title: {title}
@@ -274,6 +423,8 @@ Technical Indicators:
 - MA Crossover: {technicals['ma_crossover']}
 - Volume Spike: {technicals['volume_spike']}
 """
+    if technicals.get("timeframes"):
+        context += f"- Higher Timeframes: {format_timeframe_context(technicals['timeframes'])}\n"
     prompt = f"""
 You are an AI signal analyst. Interpret the news + technical indicators.
 Return this format:
@@ -285,7 +436,7 @@ Reason: <In your own words, no quotes>
 {context}
 """
     try:
-        response = client.chat.completions.create(
+        response = gpt.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3
@@ -317,240 +468,645 @@ Summary: {summary}
 """
 
     try:
-        res = client.chat.completions.create(
+        res = gpt.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.2
         )
 
         guess = res.choices[0].message.content.strip().upper()
+        return validate_gpt_ticker(guess)
 
-        # === HARD GUARDS ===
-        if guess == "NONE":
-            return None
+    except Exception as e:
+        print("❌ GPT ticker guess error:", e)
+        return None
 
-        # must end with USDT
-        if not guess.endswith("USDT"):
-            return None
+def validate_gpt_ticker(guess):
+    # === HARD GUARDS ===
+    if not guess or guess == "NONE":
+        return None
 
-        # must exist in Binance symbol map
-        # ✅ Validate GPT guess
-        if guess not in symbol_map.values():
-            print(f"⚠️ GPT guessed invalid ticker: {guess}")
-            return None
+    # must end with USDT
+    if not guess.endswith("USDT"):
+        return None
 
-        if guess not in TOP_VOLUME_TICKERS:
-            print(f"⚠️ GPT guessed low-volume ticker (filtered): {guess}")
-            return None
+    # must exist in Binance symbol map
+    # ✅ Validate GPT guess
+    entities = get_entity_index()
+    if guess not in entities:
+        print(f"⚠️ GPT guessed invalid ticker: {guess}")
+        return None
 
-        return guess
+    if not entities.is_top_volume(guess):
+        print(f"⚠️ GPT guessed low-volume ticker (filtered): {guess}")
+        return None
 
+    return guess
+
+# === Combined mode: one structured call for filter + ticker + classification ===
+GPT_COMBINED_MODE = os.getenv("GPT_COMBINED_MODE", "0") == "1"
+MAX_TICKER_CANDIDATES = 3
+
+SIGNAL_LABELS = {"BUY": "🟢 Bullish", "SELL": "🔴 Bearish", "HOLD": "⚪️ Neutral"}
+
+NEWS_ANALYSIS_SCHEMA = {
+    "name": "news_signal",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "include": {"type": "boolean"},
+            "score": {"type": "integer"},
+            "category": {"type": "string"},
+            "ticker": {"type": "string"},
+            "signal": {"type": "string", "enum": ["BUY", "SELL", "HOLD"]},
+            "confidence": {"type": "integer"},
+            "reason": {"type": "string"},
+        },
+        "required": ["include", "score", "category", "ticker", "signal", "confidence", "reason"],
+        "additionalProperties": False,
+    },
+}
+
+def get_candidate_symbols(title, summary):
+    """Tickers the title names directly that also pass the context check."""
+    candidates = [s for s in get_entity_index().find(title) if s != "USDT"]
+    return [
+        s for s in candidates if is_ticker_consistent_with_context(s, title, summary)
+    ][:MAX_TICKER_CANDIDATES]
+
+def analyze_news_with_gpt(title, summary, source, candidates, market_change, conflicts):
+    """
+    Filter, pick a ticker and classify in a single JSON-schema response.
+    `candidates` maps symbol -> technicals fetched beforehand. Returns the
+    parsed dict, or None if the call or validation failed.
+    """
+    if candidates:
+        candidate_block = "\n".join(
+            f"- {symbol}: RSI {t['rsi']} ({t['rsi_label']}, {t['rsi_trend']}), "
+            f"MA {t['ma_crossover']}, Volume {t['volume_spike']}, "
+            + (f"Higher TF: {format_timeframe_context(t['timeframes'])}, " if t.get("timeframes") else "")
+            + f"Contradiction Flag: {conflicts.get(symbol, False)}"
+            for symbol, t in candidates.items()
+        )
+    else:
+        candidate_block = "- none found in the headline"
+
+    prompt = f"""
+You are an AI signal filter and analyst. For the crypto news below:
+1. Decide whether it is market-moving hard news (include, score 0-100, category such as Listing, Regulation, Hack, Upgrade, Macro, Whale).
+2. Pick ONE Binance USDT perpetual futures symbol it is about. Prefer the candidates below; otherwise return the most relevant symbol ending in USDT, or NONE if unsure.
+3. Interpret the news + technical indicators as BUY/SELL/HOLD with a confidence 0-100.
+Give the reason in your own words, no quotes.
+
+📄 Source: {source or "Unknown"}
+Title: {title}
+Summary: {summary}
+Market Change: {market_change}
+Candidate tickers with technical indicators:
+{candidate_block}
+"""
+    try:
+        response = gpt.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            response_format={"type": "json_schema", "json_schema": NEWS_ANALYSIS_SCHEMA}
+        )
+        result = json.loads(response.choices[0].message.content)
+        if result.get("signal") not in SIGNAL_LABELS:
+            return None
+        for key in ("score", "confidence"):
+            if not isinstance(result.get(key), int) or not 0 <= result[key] <= 100:
+                return None
+        if not isinstance(result.get("include"), bool):
+            return None
+        result["ticker"] = str(result.get("ticker", "")).strip().upper()
+        return result
     except Exception as e:
-        print("❌ GPT ticker guess error:", e)
+        print("❌ GPT combined analysis error:", e)
         return None
 
 def get_futures_price(symbol):
-    try:
-        r = requests.get(BINANCE_FUTURES_URL, params={"symbol": symbol})
-        return float(r.json()["price"])
-    except:
-        return None
+    # From the shared all-symbols snapshot, refreshed at most every PRICE_SNAPSHOT_TTL
+    return prices.get(symbol)
 
 def is_ticker_consistent_with_context(ticker, title, summary):
     """
     Ensure the selected ticker is explicitly referenced in the news title or summary.
     This prevents false matches like ACTUSDT from 'CLARITY ACT'.
     """
-    base_token = symbol_to_token.get(ticker)
-    if not base_token:
-        return False
-
-    content = f"{title} {summary}".upper()
-
-    # Direct token match
-    if base_token in content:
-        return True
-
-    # Alias-based matching (expand as needed)
-    token_aliases = {
-        "BTC": ["BITCOIN"],
-        "ETH": ["ETHEREUM"],
-        "XRP": ["RIPPLE"],
-        "DOGE": ["DOGECOIN"],
-        "SHIB": ["SHIBA", "SHIBA INU"],
-        "PEPE": ["PEPECOIN"],
-        "ADA": ["CARDANO"],
-        "SOL": ["SOLANA"],
-        "BNB": ["BINANCE COIN", "BSC"],
-        "DOT": ["POLKADOT"],
-        "LTC": ["LITECOIN"],
-        "AVAX": ["AVALANCHE"],
-        "MATIC": ["POLYGON"],
-    }
-
-    for alias in token_aliases.get(base_token, []):
-        if alias in content:
-            return True
+    # Same surface forms and word rules as title matching, in one pass
+    return get_entity_index().is_consistent(ticker, f"{title} {summary}")
+
+# === PIPELINE STAGES ===
+# main() streams news through these stages (see pipeline.py). Each takes the
+# item dict from get_rss_news, adds what it learned, and returns it — or
+# returns None to drop the item, exactly where the old loop did `continue`.
+
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+STAGE_WORKERS = {
+    "filter": int(os.getenv("FILTER_WORKERS", "4")),
+    "resolve": int(os.getenv("RESOLVE_WORKERS", "4")),
+    "enrich": int(os.getenv("ENRICH_WORKERS", "4")),
+    "classify": int(os.getenv("CLASSIFY_WORKERS", "4")),
+}
+
+def apply_filter_result(item, filter_result):
+    title = item["title"]
+    score = filter_result["score"]
+    if filter_result["type"] == "Error":
+        # GPT outage, not a verdict: don't cache a negative for it
+        record_transient(item, "filter", filter_result["reason"])
+        return None
 
-    return False
+    record_gpt_verdict(item.get("junk_prob"), filter_result["include"] and score >= 60)
+
+    if not filter_result["include"] or score < 60:
+        print(f"🗞️ Skipped: {title} — Score {score} ({filter_result['reason']})")
+        log_skipped_news(
+            title=title,
+            summary=item["summary"],
+            source=item["source"],
+            reason=filter_result["reason"],
+            score=score,
+            category=filter_result["type"]
+        )
+        for news_id in [item["id"], *item.get("duplicate_ids", [])]:
+            save_cached_result(news_id, {"is_hard_news": False})
+        return None
 
-# === MAIN ===
-def main():
-    news = get_rss_news()
-    print(f"Fetched {len(news)} items.")
-    posted_ids = load_posted_ids()
+    item["filter"] = filter_result
+    record_progress(item["id"], "filter", filter=filter_result)
+    return item
 
-    for item in news:
-        news_id = item["id"]
-        if news_id in posted_ids:
-            continue
+def resume_from_stage_state(item):
+    """
+    Returns False if an earlier run blocked the item or its retry isn't due;
+    otherwise restores the filter verdict / ticker it already paid for.
+    """
+    state = get_stage_state(item["id"])
+    if state is None:
+        return True
+    if state["status"] == "blocked":
+        return False
+    if state["status"] == "transient" and state["next_retry_at"] > time.time():
+        return False
+    for key in ("filter", "ticker"):
+        if key in state["data"]:
+            item[key] = state["data"][key]
+    return True
+
+def lookup_cached(item):
+    """Returns (item, done): done=True when the GPT cache or stage state already decided the item."""
+    cached = get_cached_result(item["id"])
+    if not cached:
+        if not resume_from_stage_state(item):
+            return None, True
+        return item, "filter" in item
+    if not cached.get("is_hard_news") or cached.get("confidence", 0) < 60:
+        return None, True
+    item["cached"] = cached
+    return item, True
+
+def prefiltered_as_junk(item):
+    """Local headline model: drop confident junk before it costs a GPT call."""
+    drop, item["junk_prob"] = prefilter(item["title"])
+    if drop:
+        print(f"🧹 Prefiltered: {item['title']} — P(junk) {item['junk_prob']:.2f}")
+        for news_id in [item["id"], *item.get("duplicate_ids", [])]:
+            save_cached_result(news_id, {"is_hard_news": False, "prefiltered": True})
+    return drop
+
+def filter_stage(item):
+    item, done = lookup_cached(item)
+    if done:
+        return item
+    if prefiltered_as_junk(item):
+        return None
+    return gpt_filter(item)
+
+def gpt_filter(item):
+    """The GPT half of filter_stage, for an item the cache and prefilter already passed."""
+    filter_result = evaluate_news_quality_with_gpt(item["title"], item["summary"], item["source"])
+    return apply_filter_result(item, filter_result)
+
+def filter_batch_stage(items):
+    results = [None] * len(items)
+    uncached = []
+    for i, item in enumerate(items):
+        results[i], done = lookup_cached(item)
+        if not done and not prefiltered_as_junk(item):
+            uncached.append(i)
+
+    if uncached:
+        verdicts = evaluate_news_batch_with_gpt([items[i] for i in uncached])
+        for i in uncached:
+            results[i] = apply_filter_result(items[i], verdicts[items[i]["id"]])
+    return results
+
+def resolve_stage(item):
+    if "cached" in item:
+        item["ticker"] = item["cached"].get("ticker")
+        return item if item["ticker"] else None
+    if item.get("ticker"):
+        return item
+
+    title = item["title"]
+    summary = item["summary"]
+    ticker = get_symbol_for_title(title) or guess_ticker_from_gpt(title, summary)
+    if not ticker:
+        record_block(item["id"], "resolve", "no ticker")
+        return None
+    if ticker == "USDT":
+        record_block(item["id"], "resolve", "ticker is USDT")
+        return None
 
-        title = item["title"]
-        url = item["url"]
-        summary = item["summary"]
-        source = item["source"]
+    # 🚨 FINAL CONTEXT VALIDATION (title + summary vs ticker)
+    if not is_ticker_consistent_with_context(ticker, title, summary):
+        print(
+            f"❌ BLOCKED: Ticker {ticker} not consistent with news context | "
+            f"Title: {title}"
+        )
+        record_block(item["id"], "resolve", f"{ticker} not consistent with context")
+        return None
 
-        cached = get_cached_result(news_id)
-        if cached:
-            if not cached.get("is_hard_news") or cached.get("confidence", 0) < 60:
-                continue
+    item["ticker"] = ticker
+    record_progress(item["id"], "resolve", ticker=ticker)
+    return item
 
-            ticker = cached.get("ticker")
-            if not ticker:
-                continue
+def analyze_stage(item):
+    """
+    Combined mode: filter, ticker choice and classification in one GPT call.
+    Falls back to the filter + resolve chain if the structured call fails.
+    """
+    item, done = lookup_cached(item)
+    if done:
+        return resolve_stage(item) if item else None
+    if prefiltered_as_junk(item):
+        return None
 
-            price_at_signal = get_futures_price(ticker)
-            if price_at_signal is None:
-                continue
+    title = item["title"]
+    summary = item["summary"]
+
+    candidates = {}
+    for symbol in get_candidate_symbols(title, summary):
+        technicals = get_technical_indicators(symbol)
+        if technicals:
+            candidates[symbol] = technicals
+    conflicts = {symbol: has_contradiction(symbol, "UNKNOWN") for symbol in candidates}
+    market_change = get_market_change_summary()
+
+    result = analyze_news_with_gpt(title, summary, item["source"], candidates, market_change, conflicts)
+    if result is None:
+        # Cache lookup and prefilter (with its audit roll) already ran above
+        item = gpt_filter(item)
+        return resolve_stage(item) if item else None
+
+    item = apply_filter_result(item, {
+        "include": result["include"],
+        "score": result["score"],
+        "type": result["category"],
+        "reason": result["reason"],
+    })
+    if item is None:
+        return None
 
-            technicals = get_technical_indicators(ticker)
-            if not technicals:
-                continue
+    # Same guard rails as the chained path
+    ticker = result["ticker"] if result["ticker"] in candidates else validate_gpt_ticker(result["ticker"])
+    if not ticker:
+        record_block(item["id"], "analyze", "no ticker")
+        return None
+    if ticker == "USDT":
+        record_block(item["id"], "analyze", "ticker is USDT")
+        return None
+    if not is_ticker_consistent_with_context(ticker, title, summary):
+        print(
+            f"❌ BLOCKED: Ticker {ticker} not consistent with news context | "
+            f"Title: {title}"
+        )
+        record_block(item["id"], "analyze", f"{ticker} not consistent with context")
+        return None
+    item["ticker"] = ticker
+    record_progress(item["id"], "analyze", ticker=ticker)
+
+    # A ticker outside the candidates was classified without its TA;
+    # leave it to classify_stage, which runs with the real indicators.
+    if ticker in candidates:
+        item["technicals"] = candidates[ticker]
+        item["market_change"] = market_change
+        item["has_conflict"] = conflicts[ticker]
+        finalize_classification(
+            item, result["signal"], SIGNAL_LABELS[result["signal"]], result["confidence"], result["reason"]
+        )
+    return item
 
-            signal = cached["signal"]
-            label = cached["label"]
-            confidence = cached["confidence"]
-            reason = cached["reason"]
-            chart_link = f"https://www.tradingview.com/symbols/{ticker}/"
+def enrich_stage(item):
+    ticker = item["ticker"]
+    item["price_at_signal"] = get_futures_price(ticker)
+    if item["price_at_signal"] is None:
+        record_transient(item, "enrich", f"no price for {ticker}")
+        return None
 
-            contradiction_warning = ""
-            if has_contradiction(ticker, signal):
-                contradiction_warning = f"⚠️ *INDECISION*: Conflicting signals recently detected for *{ticker}*\n\n"
+    if not item.get("technicals"):
+        item["technicals"] = get_technical_indicators(ticker)
+    if not item["technicals"]:
+        if "cached" not in item:
+            print(f"⚠️ Skipping signal due to missing TA data for: {ticker}")
+        record_transient(item, "enrich", f"missing TA data for {ticker}")
+        return None
 
-            message = f"""{contradiction_warning}📊 Signal from news for {ticker}: {signal}
-{label} {title}
-📈 Signal Strength Confidence: {confidence}%
+    if "cached" not in item and "signal" not in item:
+        item["market_change"] = get_market_change_summary()
+        # Provisional: earlier items of this cycle may still be unpublished;
+        # publish_stage checks again and reclassifies if it changed
+        item["has_conflict"] = has_contradiction(ticker, "UNKNOWN")
+    return item
+
+def classify_stage(item):
+    if "cached" in item:
+        cached = item["cached"]
+        item["signal"] = cached["signal"]
+        item["label"] = cached["label"]
+        item["confidence"] = cached["confidence"]
+        item["reason"] = cached["reason"]
+        return item
+
+    # Already classified by the combined analysis call
+    if "signal" in item:
+        return item
+
+    return classify_item(item)
+
+def classify_item(item):
+    signal, label, confidence, reason = classify_news_with_gpt(
+        item["title"], item["summary"], item["ticker"], datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+        item["source"], item["market_change"], item["has_conflict"], item["technicals"]
+    )
+    return finalize_classification(item, signal, label, confidence, reason)
+
+def finalize_classification(item, signal, label, confidence, reason):
+    # === Signal Confidence Tier Flag ===
+    item["low_confidence"] = 60 <= int(confidence) < 70
+
+    confidence = calibrate_confidence(
+        raw_confidence=int(confidence),
+        ticker_source="symbol_map",
+        source_count=item.get("source_count", 1),
+        historical_price_change=None
+    )
+
+    item["signal"] = signal
+    item["label"] = label
+    item["confidence"] = confidence
+    item["reason"] = reason
+    return item
+
+def cache_classification(item):
+    # Only once the item is about to be published: the combined path
+    # classifies before enrich, and a cached verdict would bring a retried
+    # item back as "cached", skipping the conflict re-check below
+    save_cached_result(item["id"], {
+        "is_hard_news": True,
+        "signal": item["signal"],
+        "label": item["label"],
+        "confidence": int(item["confidence"]),
+        "reason": item["reason"],
+        "ticker": item["ticker"],
+        "ticker_source": "symbol_map"
+    })
+
+def build_signal_message(item, contradiction_warning, chart_link):
+    ticker = item["ticker"]
+    technicals = item["technicals"]
+    timeframes = ""
+    if technicals.get("timeframes"):
+        timeframes = f"\n🕰️ Higher TF: {format_timeframe_context(technicals['timeframes'])}"
+
+    if "cached" in item:
+        message = f"""{contradiction_warning}📊 Signal from news for {ticker}: {item['signal']}
+{item['label']} {item['title']}
+📈 Signal Strength Confidence: {item['confidence']}%
 🔁 RSI: {technicals['rsi']} ({technicals['rsi_label']}, {technicals['rsi_trend']})
 📊 MA: {technicals['ma_crossover']}
-🔊 Volume: {technicals['volume_spike']}
-💬 GPT: {reason}
+🔊 Volume: {technicals['volume_spike']}{timeframes}
+💬 GPT: {item['reason']}
 
 ⚠️ This is AI-generated market insight. Not financial advice.
-🔗 {url}"""
-
-            if chart_link:
-                message += f"\n📊 [View Chart]({chart_link})"
-
-            send_telegram_message(message)
-            save_posted_id(news_id)
-            log_to_csv(signal, label, confidence, title, reason, url, chart_link, ticker, price_at_signal, technicals)
-            continue
-
-        # ========== Uncached ==========
-        filter_result = evaluate_news_quality_with_gpt(title, summary, source)
-        score = filter_result["score"]
-
-        if not filter_result["include"] or score < 60:
-            print(f"🗞️ Skipped: {title} — Score {score} ({filter_result['reason']})")
-            log_skipped_news(
-                title=title,
-                summary=summary,
-                source=source,
-                reason=filter_result["reason"],
-                score=score,
-                category=filter_result["type"]
-            )
-            save_cached_result(news_id, {"is_hard_news": False})
-            continue
-
-        ticker = get_symbol_for_title(title) or guess_ticker_from_gpt(title, summary)
-        if not ticker or ticker == "USDT":
-            continue
+🔗 {item['url']}"""
+    else:
+        confidence_banner = ""
+        if item["low_confidence"]:
+            confidence_banner = "⚠️ *Low‑Confidence Signal — For awareness only*\n\n"
 
-        # 🚨 FINAL CONTEXT VALIDATION (title + summary vs ticker)
-        if not is_ticker_consistent_with_context(ticker, title, summary):
-            print(
-                f"❌ BLOCKED: Ticker {ticker} not consistent with news context | "
-                f"Title: {title}"
-            )
-            continue
+        message = f"""{confidence_banner}{contradiction_warning}📊 Signal from news for {ticker}: {item['signal']}
+{item['label']} {item['title']}
 
-        price_at_signal = get_futures_price(ticker)
-        if price_at_signal is None:
-            continue
+📈 Confidence: **{item['confidence']}%**
+🔁 RSI: {technicals['rsi']} ({technicals['rsi_label']}, {technicals['rsi_trend']})
+📊 MA: {technicals['ma_crossover']}
+🔊 Volume: {technicals['volume_spike']}{timeframes}
 
-        # === GPT CLASSIFICATION ===
-        technicals = get_technical_indicators(ticker)
-        if not technicals:
-            print(f"⚠️ Skipping signal due to missing TA data for: {ticker}")
-            continue
+💬 GPT: {item['reason']}
 
-        market_change = get_market_change_summary()
-        has_conflict = has_contradiction(ticker, "UNKNOWN")
+🔎 Futures‑based indicators (5m OHLCV) · AI‑generated insight for learning · Not financial advice 
+🔗 {item['url']}
+"""
 
-        signal, label, confidence, reason = classify_news_with_gpt(
-            title, summary, ticker, datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"), source, market_change, has_conflict, technicals
+    if chart_link:
+        message += f"\n📊 [View Chart]({chart_link})"
+    return message
+
+# === TA-only updates (daemon mode) ===
+# The scanner reports RSI / MA / volume threshold crossings on every candle
+# close; they go to the channels only while no news signal went out recently,
+# and at most once per TA_MIN_INTERVAL_SECONDS.
+TA_UPDATES = os.getenv("TA_UPDATES", "0") == "1"
+TA_QUIET_SECONDS = int(os.getenv("TA_QUIET_SECONDS", "3600"))
+TA_MIN_INTERVAL_SECONDS = int(os.getenv("TA_MIN_INTERVAL_SECONDS", "3600"))
+TA_MAX_EVENTS = int(os.getenv("TA_MAX_EVENTS", "5"))
+
+TA_EVENT_LABELS = {
+    "rsi_oversold": "🟢 RSI crossed into oversold",
+    "rsi_overbought": "🔴 RSI crossed into overbought",
+    "ma_bullish": "📈 MA 20 crossed above MA 50",
+    "ma_bearish": "📉 MA 20 crossed below MA 50",
+    "volume_spike": "🔊 Volume spike",
+}
+
+_last_signal_at = 0.0
+_last_ta_at = 0.0
+
+def build_ta_message(events):
+    lines = [f"📊 *TA update* — no news signal in the last {TA_QUIET_SECONDS // 60} min\n"]
+    for event in events:
+        lines.append(
+            f"{TA_EVENT_LABELS[event['event']]}: *{event['symbol']}* @ {event['close']:g} "
+            f"(RSI {event['rsi']}, volume {event['volume_ratio']:.0f}% of avg)"
         )
+    lines.append("\n🔎 Futures‑based indicators (5m OHLCV) · Not financial advice")
+    return "\n".join(lines)
+
+def publish_ta_events(events):
+    global _last_ta_at
+    for event in events:
+        print(f"📊 {event['symbol']}: {event['event']} (RSI {event['rsi']}, volume {event['volume_ratio']:.0f}%)")
+    now = time.time()
+    if not TA_UPDATES or now - _last_signal_at < TA_QUIET_SECONDS or now - _last_ta_at < TA_MIN_INTERVAL_SECONDS:
+        return
+    # Strongest volume first: the crossings most likely to matter
+    events = sorted(events, key=lambda event: -event["volume_ratio"])
+    send_telegram_message(build_ta_message(events[:TA_MAX_EVENTS]))
+    _last_ta_at = time.time()
 
-        # === Signal Confidence Tier Flag ===
-        low_confidence = 60 <= int(confidence) < 70
-        confidence_banner = ""
-        if low_confidence:
-            confidence_banner = "⚠️ *Low‑Confidence Signal — For awareness only*\n\n"
-
-        confidence = calibrate_confidence(
-            raw_confidence=int(confidence),
-            ticker_source="symbol_map",
-            source_count=1,
-            historical_price_change=None
-        )
+def publish_stage(item):
+    """
+    Ordered: send + log run back to back in input order, so each
+    contradiction check (and the conflict flag the classification saw)
+    reflects exactly the signals logged before it, the same as the old
+    sequential loop.
+    """
+    global _last_signal_at
+    ticker = item["ticker"]
+    chart_link = f"https://www.tradingview.com/symbols/{ticker}/"
+
+    # Classification ran concurrently, possibly before an earlier item of
+    # this cycle logged a signal for the same ticker; now every earlier item
+    # is logged, so redo it if the conflict state it saw was different
+    if "cached" not in item:
+        has_conflict = has_contradiction(ticker, "UNKNOWN")
+        if has_conflict != item["has_conflict"]:
+            item["has_conflict"] = has_conflict
+            classify_item(item)
+        cache_classification(item)
 
-        contradiction_warning = ""
-        if has_contradiction(ticker, signal):
-            contradiction_warning = f"⚠️ *INDECISION*: Conflicting signals recently detected for *{ticker}*\n\n"
-
-        save_cached_result(news_id, {
-            "is_hard_news": True,
-            "signal": signal,
-            "label": label,
-            "confidence": int(confidence),
-            "reason": reason,
-            "ticker": ticker,
-            "ticker_source": "symbol_map"
-        })
+    contradiction_warning = ""
+    if has_contradiction(ticker, item["signal"]):
+        contradiction_warning = f"⚠️ *INDECISION*: Conflicting signals recently detected for *{ticker}*\n\n"
 
-        chart_link = f"https://www.tradingview.com/symbols/{ticker}/"
+    message = build_signal_message(item, contradiction_warning, chart_link)
+    if "cached" not in item:
+        print("Sending:", message)
+    send_telegram_message(message)
+    _last_signal_at = time.time()
 
-        message = f"""{confidence_banner}{contradiction_warning}📊 Signal from news for {ticker}: {signal}
-{label} {title}
+    # === log ===
+    for news_id in [item["id"], *item.get("duplicate_ids", [])]:
+        save_posted_id(news_id)
+    clear_stage_state(item["id"])
+    log_to_csv(
+        item["signal"], item["label"], item["confidence"], item["title"], item["reason"],
+        item["url"], chart_link, ticker, item["price_at_signal"], item["technicals"]
+    )
+    return item
 
-📈 Confidence: **{confidence}%**
-🔁 RSI: {technicals['rsi']} ({technicals['rsi_label']}, {technicals['rsi_trend']})
-📊 MA: {technicals['ma_crossover']}
-🔊 Volume: {technicals['volume_spike']}
+# === MAIN ===
+def run_cycle(posted_ids):
+    news = get_rss_news()
+    print(f"Fetched {len(news)} items.")
+    unseen = [item for item in news if item["id"] not in posted_ids]
+    stories, late = collapse_stories(unseen)
+    if len(stories) + len(late) < len(unseen):
+        print(f"🧩 {len(unseen) - len(late)} unseen items collapsed into {len(stories)} stories.")
+    if late:
+        # Copies of a story an earlier cycle already handled: settled with it
+        print(f"🧩 {len(late)} late copies of earlier stories not published again.")
+        for news_id in late:
+            save_posted_id(news_id)
+        posted_ids.update(late)
+
+    # Items whose price/TA/GPT failure is due for another try; the feed
+    # cursor won't return them again
+    queued = {item["id"] for item in stories}
+    retries = [item for item in due_retries() if item["id"] not in posted_ids and item["id"] not in queued]
+    if retries:
+        print(f"🔁 Retrying {len(retries)} items after transient failures.")
+        stories.extend(retries)
+
+    if GPT_COMBINED_MODE:
+        front = [Stage("analyze", analyze_stage, STAGE_WORKERS["filter"])]
+    else:
+        front = [
+            Stage("filter", filter_batch_stage, STAGE_WORKERS["filter"], batch_size=FILTER_BATCH_SIZE)
+            if FILTER_BATCH_SIZE > 1 else Stage("filter", filter_stage, STAGE_WORKERS["filter"]),
+            Stage("resolve", resolve_stage, STAGE_WORKERS["resolve"]),
+        ]
+
+    stages = [
+        *front,
+        Stage("enrich", enrich_stage, STAGE_WORKERS["enrich"]),
+        Stage("classify", classify_stage, STAGE_WORKERS["classify"]),
+        Stage("publish", publish_stage, ordered=True),
+    ]
+    published = run_pipeline(stories, stages, queue_size=PIPELINE_QUEUE_SIZE)
+    failed_ids = {
+        news_id for stage in stages for item in stage.failed
+        for news_id in [item["id"], *item.get("duplicate_ids", [])]
+    }
+    if failed_ids:
+        print(f"🔁 {len(failed_ids)} items failed mid-pipeline; their feeds will return them next poll.")
+    save_feed_cursors(failed_ids)
+    print_stage_stats(stages)
+    gpt.print_stats()
+    prices.print_stats()
+    regime.print_stats()
+    if get_market_data():
+        get_market_data().print_stats()
+    binance.print_stats()
+    print_prefilter_stats(*gpt.average_call())
+    flush_gpt_cache()
+    print_cache_stats()
+    prune_stage_state()
+    print(f"Published {len(published)} signals.")
+    for item in published:
+        posted_ids.add(item["id"])
+        posted_ids.update(item.get("duplicate_ids", []))
+    return published
 
-💬 GPT: {reason}
+def main():
+    refresh_symbol_map()
+    run_cycle(load_posted_ids())
 
-🔎 Futures‑based indicators (5m OHLCV) · AI‑generated insight for learning · Not financial advice 
-🔗 {url}
-"""
-        if chart_link:
-            message += f"\n📊 [View Chart]({chart_link})"
+def run_daemon(poll_seconds=DAEMON_POLL_SECONDS, refresh_seconds=SYMBOL_MAP_REFRESH_SECONDS):
+    """
+    Keep the engine resident: clients, symbol indexes, posted ids and the
+    kline ring buffers stay in memory and feeds are polled every
+    `poll_seconds`. The symbol map is refreshed on a background timer
+    instead of on every run.
+    """
+    refresh_symbol_map()
+    schedule_symbol_map_refresh(refresh_seconds)
+    start_compaction_thread()
+    # Indicators for the top-volume contracts (or every contract) come from
+    # streamed klines, and the scanner watches them for TA-only updates
+    index = get_entity_index()
+    universe = index.symbols.tolist() if MARKET_DATA_UNIVERSE == "all" else index.top_volume_symbols()
+    service = start_market_data(universe + REGIME_SYMBOLS)
+    if service:
+        start_ta_scanner(service, publish_ta_events)
+        # Kept fresh from the 1m rings; classification calls never wait for it
+        regime.start()
+    posted_ids = load_posted_ids()
+    print(f"🛰️ Daemon started — polling {len(RSS_FEEDS)} feeds every {poll_seconds}s.")
 
-        print("Sending:", message)
-        send_telegram_message(message)
-        save_posted_id(news_id)
-        log_to_csv(signal, label, confidence, title, reason, url, chart_link, ticker, price_at_signal, technicals)
+    while True:
+        started = time.monotonic()
+        try:
+            run_cycle(posted_ids)
+        except Exception as e:
+            print(f"❌ Cycle failed: {e}")
+        time.sleep(max(0.0, poll_seconds - (time.monotonic() - started)))
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="iCryptoPulse news signal engine")
+    parser.add_argument("--daemon", action="store_true", help="keep running and poll feeds on a schedule")
+    parser.add_argument("--interval", type=int, default=DAEMON_POLL_SECONDS, help="seconds between feed polls")
+    args = parser.parse_args()
+
+    if args.daemon:
+        try:
+            run_daemon(poll_seconds=args.interval)
+        except KeyboardInterrupt:
+            print("👋 Daemon stopped.")
+    else:
+        main()
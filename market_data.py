@@ -0,0 +1,510 @@
+# market_data.py
+# Live klines for the top-volume contracts, kept in fixed-size NumPy ring
+# buffers fed by Binance's combined kline WebSocket stream. Every symbol is
+# backfilled over REST when the stream (re)connects, so technical indicators
+# are computed from memory instead of a REST download per call. Binance
+# allows 200 streams per connection, so a large universe is spread over
+# several connections. Backfills run on worker threads, never on a stream's
+# own, so the sockets keep being read; a symbol's stream updates are held
+# until its backfill lands, and backfills only use part of the REST weight
+# budget so a full-universe reconnect doesn't starve other calls. Only 1m is
+# streamed; the 5m/15m/1h/4h rings are derived from it (timeframes.py). Started by
+# main.py in daemon mode; get_market_data() is None otherwise and callers
+# fall back to REST.
+#
+#   python3 kline_replay_server.py        # local stand-in for Binance
+#   BINANCE_FAPI_URL=http://127.0.0.1:8765 BINANCE_FSTREAM_URL=ws://127.0.0.1:8765 python3 main.py --daemon
+
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from binance_client import binance
+from indicator_engine import IndicatorState
+from timeframes import FrameBuilder, resample
+
+try:
+    import websocket   # websocket-client
+except ImportError:
+    websocket = None
+
+BINANCE_FSTREAM_URL = os.getenv("BINANCE_FSTREAM_URL", "wss://fstream.binance.com")
+MARKET_DATA_STREAM = os.getenv("MARKET_DATA_STREAM", "1") == "1"
+KLINE_INTERVAL = os.getenv("MARKET_DATA_INTERVAL", "1m")
+# Timeframes derived from the streamed one, without streams of their own
+MARKET_DATA_FRAMES = [frame for frame in os.getenv("MARKET_DATA_FRAMES", "5m,15m,1h,4h").split(",") if frame]
+# "top" streams the top-volume contracts, "all" every USDT perpetual
+MARKET_DATA_UNIVERSE = os.getenv("MARKET_DATA_UNIVERSE", "top")
+RING_SIZE = int(os.getenv("MARKET_DATA_RING_SIZE", "1500"))   # one REST page: 25h of 1m
+FRAME_RING_SIZE = int(os.getenv("MARKET_DATA_FRAME_RING_SIZE", "300"))
+# No stream message for this long and readers fall back to REST
+STALE_SECONDS = float(os.getenv("MARKET_DATA_STALE_SECONDS", "30"))
+BACKFILL_WORKERS = 8
+# Share of the per-minute REST weight budget backfills may fill (binance_client.WeightTracker)
+BACKFILL_WEIGHT_SHARE = float(os.getenv("MARKET_DATA_BACKFILL_WEIGHT_SHARE", "0.5"))
+MAX_STREAMS_PER_CONNECTION = 200   # Binance futures limit
+BACKFILL_RETRY_SECONDS = 30.0   # after a failed backfill, before the symbol's next update tries again
+RECONNECT_DELAY_CAP = 60.0
+
+KLINES_PATH = "/fapi/v1/klines"
+MAX_KLINES_LIMIT = 1500   # per REST request
+INTERVAL_MS = {"1m": 60000, "3m": 180000, "5m": 300000, "15m": 900000, "30m": 1800000, "1h": 3600000,
+               "2h": 7200000, "4h": 14400000}
+
+
+class KlineRing:
+    """
+    The last `size` candles of one symbol, oldest overwritten first. The
+    newest slot is the candle still forming, as in a REST klines response;
+    stream updates for it overwrite it in place, and each candle is folded
+    into the running indicators once the next one opens.
+    """
+
+    def __init__(self, size, interval_ms):
+        self.size = size
+        self.interval_ms = interval_ms
+        self.open_time = np.zeros(size, dtype=np.int64)
+        self.ohlcv = np.zeros((size, 5), dtype=np.float64)   # open, high, low, close, volume
+        self.count = 0
+        self.head = 0   # next slot to write
+        self.indicators = IndicatorState()   # over closed candles only
+        self.lock = threading.Lock()
+
+    def _append(self, open_time, values):
+        self.open_time[self.head] = open_time
+        self.ohlcv[self.head] = values
+        self.head = (self.head + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def load(self, rows):
+        """Replace the contents with REST kline rows, oldest first. The
+        indicator state is rebuilt from every closed candle in `rows`."""
+        self.load_arrays(*parse_kline_rows(rows))
+
+    def load_arrays(self, open_time, ohlcv):
+        """load() for open times and an (n x 5) open/high/low/close/volume array."""
+        with self.lock:
+            self.indicators = IndicatorState()
+            for close, volume in zip(ohlcv[:-1, 3].tolist(), ohlcv[:-1, 4].tolist()):
+                self.indicators.add(close, volume)
+            n = min(len(open_time), self.size)
+            self.open_time[:n] = open_time[len(open_time) - n:]
+            self.ohlcv[:n] = ohlcv[len(ohlcv) - n:]
+            self.count = n
+            self.head = n % self.size
+
+    def update(self, open_time, values):
+        """
+        Apply one stream update. Returns False when it leaves a hole (candles
+        missed between this one and the last), so the caller can backfill.
+        """
+        with self.lock:
+            if self.count:
+                last = (self.head - 1) % self.size
+                last_open = self.open_time[last]
+                if open_time == last_open:
+                    self.ohlcv[last] = values
+                    return True
+                if open_time < last_open:
+                    return True   # late update for a candle already superseded
+                # A newer candle means the last one has closed
+                self.indicators.add(self.ohlcv[last, 3], self.ohlcv[last, 4])
+                if open_time > last_open + self.interval_ms:
+                    self._append(open_time, values)
+                    return False
+            self._append(open_time, values)
+            return True
+
+    def closed_before(self, n, before):
+        """(closes, volumes) of the newest `n` candles opened before `before`, oldest first."""
+        window = self.window(self.count)
+        keep = window["open_time"] < before
+        return window["close"][keep][-n:], window["volume"][keep][-n:]
+
+    def candle_at(self, open_time):
+        """(close, volume) of the candle that opened at `open_time`, or None."""
+        with self.lock:
+            for back in range(1, min(self.count, 3) + 1):
+                i = (self.head - back) % self.size
+                if self.open_time[i] == open_time:
+                    return float(self.ohlcv[i, 3]), float(self.ohlcv[i, 4])
+        return None
+
+    def snapshot(self):
+        """Indicators with the forming candle on top of the running state, or None."""
+        with self.lock:
+            if not self.count:
+                return None
+            last = (self.head - 1) % self.size
+            return self.indicators.snapshot(float(self.ohlcv[last, 3]), float(self.ohlcv[last, 4]))
+
+    def arrays(self, n):
+        """(open_time, ohlcv) copies of the newest `n` candles, oldest first."""
+        with self.lock:
+            n = min(n, self.count)
+            start = (self.head - n) % self.size
+            if start + n <= self.size:
+                return self.open_time[start:start + n].copy(), self.ohlcv[start:start + n].copy()
+            index = np.arange(start, start + n) % self.size
+            return self.open_time[index], self.ohlcv[index]
+
+    def window(self, n):
+        """The newest `n` candles, oldest first, as copies: {"open_time", "open", ..., "volume"}."""
+        open_time, ohlcv = self.arrays(n)
+        return {
+            "open_time": open_time,
+            "open": ohlcv[:, 0],
+            "high": ohlcv[:, 1],
+            "low": ohlcv[:, 2],
+            "close": ohlcv[:, 3],
+            "volume": ohlcv[:, 4],
+        }
+
+
+def parse_kline_rows(rows):
+    """(open_time, ohlcv) arrays from REST kline rows."""
+    open_time = np.array([int(row[0]) for row in rows], dtype=np.int64)
+    ohlcv = np.array([[float(value) for value in row[1:6]] for row in rows], dtype=np.float64).reshape(-1, 5)
+    return open_time, ohlcv
+
+
+class MarketDataService:
+    def __init__(self, symbols, interval=KLINE_INTERVAL, ring_size=RING_SIZE, frames=MARKET_DATA_FRAMES,
+                 frame_ring_size=FRAME_RING_SIZE, stream_url=BINANCE_FSTREAM_URL, client=binance):
+        self.symbols = sorted(set(symbols))
+        self.interval = interval
+        self.ring_size = ring_size
+        self.stream_url = stream_url.rstrip("/")
+        self.client = client
+        self.rings = {symbol: KlineRing(ring_size, INTERVAL_MS[interval]) for symbol in self.symbols}
+        # Derived timeframes: whole multiples of the streamed interval
+        self.frames = [frame for frame in frames
+                       if frame != interval and INTERVAL_MS[frame] % INTERVAL_MS[interval] == 0]
+        self.frame_ring_size = frame_ring_size
+        self.frame_rings = {
+            symbol: {frame: KlineRing(frame_ring_size, INTERVAL_MS[frame]) for frame in self.frames}
+            for symbol in self.symbols
+        }
+        self.builders = {symbol: FrameBuilder(INTERVAL_MS[frame] for frame in self.frames) for symbol in self.symbols}
+        # One stream connection per MAX_STREAMS_PER_CONNECTION symbols
+        self.shards = [self.symbols[i:i + MAX_STREAMS_PER_CONNECTION]
+                       for i in range(0, len(self.symbols), MAX_STREAMS_PER_CONNECTION)]
+        self.shard_of = {symbol: i for i, shard in enumerate(self.shards) for symbol in shard}
+        self.ready = set()   # symbols backfilled since their stream last connected
+        self.synced = 0      # connects (over all shards) whose backfill has finished
+        self.last_message = [0.0] * len(self.shards)
+        self.stopped = threading.Event()
+        self.sockets = [None] * len(self.shards)
+        self.threads = []
+        # Backfill work: the stream thread only queues it. Until a symbol's
+        # backfill lands its rings are stale (readers fall back to REST) and
+        # its stream updates are held in `held`, then replayed on top.
+        self.sync_lock = threading.Lock()
+        self.backfills = queue.Queue()
+        self.queued = set()     # symbols with a backfill queued or running
+        self.held = {}          # symbol -> {open_time: values} while it backfills
+        self.retry_at = {}      # symbol -> monotonic time a failed backfill may run again
+        self.connect_pending = [set() for _ in self.shards]   # symbols each shard's connect still waits for
+        self.connect_started = [0.0] * len(self.shards)
+        self.workers = []
+        self.stats = {"messages": 0, "connects": 0, "backfills": 0, "backfill_errors": 0, "gaps": 0,
+                      "frame_backfills": 0, "held_updates": 0, "served": 0, "fallbacks": 0}
+
+    def url(self, shard=0):
+        streams = "/".join(f"{symbol.lower()}@kline_{self.interval}" for symbol in self.shards[shard])
+        return f"{self.stream_url}/stream?streams={streams}"
+
+    def start(self):
+        self.workers = [
+            threading.Thread(target=self._backfill_worker, name=f"market-data-backfill-{i}", daemon=True)
+            for i in range(BACKFILL_WORKERS)
+        ]
+        for worker in self.workers:
+            worker.start()
+        self.threads = [
+            threading.Thread(target=self._run, args=(shard,), name=f"market-data-{shard}", daemon=True)
+            for shard in range(len(self.shards))
+        ]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        for ws in self.sockets:
+            if ws:
+                ws.close()
+        for thread in self.threads:
+            thread.join(timeout=5)
+
+    def _run(self, shard):
+        delay = 1.0
+        while not self.stopped.is_set():
+            connected_at = time.monotonic()
+            self.sockets[shard] = websocket.WebSocketApp(
+                self.url(shard),
+                on_open=lambda ws: self._on_open(shard),
+                on_message=lambda ws, message: self._on_message(shard, message),
+                on_error=self._on_error,
+            )
+            self.sockets[shard].run_forever(ping_interval=60, ping_timeout=20)
+            with self.sync_lock:
+                self.ready.difference_update(self.shards[shard])
+            if self.stopped.is_set():
+                break
+            # A connection that lived a while was a normal drop (Binance
+            # closes streams after 24h); only repeated quick failures back off
+            if time.monotonic() - connected_at > 60:
+                delay = 1.0
+            print(f"🔌 Kline stream {shard + 1}/{len(self.shards)} closed — reconnecting in {delay:.0f}s.")
+            self.stopped.wait(delay)
+            delay = min(RECONNECT_DELAY_CAP, delay * 2)
+
+    def _on_open(self, shard):
+        # Only queues the backfills: updates that arrive meanwhile are held
+        # per symbol and replayed once its backfill lands
+        with self.sync_lock:
+            self.stats["connects"] += 1
+            self.connect_started[shard] = time.monotonic()
+            self.connect_pending[shard] = set(self.shards[shard])
+            self.last_message[shard] = time.monotonic()
+            for symbol in self.shards[shard]:
+                self._queue_backfill(symbol)
+
+    def _on_error(self, ws, error):
+        print(f"❌ Kline stream error: {error}")
+
+    def _queue_backfill(self, symbol):
+        """Mark `symbol` stale and queue its backfill (caller holds sync_lock)."""
+        self.ready.discard(symbol)
+        if symbol not in self.queued:
+            self.queued.add(symbol)
+            self.held[symbol] = {}
+            self.backfills.put(symbol)
+
+    def _backfill_worker(self):
+        while not self.stopped.is_set():
+            try:
+                symbol = self.backfills.get(timeout=1)
+            except queue.Empty:
+                continue
+            self._backfill(symbol)
+
+    def _backfill(self, symbol):
+        # The downloads run without the lock, so the stream thread keeps
+        # going; updates held from before the request are older than its answer
+        params = {"symbol": symbol, "interval": self.interval, "limit": min(self.ring_size, MAX_KLINES_LIMIT)}
+        with self.sync_lock:
+            self.held[symbol] = {}
+        try:
+            open_time, ohlcv = parse_kline_rows(self.client.get(KLINES_PATH, params=params, share=BACKFILL_WEIGHT_SHARE))
+            frames = self._frame_bars(symbol, open_time, ohlcv)
+        except Exception as e:
+            print(f"❌ Kline backfill failed for {symbol}: {e}")
+            with self.sync_lock:
+                self.stats["backfill_errors"] += 1
+                self.retry_at[symbol] = time.monotonic() + BACKFILL_RETRY_SECONDS
+                self._backfill_done(symbol)
+            return
+        with self.sync_lock:
+            self.rings[symbol].load_arrays(open_time, ohlcv)
+            self._load_frames(symbol, open_time, ohlcv, frames)
+            synced = True
+            for held_open, values in sorted(self.held[symbol].items()):
+                synced = self._apply(symbol, held_open, values) and synced
+            self.stats["backfills"] += 1
+            if synced:
+                self.ready.add(symbol)
+                self._backfill_done(symbol)
+                return
+            # A candle went missing between the download and the held
+            # updates: still queued, so download again
+            self.stats["gaps"] += 1
+            self.backfills.put(symbol)
+
+    def _backfill_done(self, symbol):
+        """Stop holding `symbol`'s updates (caller holds sync_lock)."""
+        self.queued.discard(symbol)
+        self.held.pop(symbol, None)
+        shard = self.shard_of[symbol]
+        pending = self.connect_pending[shard]
+        if symbol in pending:
+            pending.discard(symbol)
+            if not pending:
+                self.synced += 1
+                backfilled = sum(1 for name in self.shards[shard] if name in self.ready)
+                print(
+                    f"📶 Kline stream {shard + 1}/{len(self.shards)} connected: {backfilled}/{len(self.shards[shard])} "
+                    f"symbols backfilled in {time.monotonic() - self.connect_started[shard]:.1f}s."
+                )
+
+    def _frame_bars(self, symbol, open_time, ohlcv):
+        """
+        {frame: (bar_open, bars)} derived from a base download. Bars older
+        than it covers are kept from the frame ring when they join up (a
+        reconnect), otherwise downloaded once per timeframe (first connect).
+        """
+        frames = {}
+        for frame, ring in self.frame_rings[symbol].items():
+            bar_open, bars = resample(open_time, ohlcv, ring.interval_ms)
+            if len(bar_open) < ring.size:
+                older_open, older = self._older_bars(symbol, frame, ring, bar_open[0] if len(bar_open) else None)
+                bar_open, bars = np.concatenate([older_open, bar_open]), np.concatenate([older, bars])
+            frames[frame] = (bar_open, bars)
+        return frames
+
+    def _load_frames(self, symbol, open_time, ohlcv, frames):
+        """Install _frame_bars() output and restart the forming bars (caller holds sync_lock)."""
+        if not self.frames:
+            return
+        self.builders[symbol].reset(open_time, ohlcv)
+        for frame, ring in self.frame_rings[symbol].items():
+            ring.load_arrays(*frames[frame])
+
+    def _older_bars(self, symbol, frame, ring, first):
+        """(open_time, ohlcv) of the `frame` bars opened before `first` (every bar if None)."""
+        if first is not None and ring.count:
+            held_open, held = ring.arrays(ring.count)
+            keep = held_open < first
+            if keep.any() and held_open[keep][-1] + ring.interval_ms == first:
+                return held_open[keep], held[keep]
+            if held_open[0] == first:
+                return held_open[:0], held[:0]   # the exchange had nothing older last time either
+        params = {"symbol": symbol, "interval": frame, "limit": min(ring.size, MAX_KLINES_LIMIT)}
+        native_open, native = parse_kline_rows(self.client.get(KLINES_PATH, params=params, share=BACKFILL_WEIGHT_SHARE))
+        self.stats["frame_backfills"] += 1
+        keep = native_open < first if first is not None else np.ones(len(native_open), dtype=bool)
+        return native_open[keep], native[keep]
+
+    def _on_message(self, shard, message):
+        self.last_message[shard] = time.monotonic()
+        self.stats["messages"] += 1
+        kline = json.loads(message).get("data", {}).get("k")
+        symbol = kline["s"] if kline else None
+        if symbol not in self.rings:
+            return
+        values = (float(kline["o"]), float(kline["h"]), float(kline["l"]), float(kline["c"]), float(kline["v"]))
+        open_time = int(kline["t"])
+        with self.sync_lock:
+            if symbol in self.queued:
+                self.held[symbol][open_time] = values
+                self.stats["held_updates"] += 1
+            elif symbol not in self.ready:
+                # Its last backfill failed: try again once the retry is due
+                if time.monotonic() >= self.retry_at.get(symbol, 0.0):
+                    self._queue_backfill(symbol)
+                    self.held[symbol][open_time] = values
+            elif not self._apply(symbol, open_time, values):
+                self.stats["gaps"] += 1
+                self._queue_backfill(symbol)
+
+    def _apply(self, symbol, open_time, values):
+        """One update into the base ring and every derived one; False on a gap."""
+        synced = self.rings[symbol].update(open_time, values)
+        return self._update_frames(symbol, open_time, values) and synced
+
+    def _update_frames(self, symbol, open_time, values):
+        """Carry a base update into the forming bar of every derived timeframe; False on a gap."""
+        bars = self.builders[symbol].update(open_time, values) if self.frames else None
+        if bars is None:
+            return True
+        synced = True
+        for ring, (bar_open, bar) in zip(self.frame_rings[symbol].values(), bars):
+            synced = ring.update(bar_open, bar) and synced
+        return synced
+
+    def _live(self, symbol):
+        return symbol in self.ready and time.monotonic() - self.last_message[self.shard_of[symbol]] <= STALE_SECONDS
+
+    def _ring(self, symbol, interval=None):
+        if interval is None or interval == self.interval:
+            return self.rings.get(symbol)
+        return self.frame_rings.get(symbol, {}).get(interval)
+
+    def has_interval(self, interval):
+        return interval == self.interval or interval in self.frames
+
+    def capacity(self, interval=None):
+        """Candles one ring of `interval` holds."""
+        return self.ring_size if interval is None or interval == self.interval else self.frame_ring_size
+
+    def klines(self, symbol, n, interval=None):
+        """The newest `n` candles from memory (streamed interval unless
+        `interval` names a derived one), or None if the symbol isn't
+        streamed, isn't backfilled yet, or the stream has gone quiet."""
+        ring = self._ring(symbol, interval)
+        if ring is None or not self._live(symbol) or ring.count < n:
+            self.stats["fallbacks"] += 1
+            return None
+        self.stats["served"] += 1
+        return ring.window(n)
+
+    def indicators(self, symbol, interval=None):
+        """The running indicators for `symbol`, on the same terms as klines()."""
+        ring = self._ring(symbol, interval)
+        result = ring.snapshot() if ring is not None and self._live(symbol) else None
+        self.stats["served" if result else "fallbacks"] += 1
+        return result
+
+    def closed_history(self, symbols, n, before, interval=None):
+        """
+        (closes, volumes, counts) as (symbols x n) arrays of the candles
+        opened before `before`, right-aligned; symbols with less history are
+        padded on the left with their first close and zero volume.
+        """
+        closes = np.zeros((len(symbols), n))
+        volumes = np.zeros((len(symbols), n))
+        counts = np.zeros(len(symbols), dtype=np.int64)
+        for i, symbol in enumerate(symbols):
+            close, volume = self._ring(symbol, interval).closed_before(n, before)
+            k = len(close)
+            counts[i] = k
+            closes[i, n - k:] = close
+            volumes[i, n - k:] = volume
+            closes[i, :n - k] = close[0] if k else np.nan
+        return closes, volumes, counts
+
+    def closed_candles(self, symbols, open_time, interval=None):
+        """(closes, volumes) of the candle opened at `open_time` for each symbol, NaN where missing."""
+        closes = np.full(len(symbols), np.nan)
+        volumes = np.full(len(symbols), np.nan)
+        for i, symbol in enumerate(symbols):
+            candle = self._ring(symbol, interval).candle_at(open_time)
+            if candle is not None:
+                closes[i], volumes[i] = candle
+        return closes, volumes
+
+    def print_stats(self):
+        s = dict(self.stats)
+        print(
+            f"📶 Market data: {s['served']} served from memory, {s['fallbacks']} REST fallbacks, "
+            f"{s['messages']} stream messages, {s['connects']} connects, {s['gaps']} gaps, "
+            f"{s['backfills']} backfills ({s['backfill_errors']} failed, {s['held_updates']} updates held meanwhile), "
+            f"{s['frame_backfills']} timeframe downloads"
+        )
+
+
+_service = None
+
+
+def start_market_data(symbols, **kwargs):
+    """Start the shared service; returns None (REST only) if it is disabled or websocket-client is missing."""
+    global _service
+    if not MARKET_DATA_STREAM or not symbols:
+        return None
+    if websocket is None:
+        print("⚠️ websocket-client not installed — technical indicators stay on REST.")
+        return None
+    _service = MarketDataService(symbols, **kwargs).start()
+    derived = f" (+ {', '.join(_service.frames)} derived)" if _service.frames else ""
+    print(f"📶 Streaming {_service.interval} klines for {len(_service.symbols)} symbols{derived} "
+          f"over {len(_service.shards)} connection(s).")
+    return _service
+
+
+def get_market_data():
+    return _service
@@ -0,0 +1,158 @@
+# market_regime.py
+# Where the majors stand — 1h/4h/24h change, 24h realized volatility and
+# BTC's share of their 24h quote volume (a dominance proxy) — as one
+# snapshot rebuilt at most every REGIME_TTL seconds. A refresh builds a new
+# dict and swaps the reference, so classification calls read it without a
+# lock. In daemon mode a timer refreshes it from the streamed 1m rings;
+# otherwise the first reader after the TTL refreshes it over REST (one 1m
+# download per major).
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from binance_client import binance
+from market_data import get_market_data
+
+REGIME_SYMBOLS = os.getenv("REGIME_SYMBOLS", "BTCUSDT,ETHUSDT,SOLUSDT,BNBUSDT,XRPUSDT").split(",")
+TTL_SECONDS = float(os.getenv("REGIME_TTL", "60"))
+# Serve an older snapshot while Binance is unreachable, but never past this
+MAX_STALE_SECONDS = float(os.getenv("REGIME_MAX_STALE", "600"))
+
+KLINES_PATH = "/fapi/v1/klines"
+DAY_CANDLES = 1441   # 24h of 1m candles + the forming one
+CHANGE_WINDOWS = {"1h": 3600000, "4h": 14400000, "24h": 86400000}
+
+
+def measure(open_time, close, volume):
+    """Regime figures for one symbol from 1m candles, oldest first, the last
+    one forming. Changes compare with the close of the candle that opened
+    the window's length before the forming one."""
+    figures = {}
+    for name, window_ms in CHANGE_WINDOWS.items():
+        then = close[min(np.searchsorted(open_time, open_time[-1] - window_ms), len(close) - 1)]
+        figures[f"change_{name}"] = float((close[-1] - then) / then * 100)
+    day = np.searchsorted(open_time, open_time[-1] - CHANGE_WINDOWS["24h"])
+    returns = np.diff(np.log(close[day:]))
+    figures["volatility_24h"] = float(np.sqrt(np.sum(returns ** 2)) * 100)
+    figures["quote_volume_24h"] = float(np.sum(volume[day:] * close[day:]))
+    return figures
+
+
+class MarketRegime:
+    def __init__(self, symbols=REGIME_SYMBOLS, ttl=TTL_SECONDS, max_stale=MAX_STALE_SECONDS, client=binance):
+        self.symbols = list(symbols)
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.client = client
+        self.current = None   # replaced whole, never mutated
+        self.refresh_lock = threading.Lock()
+        self.thread = None
+        self.stats = {"reads": 0, "refreshes": 0, "from_stream": 0, "refresh_errors": 0, "stale_served": 0}
+
+    def _candles(self, symbol):
+        """(open_time, close, volume, source) of the last 24h of 1m candles."""
+        service = get_market_data()
+        window = service.klines(symbol, DAY_CANDLES, "1m") if service and service.has_interval("1m") else None
+        if window is not None:
+            return window["open_time"], window["close"], window["volume"], "stream"
+        rows = self.client.get(KLINES_PATH, params={"symbol": symbol, "interval": "1m", "limit": DAY_CANDLES})
+        return (np.array([int(row[0]) for row in rows], dtype=np.int64),
+                np.array([float(row[4]) for row in rows]),
+                np.array([float(row[5]) for row in rows]),
+                "rest")
+
+    def refresh(self):
+        """Build and publish a new snapshot; raises if no major could be measured."""
+        symbols, sources = {}, set()
+        for symbol in self.symbols:
+            try:
+                open_time, close, volume, source = self._candles(symbol)
+                if len(close) < 2:
+                    continue
+                symbols[symbol] = measure(open_time, close, volume)
+                sources.add(source)
+            except Exception as e:
+                print(f"❌ Market regime: no candles for {symbol}: {e}")
+        if not symbols:
+            raise RuntimeError("no major could be measured")
+
+        total = sum(figures["quote_volume_24h"] for figures in symbols.values())
+        btc = symbols.get("BTCUSDT", {}).get("quote_volume_24h")
+        self.current = {
+            "at": time.monotonic(),
+            "symbols": symbols,
+            "btc_dominance": btc / total * 100 if btc is not None and total else None,
+            "source": "stream" if sources == {"stream"} else "rest",
+        }
+        self.stats["refreshes"] += 1
+        self.stats["from_stream"] += sources == {"stream"}
+        return self.current
+
+    def get(self):
+        """The current snapshot, refreshed first if it is older than the TTL;
+        None if there is none usable."""
+        self.stats["reads"] += 1
+        snapshot = self.current
+        now = time.monotonic()
+        if snapshot is not None and now - snapshot["at"] < self.ttl:
+            return snapshot
+        # Expired: one reader refreshes. The others keep the old snapshot
+        # while it is still usable, and only wait when there is none
+        usable = snapshot is not None and now - snapshot["at"] < self.max_stale
+        if not self.refresh_lock.acquire(blocking=not usable):
+            return snapshot
+        try:
+            snapshot = self.current
+            if snapshot is not None and time.monotonic() - snapshot["at"] < self.ttl:
+                return snapshot
+            try:
+                return self.refresh()
+            except Exception as e:
+                self.stats["refresh_errors"] += 1
+                if snapshot is None or time.monotonic() - snapshot["at"] >= self.max_stale:
+                    print(f"❌ Market regime unavailable: {e}")
+                    return None
+                self.stats["stale_served"] += 1
+                return snapshot
+        finally:
+            self.refresh_lock.release()
+
+    def start(self, interval=None):
+        """Refresh in a background thread every `interval` seconds (half the
+        TTL by default), so readers never wait for one."""
+        interval = interval or self.ttl / 2
+
+        def run():
+            while True:
+                try:
+                    with self.refresh_lock:
+                        self.refresh()
+                except Exception as e:
+                    self.stats["refresh_errors"] += 1
+                    print(f"❌ Market regime refresh failed: {e}")
+                time.sleep(interval)
+
+        self.thread = threading.Thread(target=run, name="market-regime", daemon=True)
+        self.thread.start()
+        return self
+
+    def print_stats(self):
+        s = dict(self.stats)
+        snapshot = self.current
+        summary = ""
+        if snapshot and snapshot["btc_dominance"] is not None:
+            btc = snapshot["symbols"].get("BTCUSDT", {})
+            summary = (f" — BTC 24h {btc.get('change_24h', 0):+.1f}%, "
+                       f"vol {btc.get('volatility_24h', 0):.1f}%, dominance {snapshot['btc_dominance']:.0f}%")
+        print(
+            f"🧭 Market regime: {s['reads']} reads from {s['refreshes']} refreshes "
+            f"({s['from_stream']} from the stream), {s['refresh_errors']} refresh errors, "
+            f"{s['stale_served']} served stale{summary}"
+        )
+
+
+# Shared by every module in the process
+regime = MarketRegime()
@@ -5,44 +5,11 @@ import csv
 from datetime import datetime
 from collections import defaultdict
 
+from entity_index import get_entity_index
+
 SIGNAL_LOG = "signals_log.csv"
 
-# Define sector mappings
-SECTOR_MAP = {
-    "FET": "AI",
-    "RNDR": "AI",
-    "AGIX": "AI",
-    "OCEAN": "AI",
-    "NEAR": "Layer 1",
-    "AVAX": "Layer 1",
-    "SOL": "Layer 1",
-    "ADA": "Layer 1",
-    "DOT": "Layer 1",
-    "INJ": "Layer 1",
-    "DOGE": "Memecoin",
-    "SHIB": "Memecoin",
-    "FLOKI": "Memecoin",
-    "BONK": "Memecoin",
-    "PEPE": "Memecoin",
-    "XMR": "Privacy",
-    "DASH": "Privacy",
-    "DUSK": "Privacy",
-    "LINK": "Oracles",
-    "BAND": "Oracles",
-    "ATOM": "Cosmos",
-    "TIA": "Cosmos",
-    "JUNO": "Cosmos",
-    "UNI": "DEX",
-    "SUSHI": "DEX",
-    "DYDX": "DEX",
-    "GMX": "DEX",
-    "MATIC": "Scaling",
-    "OP": "Scaling",
-    "ARB": "Scaling",
-    "ETH": "Ethereum",
-    "BTC": "Bitcoin",
-    "BNB": "BNB Chain",
-}
+# Sector mappings live in entity_index.SECTORS
 
 
 def load_today_signals():
@@ -60,13 +27,13 @@ def map_tokens_to_sectors(signals):
     sector_scores = defaultdict(int)
     token_counts = defaultdict(int)
 
+    entities = get_entity_index()
     for s in signals:
         ticker = s.get("Asset", "")
         confidence = int(float(s.get("Confidence", 0)))
-        base = ticker.replace("USDT", "").replace("1000", "")
 
-        if base in SECTOR_MAP:
-            sector = SECTOR_MAP[base]
+        sector = entities.sector(ticker)
+        if sector:
             sector_scores[sector] += confidence
             token_counts[sector] += 1
 
@@ -0,0 +1,168 @@
+# pipeline.py
+# Threaded stage pipeline: bounded queues between stages, per-stage concurrency
+
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of a pipeline. `func(item)` returns the (possibly updated) item,
+    or None to drop it. Ordered stages see items in input order and always
+    run with a single worker.
+
+    With batch_size > 1, `func` receives a list of up to batch_size items
+    (whatever is queued, waiting at most batch_wait seconds to fill up) and
+    returns a list of the same length with None for dropped items.
+
+    Items `func` raised on are dropped too, and kept in `failed` so the
+    caller can tell them from deliberate drops.
+    """
+
+    def __init__(self, name, func, workers=1, ordered=False, batch_size=1, batch_wait=0.2):
+        self.name = name
+        self.func = func
+        self.workers = 1 if ordered else max(1, int(workers))
+        self.ordered = ordered
+        self.batch_size = 1 if ordered else max(1, int(batch_size))
+        self.batch_wait = batch_wait
+        self.busy_seconds = 0.0
+        self.processed = 0
+        self.failed = []
+
+
+def _run_stage(stage, inbox, outbox, next_workers, lock, remaining):
+    """Worker loop. Dropped items keep flowing as None so sequence numbers stay gapless."""
+    pending = {}
+    next_seq = 0
+
+    def handle(seq, item):
+        if item is not None:
+            started = time.perf_counter()
+            try:
+                item = stage.func(item)
+            except Exception as e:
+                print(f"❌ Pipeline stage '{stage.name}' failed: {e}")
+                with lock:
+                    stage.failed.append(item)
+                item = None
+            with lock:
+                stage.busy_seconds += time.perf_counter() - started
+                stage.processed += 1
+        outbox.put((seq, item))
+
+    def handle_batch(batch):
+        live = [(seq, item) for seq, item in batch if item is not None]
+        results = []
+        if live:
+            started = time.perf_counter()
+            try:
+                results = stage.func([item for _, item in live])
+            except Exception as e:
+                print(f"❌ Pipeline stage '{stage.name}' failed: {e}")
+                with lock:
+                    stage.failed.extend(item for _, item in live)
+                results = [None] * len(live)
+            with lock:
+                stage.busy_seconds += time.perf_counter() - started
+                stage.processed += len(live)
+        for (seq, _), item in zip(live, results):
+            outbox.put((seq, item))
+        for seq, item in batch:
+            if item is None:
+                outbox.put((seq, None))
+
+    if stage.batch_size > 1:
+        done = False
+        while not done:
+            message = inbox.get()
+            if message is _DONE:
+                break
+            batch = [message]
+            deadline = time.monotonic() + stage.batch_wait
+            while len(batch) < stage.batch_size:
+                try:
+                    message = inbox.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if message is _DONE:
+                    done = True
+                    break
+                batch.append(message)
+            handle_batch(batch)
+
+    while stage.batch_size == 1:
+        message = inbox.get()
+        if message is _DONE:
+            break
+
+        if not stage.ordered:
+            handle(*message)
+            continue
+
+        pending[message[0]] = message[1]
+        while next_seq in pending:
+            handle(next_seq, pending.pop(next_seq))
+            next_seq += 1
+
+    # Last worker of this stage out closes the next queue
+    with lock:
+        remaining[stage.name] -= 1
+        last = remaining[stage.name] == 0
+    if last:
+        for _ in range(next_workers):
+            outbox.put(_DONE)
+
+
+def run_pipeline(items, stages, queue_size=16):
+    """
+    Stream `items` through `stages`. Queues between stages are bounded, so a
+    slow stage creates backpressure instead of letting work pile up.
+    Returns the items that made it through every stage, in input order.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    results = queue.Queue()
+    lock = threading.Lock()
+    remaining = {stage.name: stage.workers for stage in stages}
+
+    threads = []
+    for i, stage in enumerate(stages):
+        outbox = queues[i + 1] if i + 1 < len(stages) else results
+        next_workers = stages[i + 1].workers if i + 1 < len(stages) else 1
+        for _ in range(stage.workers):
+            t = threading.Thread(
+                target=_run_stage,
+                args=(stage, queues[i], outbox, next_workers, lock, remaining),
+                name=f"pipeline-{stage.name}",
+                daemon=True
+            )
+            t.start()
+            threads.append(t)
+
+    for seq, item in enumerate(items):
+        queues[0].put((seq, item))
+    for _ in range(stages[0].workers):
+        queues[0].put(_DONE)
+
+    for t in threads:
+        t.join()
+
+    finished = []
+    while True:
+        message = results.get()
+        if message is _DONE:
+            break
+        finished.append(message)
+
+    return [item for _, item in sorted(finished, key=lambda m: m[0]) if item is not None]
+
+
+def print_stage_stats(stages):
+    for stage in stages:
+        print(
+            f"⏱️ {stage.name:<9} x{stage.workers}: {stage.processed:>4} items, "
+            f"{stage.busy_seconds:6.2f}s busy"
+        )
@@ -0,0 +1,87 @@
+# price_snapshot.py
+# Last prices for every USDT-M futures contract from one all-symbols
+# /fapi/v1/ticker/price call, kept for a short TTL. Price lookups in main.py
+# and update_prices.py are answered from memory, so a batch of pending checks
+# costs one request (weight 2) instead of one per symbol.
+
+import os
+import threading
+import time
+
+from binance_client import binance
+
+TTL_SECONDS = float(os.getenv("PRICE_SNAPSHOT_TTL", "10"))
+# Serve an older snapshot while Binance is unreachable, but never past this
+MAX_STALE_SECONDS = float(os.getenv("PRICE_SNAPSHOT_MAX_STALE", "60"))
+# After a failed refresh, lookups don't try the exchange again for this long
+RETRY_AFTER_SECONDS = float(os.getenv("PRICE_SNAPSHOT_RETRY_AFTER", "15"))
+
+
+class PriceSnapshot:
+    def __init__(self, ttl=TTL_SECONDS, max_stale=MAX_STALE_SECONDS, retry_after=RETRY_AFTER_SECONDS, client=binance):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.retry_after = retry_after
+        self.client = client
+        self.prices = {}
+        self.fetched_at = None
+        self.failed_at = None
+        self.lock = threading.Lock()
+        self.stats = {"lookups": 0, "fetches": 0, "fetch_errors": 0, "stale_served": 0, "cooldown_skips": 0}
+
+    def _age(self, now):
+        return float("inf") if self.fetched_at is None else now - self.fetched_at
+
+    def _refresh(self, now):
+        self.stats["fetches"] += 1
+        data = self.client.get("/fapi/v1/ticker/price")
+        self.prices = {row["symbol"]: float(row["price"]) for row in data}
+        self.fetched_at = now
+
+    def _try_refresh(self, now):
+        """False if the refresh failed, now or less than retry_after ago."""
+        # During an outage only one lookup per retry_after pays for the
+        # client's retries; the rest are answered right away
+        if self.failed_at is not None and now - self.failed_at < self.retry_after:
+            self.stats["cooldown_skips"] += 1
+            return False
+        try:
+            self._refresh(now)
+        except Exception as e:
+            self.stats["fetch_errors"] += 1
+            self.failed_at = time.monotonic()
+            print(f"❌ Price snapshot refresh failed: {e}")
+            return False
+        self.failed_at = None
+        return True
+
+    def get(self, symbol):
+        """Last price for `symbol`, or None if it isn't listed or no snapshot is usable."""
+        # One lock for fetch and read: threads that miss together wait for a
+        # single refresh instead of each calling the exchange
+        with self.lock:
+            self.stats["lookups"] += 1
+            now = time.monotonic()
+            if self._age(now) >= self.ttl and not self._try_refresh(now):
+                if self._age(now) >= self.max_stale:
+                    return None
+                self.stats["stale_served"] += 1
+            return self.prices.get(symbol)
+
+    def invalidate(self):
+        with self.lock:
+            self.fetched_at = None
+            self.failed_at = None
+
+    def print_stats(self):
+        with self.lock:
+            s = dict(self.stats)
+        print(
+            f"💲 Price snapshot: {s['lookups']} lookups from {s['fetches']} fetches, "
+            f"{s['fetch_errors']} fetch errors, {s['stale_served']} served stale, "
+            f"{s['cooldown_skips']} refreshes skipped after a failure"
+        )
+
+
+# Shared by every module in the process
+prices = PriceSnapshot()
@@ -0,0 +1,134 @@
+# stage_store.py
+# Per-news_id pipeline progress, so a rerun resumes where the last one stopped:
+# filter verdict and resolved ticker are kept, permanent blocks are never
+# retried, and transient failures (price/TA fetch, GPT outage) are retried
+# with exponential backoff until MAX_ATTEMPTS.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+STAGE_DB = "stage_state.db"
+RETRY_BASE_SECONDS = float(os.getenv("STAGE_RETRY_BASE_SECONDS", "60"))
+RETRY_CAP_SECONDS = float(os.getenv("STAGE_RETRY_CAP_SECONDS", "3600"))
+MAX_ATTEMPTS = int(os.getenv("STAGE_MAX_ATTEMPTS", "6"))
+STATE_TTL_SECONDS = float(os.getenv("STAGE_STATE_TTL", str(7 * 86400)))
+
+# Item fields needed to push a stored item back into the pipeline
+ITEM_FIELDS = ("id", "title", "summary", "url", "published", "source", "duplicate_ids", "source_count")
+
+_lock = threading.Lock()
+_conn = None
+
+
+def _connect():
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(STAGE_DB, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS stage_state ("
+            "news_id TEXT PRIMARY KEY, stage TEXT NOT NULL, status TEXT NOT NULL, "
+            "data TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "next_retry_at REAL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS stage_retry ON stage_state (status, next_retry_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS stage_updated ON stage_state (updated_at)")
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def get_stage_state(news_id):
+    with _lock:
+        row = _connect().execute(
+            "SELECT stage, status, data, attempts, next_retry_at FROM stage_state WHERE news_id = ?",
+            (news_id,)
+        ).fetchone()
+    if row is None:
+        return None
+    return {
+        "stage": row[0],
+        "status": row[1],
+        "data": json.loads(row[2]),
+        "attempts": row[3],
+        "next_retry_at": row[4],
+    }
+
+
+def _write(news_id, stage, status, data, attempts=0, next_retry_at=None):
+    with _lock:
+        conn = _connect()
+        with conn:
+            row = conn.execute("SELECT data FROM stage_state WHERE news_id = ?", (news_id,)).fetchone()
+            merged = {**(json.loads(row[0]) if row else {}), **data}
+            conn.execute(
+                "INSERT OR REPLACE INTO stage_state "
+                "(news_id, stage, status, data, attempts, next_retry_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (news_id, stage, status, json.dumps(merged), attempts, next_retry_at, time.time())
+            )
+
+
+def record_progress(news_id, stage, **data):
+    """`stage` finished; keep what it learned (e.g. filter=..., ticker=...)."""
+    _write(news_id, stage, "done", data)
+
+
+def record_block(news_id, stage, reason):
+    """Permanent outcome: the item will never pass, don't spend on it again."""
+    print(f"⛔ {stage}: {reason}")
+    _write(news_id, stage, "blocked", {"block_reason": reason})
+
+
+def record_transient(item, stage, reason):
+    """Retryable failure: back off exponentially, give up after MAX_ATTEMPTS."""
+    state = get_stage_state(item["id"])
+    attempts = (state["attempts"] if state and state["status"] == "transient" else 0) + 1
+    if attempts >= MAX_ATTEMPTS:
+        record_block(item["id"], stage, f"{reason} (gave up after {attempts} attempts)")
+        return
+
+    delay = min(RETRY_CAP_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    payload = {key: item[key] for key in ITEM_FIELDS if key in item}
+    print(f"🔁 {stage}: {reason} — retry {attempts}/{MAX_ATTEMPTS - 1} in {delay:.0f}s")
+    _write(
+        item["id"], stage, "transient",
+        {"item": payload, "transient_reason": reason},
+        attempts=attempts, next_retry_at=time.time() + delay
+    )
+
+
+def clear_stage_state(news_id):
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("DELETE FROM stage_state WHERE news_id = ?", (news_id,))
+
+
+def due_retries(now=None):
+    """Stored items whose transient failure is due for another attempt."""
+    now = now or time.time()
+    with _lock:
+        rows = _connect().execute(
+            "SELECT data FROM stage_state WHERE status = 'transient' AND next_retry_at <= ?",
+            (now,)
+        ).fetchall()
+    items = []
+    for (data,) in rows:
+        data = json.loads(data)
+        if "item" in data:
+            items.append(data["item"])
+    return items
+
+
+def prune_stage_state(max_age=STATE_TTL_SECONDS):
+    with _lock:
+        conn = _connect()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM stage_state WHERE updated_at < ?", (time.time() - max_age,)
+            )
+    return cursor.rowcount
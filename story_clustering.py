@@ -0,0 +1,220 @@
+# story_clustering.py
+# Collapse syndicated copies of one story (cointelegraph, decrypt, cryptoslate, ...)
+# into a single item before it reaches GPT. MinHash over normalized title and
+# summary shingles, LSH banding to find candidate pairs, union-find to group.
+# Stories are remembered for STORY_MEMORY_SECONDS, so in daemon mode a copy
+# that arrives a cycle after the original is recognised as a late copy.
+
+import html
+import os
+import random
+import re
+import time
+from hashlib import blake2b
+
+NUM_PERM = 64
+BANDS = 32                      # 32 bands x 2 rows -> pairs from ~0.18 Jaccard become candidates
+ROWS = NUM_PERM // BANDS
+SIMILARITY_THRESHOLD = 0.4      # estimated Jaccard needed to call two items the same story
+SUMMARY_WORDS = 40              # only the lead of the summary; feeds append boilerplate after it
+STORY_MEMORY_SECONDS = int(os.getenv("STORY_MEMORY_SECONDS", "21600"))   # how long late copies are caught
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1337)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "at", "for", "by",
+    "with", "as", "is", "are", "was", "were", "be", "been", "it", "its", "this", "that",
+    "from", "after", "amid", "over", "into", "than", "has", "have", "had", "will", "says",
+    "said", "new", "now", "just", "up", "down", "out", "about", "here", "what", "why", "how",
+}
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_WORD_RE = re.compile(r"[a-z0-9$]+")
+
+
+def normalize_words(text):
+    text = html.unescape(_TAG_RE.sub(" ", text or "")).lower()
+    words = []
+    for word in _WORD_RE.findall(text.replace(",", "")):
+        if word in STOPWORDS:
+            continue
+        # cheap plural folding: "inflows" ~ "inflow", "ETFs" ~ "ETF"
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def shingles(title, summary):
+    title_words = normalize_words(title)
+    summary_words = normalize_words(summary)[:SUMMARY_WORDS]
+
+    result = set(title_words)
+    result.update(f"{a} {b}" for a, b in zip(title_words, title_words[1:]))
+    result.update(f"s:{a} {b}" for a, b in zip(summary_words, summary_words[1:]))
+    return result
+
+
+def minhash(shingle_set):
+    if not shingle_set:
+        return None
+    hashes = [
+        int.from_bytes(blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+        for s in shingle_set
+    ]
+    return [
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def estimated_similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def signature(item):
+    return minhash(shingles(item["title"], item.get("summary", "")))
+
+
+def band_keys(sig):
+    return [(band, tuple(sig[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+
+def cluster_items(items, threshold=SIMILARITY_THRESHOLD, signatures=None):
+    """
+    Group news items that tell the same story. Returns a list of clusters,
+    each a list of items in their original order; clusters are ordered by
+    their first member, so items[0]'s cluster comes first.
+    """
+    if signatures is None:
+        signatures = [signature(item) for item in items]
+    parent = list(range(len(items)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets = {}
+    for i, sig in enumerate(signatures):
+        if sig is None:
+            continue
+        for key in band_keys(sig):
+            buckets.setdefault(key, []).append(i)
+
+    checked = set()
+    for members in buckets.values():
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:]:
+                if (i, j) in checked:
+                    continue
+                checked.add((i, j))
+                if estimated_similarity(signatures[i], signatures[j]) >= threshold:
+                    root_i, root_j = find(i), find(j)
+                    if root_i != root_j:
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    clusters = {}
+    for i, item in enumerate(items):
+        clusters.setdefault(find(i), []).append(item)
+    return [clusters[root] for root in sorted(clusters)]
+
+
+class RecentStories:
+    """
+    Signatures of the stories seen in the last `seconds`, banded like a
+    batch, keyed by the id of the copy that represented each story.
+    """
+
+    def __init__(self, seconds=STORY_MEMORY_SECONDS):
+        self.seconds = seconds
+        self.stories = {}   # representative id -> [seen_at, signature, ids]
+        self.owner = {}     # news id -> representative id
+        self.buckets = {}   # band key -> representative ids
+
+    def prune(self, now):
+        for lead_id, (seen_at, sig, ids) in list(self.stories.items()):
+            if now - seen_at <= self.seconds:
+                continue
+            del self.stories[lead_id]
+            for news_id in ids:
+                if self.owner.get(news_id) == lead_id:
+                    del self.owner[news_id]
+            for key in band_keys(sig):
+                self.buckets[key].discard(lead_id)
+                if not self.buckets[key]:
+                    del self.buckets[key]
+
+    def match(self, sig, threshold):
+        """Representative id of a remembered story `sig` belongs to, or None."""
+        candidates = set()
+        for key in band_keys(sig):
+            candidates.update(self.buckets.get(key, ()))
+        best, best_similarity = None, threshold
+        for lead_id in candidates:
+            similarity = estimated_similarity(sig, self.stories[lead_id][1])
+            if similarity >= best_similarity:
+                best, best_similarity = lead_id, similarity
+        return best
+
+    def remember(self, lead_id, sig, ids, now):
+        # A story seen again stays under the representative it had
+        lead_id = next((self.owner[news_id] for news_id in ids if news_id in self.owner), lead_id)
+        story = self.stories.get(lead_id)
+        if story is None:
+            story = self.stories[lead_id] = [now, sig, set()]
+            for key in band_keys(sig):
+                self.buckets.setdefault(key, set()).add(lead_id)
+        story[0] = now
+        story[2].update(ids)
+        for news_id in ids:
+            self.owner[news_id] = lead_id
+
+
+recent_stories = RecentStories()
+
+
+def collapse_stories(items, threshold=SIMILARITY_THRESHOLD, recent=recent_stories):
+    """
+    Keep one representative per story (the first copy seen). The
+    representative carries `duplicate_ids` (ids of the other copies) and
+    `source_count` (distinct feeds that ran the story). Returns (stories,
+    late): `late` maps the ids of copies of a story `recent` remembers from
+    an earlier batch to that story's representative id; those copies are
+    left out of `stories`. A batch holding an id `recent` already knows (an
+    item retried or returned by its feed) is the same story again, not late.
+    """
+    now = time.time()
+    signatures = [signature(item) for item in items]
+    by_id = {item["id"]: sig for item, sig in zip(items, signatures)}
+    if recent is not None:
+        recent.prune(now)
+
+    stories, late = [], {}
+    for cluster in cluster_items(items, threshold, signatures):
+        lead = cluster[0]
+        ids = [item["id"] for item in cluster]
+        sigs = [by_id[news_id] for news_id in ids if by_id[news_id] is not None]
+        if recent is not None and sigs:
+            earlier = None
+            if not any(news_id in recent.owner for news_id in ids):
+                earlier = next(filter(None, (recent.match(sig, threshold) for sig in sigs)), None)
+            recent.remember(earlier or lead["id"], sigs[0], ids, now)
+            if earlier:
+                print(f"🧩 Late copy x{len(cluster)} of a story seen earlier: {lead['title']}")
+                late.update((news_id, earlier) for news_id in ids)
+                continue
+        lead["duplicate_ids"] = ids[1:]
+        lead["source_count"] = len({item.get("source", "Unknown") for item in cluster})
+        if len(cluster) > 1:
+            print(
+                f"🧩 Story x{len(cluster)} ({lead['source_count']} sources): {lead['title']}"
+            )
+        stories.append(lead)
+    return stories, late
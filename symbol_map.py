@@ -1,4 +1,5 @@
-# Auto-generated symbol map from Binance Futures
+# Snapshot of the Binance Futures symbol map. Only seeds entity_index.py until
+# symbol_map_updater.py has written symbol_index.npz; no longer regenerated.
 symbol_map = {
   "1000000BOB": "1000000BOBUSDT",
   "1000000MOG": "1000000MOGUSDT",
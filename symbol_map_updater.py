@@ -1,93 +1,125 @@
 # symbol_map_updater.py
-
-import requests
+# Refreshes symbol_index.npz from Binance Futures. Importable: main.py calls
+# refresh_symbol_index() in a background thread, which returns at once while
+# the index is fresh and only rewrites the file when the listing changed.
+#
+#   python3 symbol_map_updater.py            # refresh if stale
+#   python3 symbol_map_updater.py --force    # always hit the exchange
+
+import argparse
 import json
-import re
+import os
 import time
 
-BINANCE_FUTURES_URL = "https://fapi.binance.com/fapi/v1/exchangeInfo"
-OUTPUT_FILE = "symbol_map.py"
+import numpy as np
+
+from binance_client import binance
+from entity_index import INDEX_FILE, build_entities, read_arrays, to_arrays, write_arrays
+
+STATE_FILE = "symbol_index_state.json"
+MAX_AGE_SECONDS = float(os.getenv("SYMBOL_INDEX_MAX_AGE", "86400"))
 
-def get_top_50_volume_symbols():
-    url = "https://fapi.binance.com/fapi/v1/ticker/24hr"
+# Fields that decide matching and the GPT ticker guard. Raw volume ranks
+# outside the top-volume cut reshuffle every day and don't force a rewrite.
+COMPARED_ARRAYS = ("symbols", "bases", "sectors", "top_volume", "forms", "form_symbol")
+
+def get_volume_ranking():
+    """USDT perpetual symbols sorted by 24h quote volume, highest first."""
     try:
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        data = binance.get("/fapi/v1/ticker/24hr")
         # Filter USDT contracts only and sort by quoteVolume
         usdt_pairs = [s for s in data if s["symbol"].endswith("USDT") and "_" not in s["symbol"]]
         sorted_pairs = sorted(usdt_pairs, key=lambda x: float(x["quoteVolume"]), reverse=True)
-        top_symbols = [s["symbol"] for s in sorted_pairs[:50]]
-        return set(top_symbols)
+        return [s["symbol"] for s in sorted_pairs]
     except Exception as e:
         print(f"❌ Error fetching volume data: {e}")
-        return set()
+        return []
 
-def generate_symbol_map():
+def get_perpetual_contracts():
+    """(symbol, base asset) for every USDT perpetual, or [] on failure."""
     try:
-        response = requests.get(BINANCE_FUTURES_URL, timeout=10)
-        data = response.json()
-        symbols = data.get("symbols", [])
-
-        symbol_map = {}
-
-        for s in symbols:
-            symbol = s["symbol"]
-            base = s["baseAsset"].upper()
-            quote = s["quoteAsset"].upper()
-
-            # Only include USDT perpetual pairs
-            if quote != "USDT":
-                continue
-            if not s.get("contractType") == "PERPETUAL":
-                continue
-
-            # Only allow base symbols that are 3+ letters to reduce false positives
-            if base not in symbol_map and len(base) >= 3:
-                symbol_map[base] = symbol
-
-            # === Aliases for special Binance contracts ===
-            if base == "1000SHIB":
-                symbol_map["SHIB"] = symbol
-                symbol_map["SHIBA"] = symbol
-                symbol_map["SHIBA INU"] = symbol
-
-            if base == "1000PEPE":
-                symbol_map["PEPE"] = symbol
-                symbol_map["PEPECOIN"] = symbol
-
-            if base == "1000BONK":
-                symbol_map["BONK"] = symbol
-
-            if base == "1000FLOKI":
-                symbol_map["FLOKI"] = symbol
-
-            if base == "BTC":
-                symbol_map["BITCOIN"] = symbol
-            elif base == "ETH":
-                symbol_map["ETHEREUM"] = symbol
-            elif base == "DOGE":
-                symbol_map["DOGECOIN"] = symbol
-            elif base == "XRP":
-                symbol_map["RIPPLE"] = symbol
-
-        # Write to symbol_map.py
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            f.write("# Auto-generated symbol map from Binance Futures\n")
-            f.write("symbol_map = ")
-            json.dump(symbol_map, f, indent=2, sort_keys=True)
-
-        print(f"✅ symbol_map.py updated with {len(symbol_map)} entries.")
-
-        # Write top 50 volume symbols to file
-        top_50 = get_top_50_volume_symbols()
-        with open("top_volume_tickers.txt", "w") as f:
-            for symbol in top_50:
-                f.write(symbol + "\n")
-
-        print(f"✅ top_volume_tickers.txt updated with {len(top_50)} high-volume symbols.")
-
+        symbols = binance.get("/fapi/v1/exchangeInfo").get("symbols", [])
     except Exception as e:
         print(f"❌ Error fetching Binance symbols: {e}")
+        return []
+
+    # Only include USDT perpetual pairs
+    return [
+        (s["symbol"], s["baseAsset"].upper()) for s in symbols
+        if s["quoteAsset"].upper() == "USDT" and s.get("contractType") == "PERPETUAL"
+    ]
+
+def load_refresh_state():
+    if not os.path.exists(STATE_FILE):
+        return {}
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except:
+        return {}
+
+def save_refresh_state(state):
+    tmp_path = STATE_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_FILE)
+
+def index_is_fresh(max_age=MAX_AGE_SECONDS):
+    checked_at = load_refresh_state().get("checked_at")
+    return os.path.exists(INDEX_FILE) and checked_at is not None and time.time() - checked_at < max_age
+
+def diff_index(old, new):
+    """Human-readable changes between two artifacts' arrays (old may be None)."""
+    if old is None:
+        return [f"new index with {len(new['symbols'])} contracts"]
+    changes = []
+    old_symbols, new_symbols = set(old["symbols"].tolist()), set(new["symbols"].tolist())
+    if new_symbols - old_symbols:
+        changes.append(f"listed {', '.join(sorted(new_symbols - old_symbols))}")
+    if old_symbols - new_symbols:
+        changes.append(f"delisted {', '.join(sorted(old_symbols - new_symbols))}")
+    old_top = set(old["symbols"][old["top_volume"]].tolist())
+    new_top = set(new["symbols"][new["top_volume"]].tolist())
+    if old_top != new_top:
+        changes.append(f"top volume +{len(new_top - old_top)}/-{len(old_top - new_top)}")
+    if not changes and any(not np.array_equal(old[key], new[key]) for key in COMPARED_ARRAYS):
+        changes.append("aliases or sectors changed")
+    return changes
+
+def refresh_symbol_index(max_age=MAX_AGE_SECONDS, force=False):
+    """
+    Returns True if symbol_index.npz was rewritten. Skips the exchange
+    entirely while the last check is younger than `max_age`, and keeps the
+    current file when either endpoint fails, since a half-built index would
+    switch off the top-volume guard.
+    """
+    if not force and index_is_fresh(max_age):
+        return False
+
+    contracts = get_perpetual_contracts()
+    ranking = get_volume_ranking()
+    if not contracts or not ranking:
+        print("⚠️ Symbol index not refreshed — keeping the current one.")
+        return False
+
+    new = to_arrays(build_entities(contracts, ranking))
+    changes = diff_index(read_arrays(INDEX_FILE), new)
+    state = load_refresh_state()
+    state["checked_at"] = time.time()
+    if changes:
+        write_arrays(new)
+        state["changed_at"] = state["checked_at"]
+        print(f"✅ {INDEX_FILE} updated ({len(contracts)} contracts): {'; '.join(changes)}")
+    else:
+        print(f"✅ {INDEX_FILE} unchanged ({len(contracts)} contracts).")
+    save_refresh_state(state)
+    return bool(changes)
+
+def generate_symbol_map():
+    return refresh_symbol_index(force=True)
 
 if __name__ == "__main__":
-    generate_symbol_map()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Refresh symbol_index.npz from Binance Futures")
+    parser.add_argument("--force", action="store_true", help="refresh even if the index is still fresh")
+    args = parser.parse_args()
+    refresh_symbol_index(force=args.force)
@@ -0,0 +1,226 @@
+# ta_scanner.py
+# Indicators for a whole universe of symbols at once: closes and volumes
+# live in 2-D NumPy arrays (symbols x candles), and every candle close
+# updates Wilder's RSI, the SMA 20/50 crossover and the volume ratio for
+# all symbols in one vectorized pass, returning the threshold crossings as
+# events. The math matches indicator_engine.IndicatorState on closed
+# candles. In daemon mode start_ta_scanner() drives it from the
+# market-data ring buffers and hands events to main.py's TA-only updates.
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from indicator_engine import MA_LONG, MA_SHORT, RSI_PERIOD, VOLUME_PERIOD, RESYNC_EVERY
+from market_data import INTERVAL_MS
+
+RSI_OVERSOLD = 30
+RSI_OVERBOUGHT = 70
+VOLUME_SPIKE_RATIO = 180   # % of the 20-candle mean, the "High" volume label
+SCAN_GRACE_SECONDS = float(os.getenv("TA_SCAN_GRACE_SECONDS", "3"))   # let final stream updates land
+SCAN_INTERVAL = os.getenv("TA_SCAN_INTERVAL", "5m")   # streamed or derived by market_data
+
+
+class TAScanner:
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        n = len(self.symbols)
+        self.closes = np.zeros((n, MA_LONG))     # circular, newest at pos - 1
+        self.volumes = np.zeros((n, VOLUME_PERIOD))
+        self.pos = 0
+        self.vpos = 0
+        self.sum_short = np.zeros(n)
+        self.sum_long = np.zeros(n)
+        self.sum_volume = np.zeros(n)
+        self.last_close = np.full(n, np.nan)
+        self.avg_gain = np.zeros(n)
+        self.avg_loss = np.zeros(n)
+        self.rsi = np.full(n, np.nan)
+        self.ma_short = np.full(n, np.nan)
+        self.ma_long = np.full(n, np.nan)
+        self.volume_ratio = np.full(n, np.nan)
+        self.valid = np.zeros(n, dtype=bool)   # enough history for every indicator
+        self.updates = 0
+        self.last_open_time = None
+        self.stats = {"scans": 0, "events": 0, "last_scan_ms": 0.0, "load_ms": 0.0}
+
+    def load(self, closes, volumes, counts=None):
+        """
+        Rebuild the state from closed candles: `closes` and `volumes` are
+        (symbols x candles) arrays, oldest first, at least MA_LONG wide;
+        `counts` says how many trailing columns are real for each symbol
+        (the rest is padding, and symbols with fewer than MA_LONG raise no
+        events).
+        """
+        started = time.perf_counter()
+        closes = np.asarray(closes, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        n, width = closes.shape
+        counts = np.full(n, width) if counts is None else np.asarray(counts)
+        self.valid = counts >= MA_LONG
+
+        # Wilder's RSI, one column at a time for every symbol: SMA seed over
+        # each symbol's first RSI_PERIOD changes, then the smoothing
+        change = np.diff(closes, axis=1)
+        gain, loss = change.clip(min=0), (-change).clip(min=0)
+        first = width - counts   # first real column per symbol
+        seed_gain, seed_loss = np.zeros(n), np.zeros(n)
+        avg_gain, avg_loss = np.zeros(n), np.zeros(n)
+        for j in range(width - 1):
+            k = j - first   # change index within each symbol's own history
+            seeding = (k >= 0) & (k < RSI_PERIOD)
+            seed_gain += np.where(seeding, gain[:, j], 0)
+            seed_loss += np.where(seeding, loss[:, j], 0)
+            seeded = k == RSI_PERIOD - 1
+            avg_gain = np.where(seeded, seed_gain / RSI_PERIOD, avg_gain)
+            avg_loss = np.where(seeded, seed_loss / RSI_PERIOD, avg_loss)
+            smoothing = k >= RSI_PERIOD
+            avg_gain = np.where(smoothing, (avg_gain * (RSI_PERIOD - 1) + gain[:, j]) / RSI_PERIOD, avg_gain)
+            avg_loss = np.where(smoothing, (avg_loss * (RSI_PERIOD - 1) + loss[:, j]) / RSI_PERIOD, avg_loss)
+        self.avg_gain, self.avg_loss = avg_gain, avg_loss
+
+        self.closes[:] = closes[:, -MA_LONG:]
+        self.volumes[:] = volumes[:, -VOLUME_PERIOD:]
+        self.pos = self.vpos = 0
+        self.last_close = closes[:, -1]
+        self._resync()
+        self.rsi = _rsi(self.avg_gain, self.avg_loss)
+        self._means()
+        self.stats["load_ms"] = 1000 * (time.perf_counter() - started)
+
+    def _resync(self):
+        self.sum_long = self.closes.sum(axis=1)
+        self.sum_short = self.closes[:, (self.pos - MA_SHORT + np.arange(MA_SHORT)) % MA_LONG].sum(axis=1)
+        self.sum_volume = self.volumes.sum(axis=1)
+
+    def _means(self):
+        self.ma_short = self.sum_short / MA_SHORT
+        self.ma_long = self.sum_long / MA_LONG
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.volume_ratio = self.volumes[:, (self.vpos - 1) % VOLUME_PERIOD] / (self.sum_volume / VOLUME_PERIOD) * 100
+
+    def on_close(self, open_time, closes, volumes):
+        """
+        Fold in one closed candle for every symbol (NaN where a symbol has
+        no candle: its close carries over and it raises no events) and
+        return the threshold crossings it caused.
+        """
+        started = time.perf_counter()
+        closes = np.asarray(closes, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        present = ~np.isnan(closes)
+        closes = np.where(present, closes, self.last_close)
+        volumes = np.where(present & ~np.isnan(volumes), volumes, 0.0)
+
+        prev_rsi, prev_side, prev_ratio = self.rsi, np.sign(self.ma_short - self.ma_long), self.volume_ratio
+
+        change = closes - self.last_close
+        self.avg_gain = (self.avg_gain * (RSI_PERIOD - 1) + change.clip(min=0)) / RSI_PERIOD
+        self.avg_loss = (self.avg_loss * (RSI_PERIOD - 1) + (-change).clip(min=0)) / RSI_PERIOD
+        self.rsi = _rsi(self.avg_gain, self.avg_loss)
+        self.last_close = closes
+
+        self.sum_long += closes - self.closes[:, self.pos]
+        self.sum_short += closes - self.closes[:, (self.pos - MA_SHORT) % MA_LONG]
+        self.closes[:, self.pos] = closes
+        self.pos = (self.pos + 1) % MA_LONG
+        self.sum_volume += volumes - self.volumes[:, self.vpos]
+        self.volumes[:, self.vpos] = volumes
+        self.vpos = (self.vpos + 1) % VOLUME_PERIOD
+        self.updates += 1
+        if self.updates % RESYNC_EVERY == 0:
+            self._resync()
+        self._means()
+        self.last_open_time = open_time
+
+        live = present & self.valid
+        side = np.sign(self.ma_short - self.ma_long)
+        crossings = (
+            ("rsi_oversold", live & (prev_rsi >= RSI_OVERSOLD) & (self.rsi < RSI_OVERSOLD)),
+            ("rsi_overbought", live & (prev_rsi <= RSI_OVERBOUGHT) & (self.rsi > RSI_OVERBOUGHT)),
+            ("ma_bullish", live & (prev_side <= 0) & (side > 0)),
+            ("ma_bearish", live & (prev_side >= 0) & (side < 0)),
+            ("volume_spike", live & (prev_ratio <= VOLUME_SPIKE_RATIO) & (self.volume_ratio > VOLUME_SPIKE_RATIO)),
+        )
+        fired = [(kind, np.flatnonzero(mask)) for kind, mask in crossings]
+        events = self._events(fired, open_time)
+
+        self.stats["scans"] += 1
+        self.stats["events"] += len(events)
+        self.stats["last_scan_ms"] = 1000 * (time.perf_counter() - started)
+        return events
+
+    def _events(self, fired, open_time):
+        """Event dicts for (kind, symbol indices) pairs; the arrays are
+        converted once for all fired symbols, not per event."""
+        kinds = [kind for kind, index in fired for _ in index]
+        if not kinds:
+            return []
+        index = np.concatenate([index for _, index in fired])
+        columns = zip(
+            kinds,
+            index.tolist(),
+            self.last_close[index].tolist(),
+            np.round(self.rsi[index], 1).tolist(),
+            self.ma_short[index].tolist(),
+            self.ma_long[index].tolist(),
+            np.nan_to_num(self.volume_ratio[index]).tolist(),   # 0 when there was no volume at all
+        )
+        return [
+            {"symbol": self.symbols[i], "event": kind, "open_time": open_time, "close": close, "rsi": rsi,
+             "ma_short": ma_short, "ma_long": ma_long, "volume_ratio": volume_ratio}
+            for kind, i, close, rsi, ma_short, ma_long, volume_ratio in columns
+        ]
+
+
+def _rsi(avg_gain, avg_loss):
+    # Same edge cases as indicator_engine: no losses -> 100, flat -> nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    return np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, np.nan), rsi)
+
+
+def _scan_loop(service, scanner, on_events, grace, interval):
+    interval_ms = INTERVAL_MS[interval]
+    loaded_for = None   # the service connect the state was built from
+    while not service.stopped.is_set():
+        now_ms = int(time.time() * 1000)
+        current = now_ms // interval_ms * interval_ms   # open time of the forming candle
+
+        # (Re)load after every (re)connect's backfill: it may hold candles
+        # this loop never saw close
+        if loaded_for != service.synced:
+            if not service.synced:
+                service.stopped.wait(1)
+                continue
+            loaded_for = service.synced
+            closes, volumes, counts = service.closed_history(
+                scanner.symbols, service.capacity(interval) - 1, before=current, interval=interval
+            )
+            scanner.load(closes, volumes, counts)
+            print(f"📊 TA scanner loaded {int(scanner.valid.sum())}/{len(scanner.symbols)} symbols "
+                  f"in {scanner.stats['load_ms']:.1f}ms.")
+
+        if service.stopped.wait((current + interval_ms - now_ms) / 1000 + grace):
+            break
+        closes, volumes = service.closed_candles(scanner.symbols, current, interval)
+        try:
+            events = scanner.on_close(current, closes, volumes)
+            if events:
+                on_events(events)
+        except Exception as e:
+            print(f"❌ TA scan failed: {e}")
+
+
+def start_ta_scanner(service, on_events, grace=SCAN_GRACE_SECONDS, interval=SCAN_INTERVAL):
+    """Scan the service's symbols on every `interval` candle close in a background thread."""
+    if not service.has_interval(interval):
+        print(f"⚠️ No {interval} klines in the market-data service — scanning {service.interval}.")
+        interval = service.interval
+    scanner = TAScanner(service.symbols)
+    threading.Thread(
+        target=_scan_loop, args=(service, scanner, on_events, grace, interval), name="ta-scanner", daemon=True
+    ).start()
+    return scanner
@@ -1,21 +1,36 @@
 # technical_indicators.py
 
-import requests
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
-BINANCE_OHLCV_URL = "https://fapi.binance.com/fapi/v1/klines"
+from binance_client import binance
+from indicator_engine import indicators_from_series
+from market_data import get_market_data
+from market_regime import regime
+
+BINANCE_OHLCV_PATH = "/fapi/v1/klines"
+OHLCV_INTERVAL = "5m"
+OHLCV_LIMIT = 50   # candles behind the indicators (MA 50 is the longest)
+RSI_WARMUP = 250   # extra candles so Wilder's smoothing has settled (still weight 2)
+CONTEXT_FRAMES = ("15m", "1h", "4h")   # higher timeframes shown next to the 5m indicators
+MARKET_CHANGE_SYMBOLS = ["BTCUSDT", "ETHUSDT"]   # in the summary; must be among market_regime's majors
+
+def fetch_klines(symbol: str, interval="5m", limit=50, start_time=None):
+    """Raw REST kline rows, oldest first (from `start_time` in ms when
+    given) — the download behind fetch_ohlcv and the kline archive."""
+    params = {
+        "symbol": symbol,
+        "interval": interval,
+        "limit": limit
+    }
+    if start_time is not None:
+        params["startTime"] = start_time
+    return binance.get(BINANCE_OHLCV_PATH, params=params)
 
 def fetch_ohlcv(symbol: str, interval="5m", limit=50):
     try:
-        params = {
-            "symbol": symbol,
-            "interval": interval,
-            "limit": limit
-        }
-        response = requests.get(BINANCE_OHLCV_URL, params=params)
-        data = response.json()
+        data = fetch_klines(symbol, interval, limit)
 
         df = pd.DataFrame(data, columns=[
             "timestamp", "open", "high", "low", "close", "volume",
@@ -29,120 +44,52 @@ def fetch_ohlcv(symbol: str, interval="5m", limit=50):
         print(f"❌ Failed to fetch OHLCV for {symbol}: {e}")
         return None
 
-def compute_rsi(df, period=14):
-    delta = df["close"].diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-
-    return rsi.iloc[-1] if not rsi.empty else None
-
-def compute_ma_crossover(df, short=20, long=50):
-    ma_short = df["close"].rolling(window=short).mean().iloc[-1]
-    ma_long = df["close"].rolling(window=long).mean().iloc[-1]
-
-    if ma_short > ma_long:
-        return "Bullish"
-    elif ma_short < ma_long:
-        return "Bearish"
-    else:
-        return "Neutral"
-
-def compute_volume_spike(df, period=20):
-    recent_volume = df["volume"].iloc[-1]
-    avg_volume = df["volume"].rolling(window=period).mean().iloc[-1]
-
-    if avg_volume == 0:
-        return "Unknown"
-
-    ratio = (recent_volume / avg_volume) * 100
-    level = "Low"
-    if ratio > 180:
-        level = "High"
-    elif ratio > 130:
-        level = "Medium"
-
-    return f"+{ratio:.0f}% vs avg ({level})"
-
 def get_technical_indicators(symbol: str):
-    df = fetch_ohlcv(symbol)
-    if df is None or len(df) < 50:
+    # Streamed symbols keep running indicators in the market-data service,
+    # with the higher timeframes alongside; the rest (and everything outside
+    # daemon mode) downloads klines over REST
+    service = get_market_data()
+    indicators = service.indicators(symbol, OHLCV_INTERVAL) if service else None
+    if indicators is not None:
+        context = get_timeframe_context(symbol)
+        if context:
+            indicators["timeframes"] = context
+        return indicators
+
+    df = fetch_ohlcv(symbol, interval=OHLCV_INTERVAL, limit=OHLCV_LIMIT + RSI_WARMUP)
+    if df is None or len(df) < OHLCV_LIMIT:
         return None  # Not enough data
-
-    # === RSI ===
-    rsi_series = df["close"].diff().clip(lower=0).rolling(window=14).mean() / \
-                 df["close"].diff().clip(upper=0).abs().rolling(window=14).mean()
-    rsi_series = 100 - (100 / (1 + rsi_series))
-
-    rsi_now = rsi_series.iloc[-1]
-    rsi_prev = rsi_series.iloc[-2]
-    rsi_trend = "Rising" if rsi_now > rsi_prev else "Falling"
-
-    rsi_label = "Oversold" if rsi_now < 30 else "Overbought" if rsi_now > 70 else "Neutral"
-
-    # === MA Crossover ===
-    ma_short_period = 20
-    ma_long_period = 50
-
-    ma_short = df["close"].rolling(window=ma_short_period).mean().iloc[-1]
-    ma_long = df["close"].rolling(window=ma_long_period).mean().iloc[-1]
-
-    if ma_short > ma_long:
-        ma_cross = f"{ma_short_period} > {ma_long_period} (Bullish)"
-    elif ma_short < ma_long:
-        ma_cross = f"{ma_short_period} < {ma_long_period} (Bearish)"
-    else:
-        ma_cross = f"{ma_short_period} = {ma_long_period} (Neutral)"
-
-    # === Volume Spike ===
-    recent_volume = df["volume"].iloc[-1]
-    avg_volume = df["volume"].rolling(window=20).mean().iloc[-1]
-    if avg_volume == 0:
-        volume_spike = "Unknown"
-    else:
-        ratio = (recent_volume / avg_volume) * 100
-        level = "Low"
-        if ratio > 180:
-            level = "High"
-        elif ratio > 130:
-            level = "Medium"
-        volume_spike = f"+{ratio:.0f}% vs avg ({level})"
-
-    return {
-        "rsi": round(rsi_now, 1),
-        "rsi_label": rsi_label,
-        "rsi_trend": rsi_trend,
-        "ma_crossover": ma_cross,
-        "volume_spike": volume_spike
-    }
+    return indicators_from_series(df["close"].to_numpy(), df["volume"].to_numpy())
+
+def get_timeframe_context(symbol):
+    """{timeframe: indicators} for CONTEXT_FRAMES from the market-data
+    service's derived rings; empty when the symbol isn't streamed."""
+    service = get_market_data()
+    if not service:
+        return {}
+    context = {}
+    for frame in CONTEXT_FRAMES:
+        if service.has_interval(frame):
+            indicators = service.indicators(symbol, frame)
+            if indicators:
+                context[frame] = indicators
+    return context
+
+def format_timeframe_context(context):
+    """One line for prompts and messages, e.g. "15m RSI 55.2 Neutral, 20 > 50 (Bullish) · 1h ..."."""
+    return " · ".join(
+        f"{frame} RSI {t['rsi']} {t['rsi_label']}, {t['ma_crossover']}" for frame, t in context.items()
+    )
 
 def get_market_change_summary():
-    symbols = ["BTCUSDT", "ETHUSDT"]
-    interval = "1m"
-    limit = 61  # 1 hour + current
-
+    # BTC/ETH 1h change, read from the shared market regime snapshot
+    snapshot = regime.get()
     summary = []
-    for symbol in symbols:
-        try:
-            params = {"symbol": symbol, "interval": interval, "limit": limit}
-            res = requests.get("https://fapi.binance.com/fapi/v1/klines", params=params)
-            data = res.json()
-            if len(data) < 2:
-                continue
-
-            price_now = float(data[-1][4])  # close price
-            price_1h_ago = float(data[0][4])
-
-            pct_change = ((price_now - price_1h_ago) / price_1h_ago) * 100
-            label = f"{symbol.replace('USDT','')}: {pct_change:+.1f}%"
-            summary.append(label)
-
-        except Exception as e:
-            print(f"❌ Error fetching 1h price change for {symbol}: {e}")
-
-    return ", ".join(summary) if summary else "Unavailable"
\ No newline at end of file
+    for symbol in MARKET_CHANGE_SYMBOLS:
+        figures = snapshot["symbols"].get(symbol) if snapshot else None
+        if figures is None:
+            continue
+        label = f"{symbol.replace('USDT','')}: {figures['change_1h']:+.1f}%"
+        summary.append(label)
+
+    return ", ".join(summary) if summary else "Unavailable"
@@ -0,0 +1,32 @@
+# test_headline_classifier.py
+#   python3 -m pytest test_headline_classifier.py
+
+import csv
+
+import headline_classifier
+
+
+def write_csv(path, fieldnames, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_outage_skips_are_not_junk(tmp_path, monkeypatch):
+    skipped = tmp_path / "skipped_signals_log.csv"
+    signals = tmp_path / "signals_log.csv"
+    write_csv(skipped, ["Timestamp", "Title", "Source", "Score", "Category", "Reason", "Summary"], [
+        {"Title": "Top 5 memecoins to watch this weekend", "Score": 20, "Category": "Opinion", "Reason": "listicle"},
+        {"Title": "SEC approves spot Solana ETF", "Score": 0, "Category": "Error", "Reason": "GPT call failed"},
+    ])
+    write_csv(signals, ["Timestamp", "Asset", "Signal", "Headline"], [
+        {"Asset": "BTCUSDT", "Signal": "BUY", "Headline": "Binance lists new perpetual"},
+    ])
+    monkeypatch.setattr(headline_classifier, "SKIPPED_LOG", str(skipped))
+    monkeypatch.setattr(headline_classifier, "SIGNAL_LOG", str(signals))
+
+    assert headline_classifier.load_training_data() == [
+        ("Top 5 memecoins to watch this weekend", 0),
+        ("Binance lists new perpetual", 1),
+    ]
@@ -0,0 +1,146 @@
+# ticker_index.py
+# One compiled matcher over symbol_map: an Aho-Corasick automaton that finds
+# every alias in a headline in a single pass, with word-boundary rules so
+# "ACT" doesn't match inside "IMPACT" and plain English words ("the", "gas",
+# "act") only count when they are clearly meant as a ticker.
+
+import re
+
+# symbol_map keys that are also everyday words. They only match as a
+# cashtag ($GAS), or written in capitals in a headline that isn't shouting
+# (so "Senate passes CLARITY ACT" stays a miss).
+COMMON_WORDS = frozenset({
+    "ACE", "ACT", "ALICE", "ALL", "ALPHA", "ALT", "ANIME", "APE", "ARC", "ARK", "AUCTION",
+    "BABY", "BAKE", "BAN", "BANANA", "BAND", "BANK", "BEAT", "BID", "BLESS", "BOND", "CAKE",
+    "CHESS", "COLLECT", "COMBO", "COMMON", "COOKIE", "CROSS", "CYBER", "DASH", "DEEP", "DOGS",
+    "EDEN", "EPIC", "ERA", "ESPORTS", "FIGHT", "FLOW", "FLUID", "FLUX", "FORM", "FORTH", "FUN",
+    "GAS", "GOAT", "GRASS", "GUN", "HIGH", "HIVE", "HOME", "HOOK", "HOT", "HYPE", "HYPER",
+    "KERNEL", "KEY", "KITE", "LAB", "LAYER", "LEVER", "LIGHT", "LIT", "LOOM", "MAGIC", "MAGMA",
+    "MASK", "MEME", "MET", "MILK", "MOVE", "NEAR", "NIGHT", "NOT", "OCEAN", "ONE", "OPEN",
+    "ORCA", "ORDER", "PEOPLE", "PIXEL", "PLAY", "PORTAL", "POWER", "PROMPT", "PROVE", "PUMP",
+    "QUICK", "RARE", "RECALL", "RED", "REEF", "RIVER", "ROSE", "RUNE", "SAFE", "SAGA", "SAND",
+    "SENT", "SHELL", "SIGN", "SIREN", "SKATE", "SKY", "SONIC", "SOON", "SPACE", "SPELL",
+    "STABLE", "SUN", "SUPER", "SWELL", "TAG", "TAKE", "THE", "TOKEN", "TOWNS", "TREE", "TRUMP",
+    "TRUST", "TRUTH", "TURBO", "TURTLE", "USELESS", "VELVET", "VINE", "VIRTUAL", "WAVES", "WET",
+})
+
+# Market shorthand that reads as a ticker even in capitals ("new ATH",
+# "SPX futures", "DEFI TVL"): only a cashtag counts
+CASHTAG_ONLY = frozenset({"ATH", "DEFI", "GPS", "HFT", "NFP", "SPX"})
+
+_CAPS_BEFORE_RE = re.compile(r"(?<![A-Za-z0-9])([A-Z][A-Z0-9]+)\s+$")
+_CAPS_AFTER_RE = re.compile(r"^\s+([A-Z][A-Z0-9]+)(?![A-Za-z0-9])")
+
+
+def _is_word_char(ch):
+    return ch.isascii() and ch.isalnum()
+
+
+class TickerIndex:
+    """
+    Built once from a {alias: symbol} map. `find(title)` returns every
+    ticker mentioned, ranked: unambiguous aliases first, then by position;
+    overlapping aliases resolve to the longest ("SHIBA INU" over "SHIBA").
+    """
+
+    def __init__(self, symbol_map, common_words=COMMON_WORDS, cashtag_only=CASHTAG_ONLY):
+        self.aliases = []   # pattern id -> (alias, symbol, ambiguous)
+        self.cashtag_only = cashtag_only
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+        self.keys = {alias.upper() for alias in symbol_map}
+
+        for alias, symbol in symbol_map.items():
+            alias = alias.upper()
+            if not alias:
+                continue
+            node = 0
+            for ch in alias:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                node = nxt
+            self.out[node] += (len(self.aliases),)
+            self.aliases.append((alias, symbol, alias in common_words or alias in cashtag_only))
+
+        # Breadth-first fail links; each node also reports its suffixes' outputs
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for ch, child in self.goto[node].items():
+                fallback = self.fail[node]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(ch, 0)
+                self.fail[child] = target if target != child else 0
+                self.out[child] += self.out[self.fail[child]]
+                queue.append(child)
+
+        # Fold the fail links into full transition tables (BFS order, so a
+        # node's fail target is complete before the node itself): the scan
+        # then takes exactly one dict lookup per character
+        self.delta = [dict(self.goto[0])]
+        self.delta.extend({} for _ in range(len(self.goto) - 1))
+        for node in queue:
+            self.delta[node] = {**self.delta[self.fail[node]], **self.goto[node]}
+
+    def _scan(self, text):
+        delta, out, aliases = self.delta, self.out, self.aliases
+        node = 0
+        for end, ch in enumerate(text, 1):
+            node = delta[node].get(ch, 0)
+            if out[node]:
+                for pattern_id in out[node]:
+                    yield end - len(aliases[pattern_id][0]), end, pattern_id
+
+    def _accept(self, title, upper, start, end, ambiguous):
+        alias = upper[start:end]
+        if _is_word_char(alias[0]) and start > 0 and _is_word_char(upper[start - 1]):
+            return False
+        if _is_word_char(alias[-1]) and end < len(upper) and _is_word_char(upper[end]):
+            return False
+        if not ambiguous:
+            return True
+        if start > 0 and title[start - 1] == "$":
+            return True
+        if alias in self.cashtag_only or title[start:end] != alias or title.upper() == title:
+            return False
+        # A capitalised word next to other capitalised non-ticker words is a
+        # shouted phrase ("CLARITY ACT"), not a ticker
+        for neighbour in (_CAPS_BEFORE_RE.search(title[:start]), _CAPS_AFTER_RE.match(title[end:])):
+            if neighbour and neighbour.group(1) not in self.keys:
+                return False
+        return True
+
+    def find(self, title):
+        """All tickers in `title`, best first, without duplicates."""
+        upper = title.upper()
+        if len(upper) != len(title):   # case folding changed offsets (e.g. "ß")
+            title = upper
+
+        matches = [
+            (start, end, pattern_id) for start, end, pattern_id in self._scan(upper)
+            if self._accept(title, upper, start, end, self.aliases[pattern_id][2])
+        ]
+        # Leftmost-longest, non-overlapping
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        chosen = []
+        last_end = 0
+        for start, end, pattern_id in matches:
+            if start >= last_end:
+                chosen.append((self.aliases[pattern_id][2], start, self.aliases[pattern_id][1]))
+                last_end = end
+
+        symbols = []
+        for _, _, symbol in sorted(chosen):
+            if symbol not in symbols:
+                symbols.append(symbol)
+        return symbols
+
+    def first(self, title):
+        symbols = self.find(title)
+        return symbols[0] if symbols else None
@@ -0,0 +1,97 @@
+# timeframes.py
+# Higher-timeframe candles derived from one 1m series, so 5m/15m/1h/4h
+# indicators cost no extra downloads. resample() turns a block of candles
+# into bars in one vectorized pass (on backfill); FrameBuilder keeps the
+# forming bar of every timeframe current from single stream updates in
+# O(1). Bars are aligned to the epoch (UTC), like Binance's.
+
+import numpy as np
+
+
+def resample(open_time, ohlcv, frame_ms):
+    """
+    Aggregate candles (open times and an (n x 5) open/high/low/close/volume
+    array, oldest first) into `frame_ms` bars: (open_time, ohlcv). A leading
+    bar whose first candle is missing is dropped; the last bar may still be
+    forming.
+    """
+    open_time = np.asarray(open_time, dtype=np.int64)
+    ohlcv = np.asarray(ohlcv, dtype=np.float64)
+    bar = open_time // frame_ms * frame_ms
+    starts = np.flatnonzero(np.r_[True, bar[1:] != bar[:-1]]) if len(bar) else np.zeros(0, dtype=np.int64)
+    if len(starts) and open_time[0] != bar[0]:
+        starts = starts[1:]
+    if not len(starts):
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 5))
+
+    first = starts[0]
+    offsets = starts - first
+    ends = np.r_[starts[1:], len(open_time)]
+    bars = np.empty((len(starts), 5))
+    bars[:, 0] = ohlcv[starts, 0]
+    bars[:, 1] = np.maximum.reduceat(ohlcv[first:, 1], offsets)
+    bars[:, 2] = np.minimum.reduceat(ohlcv[first:, 2], offsets)
+    bars[:, 3] = ohlcv[ends - 1, 3]
+    bars[:, 4] = np.add.reduceat(ohlcv[first:, 4], offsets)
+    return bar[starts], bars
+
+
+class FrameBuilder:
+    """
+    The forming bar of each of `frames_ms` for one symbol, built from its
+    base candles: the closed candles of the current bar are kept as one
+    running (open, high, low, volume) aggregate and the forming candle is
+    layered on top, so every update is O(1) per timeframe.
+    """
+
+    def __init__(self, frames_ms):
+        self.frames_ms = list(frames_ms)
+        self.open_time = None   # the forming base candle
+        self.values = None
+        self.closed = [None] * len(self.frames_ms)   # [bar open, open, high, low, volume] per timeframe
+
+    def reset(self, open_time, ohlcv):
+        """Rebuild from base candles, oldest first, the last one forming."""
+        self.closed = [None] * len(self.frames_ms)
+        if not len(open_time):
+            self.open_time = self.values = None
+            return
+        self.open_time, self.values = int(open_time[-1]), tuple(float(v) for v in ohlcv[-1])
+        for i, frame_ms in enumerate(self.frames_ms):
+            bar = self.open_time // frame_ms * frame_ms
+            rows = ohlcv[:-1][open_time[:-1] >= bar]
+            if len(rows):
+                self.closed[i] = [bar, float(rows[0, 0]), float(rows[:, 1].max()),
+                                  float(rows[:, 2].min()), float(rows[:, 4].sum())]
+
+    def update(self, open_time, values):
+        """
+        Apply one base-candle update; returns the forming (bar open, bar
+        values) of every timeframe, or None for a late update.
+        """
+        if self.open_time is not None:
+            if open_time < self.open_time:
+                return None
+            if open_time > self.open_time:
+                self._fold()
+        self.open_time, self.values = open_time, values
+        return [self._bar(i) for i in range(len(self.frames_ms))]
+
+    def _fold(self):
+        # The forming candle has closed: merge it into its bars
+        o, h, l, _, v = self.values
+        for i, frame_ms in enumerate(self.frames_ms):
+            bar = self.open_time // frame_ms * frame_ms
+            agg = self.closed[i]
+            if agg is None or agg[0] != bar:
+                self.closed[i] = [bar, o, h, l, v]
+            else:
+                agg[2], agg[3], agg[4] = max(agg[2], h), min(agg[3], l), agg[4] + v
+
+    def _bar(self, i):
+        o, h, l, c, v = self.values
+        bar = self.open_time // self.frames_ms[i] * self.frames_ms[i]
+        agg = self.closed[i]
+        if agg is None or agg[0] != bar:
+            return bar, (o, h, l, c, v)
+        return bar, (agg[1], max(agg[2], h), min(agg[3], l), c, agg[4] + v)
@@ -1,21 +1,23 @@
 # update_prices.py
 
 import csv
+import math
 import os
 import shutil
-import time
-from datetime import datetime
-import requests
+from datetime import datetime, timezone
 
+from kline_archive import KlineArchive
+from price_snapshot import prices
 from gpt_cache import get_cached_result, save_cached_result
 from confidence import calibrate_confidence
 
 # === CONFIG ===
 PENDING_FILE = "pending_prices.csv"
 SIGNAL_LOG = "signals_log.csv"
-BINANCE_FUTURES_URL = "https://fapi.binance.com/fapi/v1/ticker/price"
 LOG_FILE = "logs/update_prices.log"
 
+archive = KlineArchive()
+
 os.makedirs("logs", exist_ok=True)
 
 def log(msg):
@@ -25,16 +27,38 @@ def log(msg):
     with open(LOG_FILE, "a", encoding="utf-8") as f:
         f.write(full_msg + "\n")
 
-def get_futures_price(symbol, retries=3):
-    for attempt in range(retries):
+def get_futures_price(symbol):
+    # All due rows are priced from one all-symbols snapshot; the shared
+    # client retries with backoff and respects the weight limit
+    price = prices.get(symbol)
+    if price is None:
+        log(f"❌ No price for {symbol} in the futures snapshot")
+    return price
+
+def get_price_at(symbol, check_time):
+    # The archived 1m close at the check time when the archive has it, so a
+    # late run still measures the 3h move; otherwise the live price
+    at_ms = check_time.replace(tzinfo=timezone.utc).timestamp() * 1000
+    archived = float(archive.closes_at(symbol, [at_ms])[0])
+    if archived == archived:   # not NaN
+        return archived
+    return get_futures_price(symbol)
+
+def sync_archive(due, now):
+    # Bring the 1m archive up to each due symbol's latest candle first, so
+    # get_price_at finds the close at the check time instead of falling
+    # back to the live price. New files reach back to the oldest due check.
+    oldest = {}
+    for symbol, check_time in due:
+        oldest[symbol] = min(check_time, oldest.get(symbol, check_time))
+    for symbol, check_time in sorted(oldest.items()):
+        days = math.ceil((now - check_time).total_seconds() / 86400) + 1
         try:
-            response = requests.get(BINANCE_FUTURES_URL, params={"symbol": symbol}, timeout=10)
-            data = response.json()
-            return float(data["price"])
+            added = archive.sync(symbol, "1m", days=days)
+            if added:
+                log(f"🗄️ Archived {added} new 1m candles for {symbol}")
         except Exception as e:
-            log(f"❌ Error fetching price for {symbol} (try {attempt+1}): {e}")
-            time.sleep(1)
-    return None
+            log(f"❌ Archive sync failed for {symbol}: {e}")
 
 def read_pending_entries():
     if not os.path.exists(PENDING_FILE):
@@ -112,17 +136,21 @@ def main():
     pending = read_pending_entries()
     remaining = []
 
+    parsed = []
     for entry in pending:
         try:
             check_time = datetime.strptime(entry["Check_After"], "%Y-%m-%d %H:%M:%S")
         except:
             log(f"⚠️ Invalid datetime format in pending entry: {entry}")
             continue
+        parsed.append((entry, check_time))
+    sync_archive([(entry["Asset"], check_time) for entry, check_time in parsed if now >= check_time], now)
 
+    for entry, check_time in parsed:
         if now >= check_time:
             symbol = entry["Asset"]
             timestamp = entry["Timestamp"]
-            price = get_futures_price(symbol)
+            price = get_price_at(symbol, check_time)
             if price:
                 update_signals_log(symbol, timestamp, price)
             else:
@@ -132,6 +160,7 @@ def main():
             remaining.append(entry)
 
     write_pending_entries(remaining)
+    prices.print_stats()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file